@@ -0,0 +1,99 @@
+# ab_fused_audit.py
+#
+# A/B harness: split audit (clause matcher + documentation analyser, two
+# generations) vs fused audit (services/fused_audit.py, one generation).
+# Runs every case in test/fixtures/audit_ab_cases.json through both and
+# reports per-field agreement and wall time.
+#
+# Run: python ab_fused_audit.py [cases.json]
+
+import json
+import os
+import sys
+import time
+
+from llm.model_loader import ModelLoader
+from services.clause_matcher import run_clause_matcher
+from services.documentation_analyzer import run_documentation_analysis
+from services.fused_audit import run_fused_audit
+
+DEFAULT_CASES = os.path.join(os.path.dirname(__file__), "test", "fixtures", "audit_ab_cases.json")
+
+# Categorical outputs must match; free-text explanations are only printed
+CLAUSE_FIELDS = ["clause_category", "clause_clarity", "rejection_alignment", "confidence"]
+DOC_FIELDS    = ["documentation_gap_severity", "rejection_nature", "medical_ambiguity_detected", "confidence"]
+
+
+def _split(model, tokenizer, case):
+    clause = run_clause_matcher(
+        model, tokenizer,
+        case["policy_text"], case["rejection_text"], case.get("user_explanation"),
+    )
+    doc = run_documentation_analysis(
+        model, tokenizer,
+        case["policy_text"], case["rejection_text"],
+        case.get("medical_documents_text"), case.get("user_explanation"),
+    )
+    return clause, doc
+
+
+def _fused(model, tokenizer, case):
+    return run_fused_audit(
+        model, tokenizer,
+        case["policy_text"], case["rejection_text"],
+        case.get("medical_documents_text"), case.get("user_explanation"),
+    )
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(path: str = DEFAULT_CASES) -> None:
+    with open(path, encoding="utf-8") as f:
+        cases = json.load(f)
+
+    model, tokenizer = ModelLoader().get_model()
+
+    agree = {f"clause.{k}": 0 for k in CLAUSE_FIELDS} | {f"doc.{k}": 0 for k in DOC_FIELDS}
+    agree["doc.missing_documents"] = 0
+    split_time = fused_time = 0.0
+
+    for case in cases:
+        (s_clause, s_doc), t_split = _timed(_split, model, tokenizer, case)
+        (f_clause, f_doc), t_fused = _timed(_fused, model, tokenizer, case)
+        split_time += t_split
+        fused_time += t_fused
+
+        print(f"\n── {case['name']}  (split {t_split:.1f}s · fused {t_fused:.1f}s)")
+        for prefix, fields, a, b in (
+            ("clause", CLAUSE_FIELDS, s_clause, f_clause),
+            ("doc",    DOC_FIELDS,    s_doc,    f_doc),
+        ):
+            for field in fields:
+                sv, fv = getattr(a, field), getattr(b, field)
+                agree[f"{prefix}.{field}"] += sv == fv
+                mark = "✅" if sv == fv else "❌"
+                print(f"  {mark} {prefix}.{field:<28} split={sv!r:<24} fused={fv!r}")
+
+        same_docs = {d.lower() for d in s_doc.missing_documents} == {d.lower() for d in f_doc.missing_documents}
+        agree["doc.missing_documents"] += same_docs
+        print(f"  {'✅' if same_docs else '❌'} doc.missing_documents"
+              f"           split={s_doc.missing_documents} fused={f_doc.missing_documents}")
+        print(f"  📄 split clause: {s_clause.explanation}")
+        print(f"  📄 fused clause: {f_clause.explanation}")
+        print(f"  📄 split doc:    {s_doc.explanation}")
+        print(f"  📄 fused doc:    {f_doc.explanation}")
+
+    n = len(cases) or 1
+    print("\n══ Agreement (fused vs split) ══")
+    for field, count in agree.items():
+        print(f"  {field:<36} {count}/{len(cases)}  ({100 * count / n:.0f}%)")
+    print(f"\n⚡ Wall time: split {split_time:.1f}s · fused {fused_time:.1f}s"
+          f" · speed-up {split_time / fused_time if fused_time else 0:.2f}×")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -22,6 +22,9 @@
 
 SCORING_CONFIG: dict = {
 
+    # Bump on ANY change below — pre-purchase results are cached per version
+    "config_version": 1,
+
     # Starting baseline — all Low Risk clauses, no compliance detected
     "base_score": 65,
 
@@ -1,96 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from engines.pre_purchase_engine import PrePurchaseEngine
-from schemas.policy_comparison import PolicyComparisonReport
+from schemas.pre_purchase import PrePurchaseReport
+from schemas.policy_comparison import (
+    PairwiseComparison,
+    PolicyComparisonMatrix,
+    PolicyComparisonReport,
+    PolicyRanking,
+)
+
+# Both sides of a comparison run at once; kept apart from the catalogue batch
+# pool so /compare never queues behind a /prepurchase/batch
+_COMPARE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="compare")
+
+# Score gap (points) below which two policies are too close to call
+_CLOSE_CALL_POINTS = 3
+
+_RISK_ORDER = {"High Risk": 0, "Moderate Risk": 1, "Low Risk": 2, "Not Found": 3}
+
+_CLAUSE_LABELS = {
+    "waiting_period":             "Waiting Period",
+    "pre_existing_disease":       "Pre-existing Disease",
+    "room_rent_sublimit":         "Room Rent Sublimit",
+    "disease_specific_caps":      "Disease-Specific Caps",
+    "co_payment":                 "Co-payment",
+    "exclusions_clarity":         "Exclusions Clarity",
+    "claim_procedure_complexity": "Claim Procedure",
+    "sublimits_and_caps":         "Sublimits & Caps",
+    "restoration_benefit":        "Restoration Benefit",
+    "transparency_of_terms":      "Term Transparency",
+}
+
+
+def _pairwise_diff(
+    report_a: PrePurchaseReport,
+    report_b: PrePurchaseReport,
+    name_a: str = "Policy A",
+    name_b: str = "Policy B",
+) -> dict[str, list[str]]:
+    """Clause, compliance and transparency differences between two reports."""
+    clause_a = report_a.clause_risk
+    clause_b = report_b.clause_risk
+
+    key_differences: list[str] = []
+    a_advantages:    list[str] = []
+    b_advantages:    list[str] = []
+    a_risks:         list[str] = []
+    b_risks:         list[str] = []
+
+    for field, label in _CLAUSE_LABELS.items():
+        val_a = getattr(clause_a, field, "Not Found")
+        val_b = getattr(clause_b, field, "Not Found")
+
+        if val_a == val_b:
+            continue
+
+        rank_a = _RISK_ORDER.get(val_a, 3)
+        rank_b = _RISK_ORDER.get(val_b, 3)
+
+        key_differences.append(
+            f"{label}: {name_a} is {val_a}, {name_b} is {val_b}"
+        )
+
+        if rank_a > rank_b:
+            # A has lower risk (higher rank = better)
+            a_advantages.append(f"Lower {label.lower()} risk ({val_a} vs {val_b})")
+            b_risks.append(f"Higher {label.lower()} risk ({val_b} vs {val_a})")
+        elif rank_b > rank_a:
+            b_advantages.append(f"Lower {label.lower()} risk ({val_b} vs {val_a})")
+            a_risks.append(f"Higher {label.lower()} risk ({val_a} vs {val_b})")
+
+    # Compliance comparison
+    comp_a = report_a.irdai_compliance.compliance_score
+    comp_b = report_b.irdai_compliance.compliance_score
+    if comp_a > comp_b:
+        a_advantages.append(f"Better IRDAI compliance ({comp_a}/7 vs {comp_b}/7)")
+        b_risks.append(f"Lower IRDAI compliance score ({comp_b}/7)")
+    elif comp_b > comp_a:
+        b_advantages.append(f"Better IRDAI compliance ({comp_b}/7 vs {comp_a}/7)")
+        a_risks.append(f"Lower IRDAI compliance score ({comp_a}/7)")
+
+    # Transparency comparison
+    trans_a = report_a.broker_risk_analysis.transparency_score
+    trans_b = report_b.broker_risk_analysis.transparency_score
+    if trans_a > trans_b + 5:
+        a_advantages.append(f"Higher transparency score ({trans_a}% vs {trans_b}%)")
+    elif trans_b > trans_a + 5:
+        b_advantages.append(f"Higher transparency score ({trans_b}% vs {trans_a}%)")
+
+    return {
+        "key_differences": key_differences[:8],   # cap at 8 for readability
+        "a_advantages":    a_advantages,
+        "b_advantages":    b_advantages,
+        "a_risks":         a_risks,
+        "b_risks":         b_risks,
+    }
 
 
 class PolicyComparisonEngine:
 
     def __init__(self, model, tokenizer):
-        # Share one engine instance — runs sequentially, not parallel
         self.engine = PrePurchaseEngine(model, tokenizer)
 
+    def _reports(self, policy_texts: list[str]) -> list[PrePurchaseReport]:
+        """
+        One PrePurchaseReport per policy, analysed concurrently — their
+        classification prompts share scheduler decode batches. Previously
+        analysed (or identical) policies come from the shared report cache.
+        """
+        results = dict(self.engine.run_batch(policy_texts, executor=_COMPARE_EXECUTOR))
+        for result in results.values():
+            if isinstance(result, Exception):
+                raise result
+        return [results[i] for i in range(len(policy_texts))]
+
     def compare(self, policy_a_text: str, policy_b_text: str) -> PolicyComparisonReport:
 
-        report_a = self.engine.run(policy_a_text)
-        report_b = self.engine.run(policy_b_text)
+        report_a, report_b = self._reports([policy_a_text, policy_b_text])
 
         score_a = report_a.score_breakdown.adjusted_score
         score_b = report_b.score_breakdown.adjusted_score
         diff    = score_a - score_b
 
         # ✅ Match frontend expected values: "A", "B", "Neither"
-        if diff > 3:
+        if diff > _CLOSE_CALL_POINTS:
             recommended = "A"
-        elif diff < -3:
+        elif diff < -_CLOSE_CALL_POINTS:
             recommended = "B"
         else:
             recommended = "Neither"   # too close to call
 
-        # --------------------------------------------------
-        # Clause-level diff analysis
-        # --------------------------------------------------
-        clause_a = report_a.clause_risk
-        clause_b = report_b.clause_risk
-
-        _RISK_ORDER = {"High Risk": 0, "Moderate Risk": 1, "Low Risk": 2, "Not Found": 3}
-
-        key_differences: list[str] = []
-        a_advantages:    list[str] = []
-        b_advantages:    list[str] = []
-        a_risks:         list[str] = []
-        b_risks:         list[str] = []
-
-        _CLAUSE_LABELS = {
-            "waiting_period":             "Waiting Period",
-            "pre_existing_disease":       "Pre-existing Disease",
-            "room_rent_sublimit":         "Room Rent Sublimit",
-            "disease_specific_caps":      "Disease-Specific Caps",
-            "co_payment":                 "Co-payment",
-            "exclusions_clarity":         "Exclusions Clarity",
-            "claim_procedure_complexity": "Claim Procedure",
-            "sublimits_and_caps":         "Sublimits & Caps",
-            "restoration_benefit":        "Restoration Benefit",
-            "transparency_of_terms":      "Term Transparency",
-        }
-
-        for field, label in _CLAUSE_LABELS.items():
-            val_a = getattr(clause_a, field, "Not Found")
-            val_b = getattr(clause_b, field, "Not Found")
-
-            if val_a == val_b:
-                continue
-
-            rank_a = _RISK_ORDER.get(val_a, 3)
-            rank_b = _RISK_ORDER.get(val_b, 3)
-
-            key_differences.append(
-                f"{label}: Policy A is {val_a}, Policy B is {val_b}"
-            )
-
-            if rank_a > rank_b:
-                # A has lower risk (higher rank = better)
-                a_advantages.append(f"Lower {label.lower()} risk ({val_a} vs {val_b})")
-                b_risks.append(f"Higher {label.lower()} risk ({val_b} vs {val_a})")
-            elif rank_b > rank_a:
-                b_advantages.append(f"Lower {label.lower()} risk ({val_b} vs {val_a})")
-                a_risks.append(f"Higher {label.lower()} risk ({val_a} vs {val_b})")
-
-        # Compliance comparison
-        comp_a = report_a.irdai_compliance.compliance_score
-        comp_b = report_b.irdai_compliance.compliance_score
-        if comp_a > comp_b:
-            a_advantages.append(f"Better IRDAI compliance ({comp_a}/7 vs {comp_b}/7)")
-            b_risks.append(f"Lower IRDAI compliance score ({comp_b}/7)")
-        elif comp_b > comp_a:
-            b_advantages.append(f"Better IRDAI compliance ({comp_b}/7 vs {comp_a}/7)")
-            a_risks.append(f"Lower IRDAI compliance score ({comp_a}/7)")
-
-        # Transparency comparison
-        trans_a = report_a.broker_risk_analysis.transparency_score
-        trans_b = report_b.broker_risk_analysis.transparency_score
-        if trans_a > trans_b + 5:
-            a_advantages.append(f"Higher transparency score ({trans_a}% vs {trans_b}%)")
-        elif trans_b > trans_a + 5:
-            b_advantages.append(f"Higher transparency score ({trans_b}% vs {trans_a}%)")
+        differences = _pairwise_diff(report_a, report_b)
 
         # --------------------------------------------------
         # Recommendation text
@@ -122,13 +162,79 @@ class PolicyComparisonEngine:
             policy_b_score=round(score_b),
             recommended_policy=recommended,
             recommendation=rec_text,
-            key_differences=key_differences[:8],   # cap at 8 for readability
-            a_advantages=a_advantages,
-            b_advantages=b_advantages,
-            a_risks=a_risks,
-            b_risks=b_risks,
             summary=(
                 f"Policy A: {report_a.overall_policy_rating} ({round(score_a)}/100) · "
                 f"Policy B: {report_b.overall_policy_rating} ({round(score_b)}/100)"
             ),
+            **differences,
+        )
+
+    def compare_matrix(
+        self,
+        policy_texts: list[str],
+        names: list[str] | None = None,
+    ) -> PolicyComparisonMatrix:
+        """
+        N-way comparison: each policy is analysed once (N LLM calls, cached
+        ones free), then every pair is diffed from the reports alone.
+        """
+        if len(policy_texts) < 2:
+            raise ValueError("need at least two policies to compare")
+        names = names or [f"Policy {chr(ord('A') + i)}" for i in range(len(policy_texts))]
+        if len(names) != len(policy_texts) or len(set(names)) != len(names):
+            raise ValueError("names must be unique, one per policy")
+
+        reports = self._reports(policy_texts)
+        scores  = [r.score_breakdown.adjusted_score for r in reports]
+        n       = len(reports)
+
+        wins = [0] * n
+        pairs: list[PairwiseComparison] = []
+        for i in range(n):
+            for j in range(i + 1, n):
+                diff = scores[i] - scores[j]
+                if diff > _CLOSE_CALL_POINTS:
+                    recommended = names[i]
+                    wins[i] += 1
+                elif diff < -_CLOSE_CALL_POINTS:
+                    recommended = names[j]
+                    wins[j] += 1
+                else:
+                    recommended = "Neither"
+                pairs.append(PairwiseComparison(
+                    policy_a=names[i],
+                    policy_b=names[j],
+                    score_difference=round(diff),
+                    recommended_policy=recommended,
+                    **_pairwise_diff(reports[i], reports[j], names[i], names[j]),
+                ))
+
+        order = sorted(
+            range(n),
+            key=lambda i: (-scores[i], -wins[i], -reports[i].irdai_compliance.compliance_score),
+        )
+        ranking = [
+            PolicyRanking(
+                rank=rank,
+                policy=names[i],
+                score=round(scores[i]),
+                rating=reports[i].overall_policy_rating,
+                pairwise_wins=wins[i],
+            )
+            for rank, i in enumerate(order, start=1)
+        ]
+
+        best, runner_up = order[0], order[1]
+        clear_lead = scores[best] - scores[runner_up] > _CLOSE_CALL_POINTS
+
+        return PolicyComparisonMatrix(
+            policies=names,
+            ranking=ranking,
+            score_matrix=[[round(scores[i] - scores[j]) for j in range(n)] for i in range(n)],
+            pairs=pairs,
+            recommended_policy=names[best] if clear_lead else "Neither",
+            summary=" · ".join(
+                f"{names[i]}: {reports[i].overall_policy_rating} ({round(scores[i])}/100)"
+                for i in order
+            ),
         )
\ No newline at end of file
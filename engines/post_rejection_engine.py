@@ -1,7 +1,11 @@
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from engines.stage_graph import StageGraph
 from services.clause_matcher import run_clause_matcher
 from services.documentation_analyzer import run_documentation_analysis
+from services.fused_audit import run_fused_audit
+from services.rule_engine import classify_rejection_rule_based
 from services.scoring_engine import compute_appeal_strength
 from services.report_builder import build_final_report
 
@@ -30,6 +34,14 @@ def _get_retriever() -> HybridRegulatoryRetriever:
     return _retriever_instance
 
 
+# Fused mode: one LLM generation for clause + documentation analysis instead
+# of two (services/fused_audit.py). Off until ab_fused_audit.py shows parity.
+FUSED_AUDIT = False
+
+# Shared pool for audit stages — three per request (clause, docs, retrieval)
+_STAGE_EXECUTOR = ThreadPoolExecutor(max_workers=12, thread_name_prefix="audit-stage")
+
+
 def _retrieve_with_timeout(
     retriever: HybridRegulatoryRetriever,
     rejection_text: str,
@@ -103,19 +115,25 @@ class PostRejectionEngine:
     Full Post-Rejection Pipeline:
 
     0. Input Sanitization & Schema Validation
-    1. Clause Matching (LLM)
-    2. Contradiction Detection & Rule Overrides
-    3. Documentation Analysis (LLM + overrides)
-    4. Regulatory Retrieval (Hybrid RAG, timeout-protected)
+    ┌ 1. Clause Matching (LLM)
+    │ 2. Contradiction Detection & Rule Overrides
+    ├ 3. Documentation Analysis (LLM + overrides)
+    └ 4. Regulatory Retrieval (Hybrid RAG, timeout-protected)
+       Steps 1-2, 3 and 4 are independent and run concurrently
+       (engines/stage_graph.py); the two LLM prompts share a decode batch.
+       With fused=True steps 1 and 3 are a single generation instead —
+       unless the rule engine already knows the clause, in which case
+       there is nothing to fuse and the split graph runs.
     5. Safety Gate (confidence check)
     6. Deterministic Scoring
     7. Confidence Calibration
     8. Structured Final Report
     """
 
-    def __init__(self, model, tokenizer):
+    def __init__(self, model, tokenizer, fused: bool = FUSED_AUDIT):
         self.model = model
         self.tokenizer = tokenizer
+        self.fused = fused
         # ✅ Retriever is a lazy singleton — not loaded here
 
     def run(self, request) -> FinalReport:
@@ -137,48 +155,30 @@ class PostRejectionEngine:
         user_explanation = clean_input["user_explanation"]
 
         # --------------------------------------------------
-        # STEP 1: Clause Matching
+        # STEPS 1-4: clause, documentation and retrieval in parallel
         # --------------------------------------------------
-        clause_result = run_clause_matcher(
-            self.model,
-            self.tokenizer,
-            policy_text,
-            rejection_text,
-            user_explanation,
-        )
-
-        # --------------------------------------------------
-        # STEP 2: Logical Enhancements
-        # --------------------------------------------------
-        clause_result = apply_rule_overrides(clause_result, rejection_text)
-
-        clause_result = detect_preexisting_contradiction(
-            clause_result, policy_text, medical_text
-        )
-
-        clause_result = apply_waiting_period_override(
-            clause_result, policy_text, medical_text
-        )
-
-        # --------------------------------------------------
-        # STEP 3: Documentation Analysis
-        # --------------------------------------------------
-        doc_result = run_documentation_analysis(
-            self.model,
-            self.tokenizer,
-            policy_text,
-            rejection_text,
-            medical_text,
-            user_explanation,
-        )
-
-        doc_result = apply_documentation_overrides(doc_result, rejection_text)
-
-        # --------------------------------------------------
-        # STEP 4: Regulatory Retrieval (timeout-protected)
-        # --------------------------------------------------
-        retriever = _get_retriever()
-        regulatory_context = _retrieve_with_timeout(retriever, rejection_text)
+        graph = StageGraph()
+        # A rule-based clause hit leaves only the documentation prompt for the
+        # model — the split stages then run concurrently, fusing would serialise them
+        if self.fused and not classify_rejection_rule_based(rejection_text):
+            graph.add("llm", lambda: run_fused_audit(
+                self.model, self.tokenizer,
+                policy_text, rejection_text, medical_text, user_explanation))
+            graph.add("clause", lambda llm: self._clause_overrides(
+                llm[0], policy_text, rejection_text, medical_text), deps=("llm",))
+            graph.add("docs", lambda llm: apply_documentation_overrides(
+                llm[1], rejection_text), deps=("llm",))
+        else:
+            graph.add("clause", lambda: self._clause_stage(
+                policy_text, rejection_text, medical_text, user_explanation))
+            graph.add("docs", lambda: self._documentation_stage(
+                policy_text, rejection_text, medical_text, user_explanation))
+        graph.add("regulatory", lambda: _retrieve_with_timeout(_get_retriever(), rejection_text))
+        results = graph.run(_STAGE_EXECUTOR)
+
+        clause_result      = results["clause"]
+        doc_result         = results["docs"]
+        regulatory_context = results["regulatory"]
 
         # --------------------------------------------------
         # STEP 5: Safety Gate
@@ -217,4 +217,47 @@ class PostRejectionEngine:
             doc_result=doc_result,
             appeal_strength_data=appeal_strength_data,
             regulatory_context=regulatory_context,
-        )
\ No newline at end of file
+        )
+
+    # --------------------------------------------------
+    # Stages
+    # --------------------------------------------------
+
+    def _clause_stage(self, policy_text, rejection_text, medical_text, user_explanation):
+        # STEP 1: Clause Matching
+        clause_result = run_clause_matcher(
+            self.model,
+            self.tokenizer,
+            policy_text,
+            rejection_text,
+            user_explanation,
+        )
+
+        return self._clause_overrides(
+            clause_result, policy_text, rejection_text, medical_text
+        )
+
+    def _clause_overrides(self, clause_result, policy_text, rejection_text, medical_text):
+        # STEP 2: Logical Enhancements
+        clause_result = apply_rule_overrides(clause_result, rejection_text)
+
+        clause_result = detect_preexisting_contradiction(
+            clause_result, policy_text, medical_text
+        )
+
+        return apply_waiting_period_override(
+            clause_result, policy_text, medical_text
+        )
+
+    def _documentation_stage(self, policy_text, rejection_text, medical_text, user_explanation):
+        # STEP 3: Documentation Analysis
+        doc_result = run_documentation_analysis(
+            self.model,
+            self.tokenizer,
+            policy_text,
+            rejection_text,
+            medical_text,
+            user_explanation,
+        )
+
+        return apply_documentation_overrides(doc_result, rejection_text)
\ No newline at end of file
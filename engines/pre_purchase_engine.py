@@ -12,18 +12,39 @@
 #   6. Calibrated per-field scoring
 #   7. Rating via config thresholds (Strong ≥72, Moderate 48-71, Weak <48)
 #   8. Dynamic buyer checklist (only items relevant to this policy's risks)
+#
+# Full-document mode (run(..., full_document=True)) reads the whole wording
+# instead of its first POLICY_TEXT_CHARS: step 2 becomes a map-reduce over
+# keyword-routed sections (services/policy_sections.py), classified concurrently
+# so they share scheduler decode batches; steps 1 and 4 scan the full text.
+#
+# Reports are cached (memory LRU + SQLite, services/cache_store.py) by a hash
+# of the normalised policy text, the mode, the prompt version and the scoring
+# config version — repeat analyses of the same brochure skip the whole pipeline.
+#
+# run_batch() scores a catalogue: inputs are deduplicated by that cache key,
+# cache hits are returned first, and the rest run concurrently so their LLM
+# calls share scheduler decode batches. Results are yielded as each finishes.
 # ══════════════════════════════════════════════════════════════════════════════
 
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
 
 from services.prepurchase_rule_engine import extract_structured_features
-from llm.prepurchase_prompt import prepurchase_risk_prompt
+from llm.prepurchase_prompt import (
+    prepurchase_risk_prompt,
+    prepurchase_section_prompt,
+    PREPURCHASE_PROMPT_VERSION,
+)
 from llm.generation import generate
 from services.prepurchase_scoring import compute_policy_score
 from services.irdai_compliance_engine import evaluate_irdai_compliance
 from services.broker_risk_engine import analyze_broker_risk
 from config.prepurchase_scoring_config import SCORING_CONFIG
+from services.cache_store import TieredCache, cache_key
+from services.policy_sections import route_sections, merge_field_risks
 
 from schemas.pre_purchase import (
     ClauseRiskAssessment,
@@ -31,6 +52,7 @@ from schemas.pre_purchase import (
     IRDAICompliance,
     PolicyScoreBreakdown,
     BrokerRiskAnalysis,
+    clause_risk_subset,
 )
 
 _NOT_FOUND_DEFAULTS: dict[str, str] = {
@@ -50,6 +72,27 @@ _VALID_VALUES: frozenset[str] = frozenset({
     "High Risk", "Moderate Risk", "Low Risk", "Not Found"
 })
 
+# Policy text the pipeline reads, after whitespace collapse — upload
+# extraction stops once it has this much (ocr.extractor max_chars)
+POLICY_TEXT_CHARS = 1200
+
+# Full-document mode cap — roughly a 100-page wording
+FULL_DOCUMENT_CHARS = 200_000
+
+# Prompts kept in flight for the generation scheduler — twice its decode batch
+# (llm/scheduler.py), so a queued prompt is ready whenever a slot frees up.
+# More threads than this only wait in the scheduler queue.
+_PROMPTS_IN_FLIGHT = 8
+
+# Section classifications of full-document runs (up to 10 fields × 3 sections
+# each), shared by every policy of a run_batch()
+_MAP_EXECUTOR = ThreadPoolExecutor(max_workers=_PROMPTS_IN_FLIGHT, thread_name_prefix="prepurchase-map")
+
+# Policies of one run_batch() in flight at once
+_BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=_PROMPTS_IN_FLIGHT, thread_name_prefix="prepurchase-batch")
+
+_RESULT_CACHE = TieredCache("prepurchase_reports", memory_items=512, disk_bytes=128 * 1024 * 1024)
+
 
 def _safe_json_parse(raw: str) -> dict | None:
     if not raw or raw.strip() in ("{}", ""):
@@ -149,6 +192,30 @@ def _apply_deterministic_overrides(
         clause_risk.transparency_of_terms = "Moderate Risk"
 
 
+def _report_cache_key(policy_text: str, full_document: bool = False) -> str:
+    return cache_key(
+        "prepurchase-full" if full_document else "prepurchase", policy_text,
+        PREPURCHASE_PROMPT_VERSION, SCORING_CONFIG.get("config_version", 0),
+    )
+
+
+def _prepare(policy_text: str, full_document: bool) -> tuple[str, str | None, str]:
+    """
+    (normalised text, raw text to section or None for single-pass, cache key)
+    """
+    # Clean input — sectioning needs the raw line structure
+    raw_text    = policy_text[:FULL_DOCUMENT_CHARS]
+    policy_text = re.sub(r"\s+", " ", raw_text).strip()
+
+    # A policy that fits the single-pass window gains nothing from map-reduce
+    full_document = full_document and len(policy_text) > POLICY_TEXT_CHARS
+    if not full_document:
+        policy_text = policy_text[:POLICY_TEXT_CHARS]
+
+    key = _report_cache_key(policy_text, full_document)
+    return policy_text, raw_text if full_document else None, key
+
+
 def _compute_rating(score: float) -> str:
     strong_t   = float(SCORING_CONFIG.get("rating_strong_threshold",   72))
     moderate_t = float(SCORING_CONFIG.get("rating_moderate_threshold", 48))
@@ -224,35 +291,128 @@ class PrePurchaseEngine:
         self.model     = model
         self.tokenizer = tokenizer
 
-    def run(self, policy_text: str) -> PrePurchaseReport:
-
-        # Clean input
-        policy_text = re.sub(r"\s+", " ", policy_text).strip()
-        policy_text = policy_text[:1200]
-
-        # 1. Deterministic feature extraction
-        features = extract_structured_features(policy_text)
-        print(f"🔍 Features: {features}")
+    def run(self, policy_text: str, full_document: bool = False) -> PrePurchaseReport:
+
+        policy_text, raw_text, key = _prepare(policy_text, full_document)
+
+        cached = _RESULT_CACHE.get(key)
+        if cached is not None:
+            print("⚡ Pre-purchase cache hit")
+            return PrePurchaseReport.model_validate_json(cached)
+
+        return self._run_uncached(policy_text, raw_text, key)
+
+    def run_batch(
+        self,
+        policy_texts: list[str],
+        full_document: bool = False,
+        executor: ThreadPoolExecutor | None = None,
+    ) -> Iterator[tuple[int, PrePurchaseReport | Exception]]:
+        """
+        Score many policies; yields (input index, report) in completion order.
+
+        Identical policies (same cache key) are analysed once and yielded for
+        every index. A policy that fails yields its exception instead of
+        aborting the batch. Closing the iterator cancels policies not started.
+        executor defaults to the shared batch pool.
+        """
+        executor = executor or _BATCH_EXECUTOR
+        groups:   dict[str, list[int]] = {}
+        prepared: dict[str, tuple[str, str | None]] = {}
+        for i, text in enumerate(policy_texts):
+            policy_text, raw_text, key = _prepare(text, full_document)
+            prepared.setdefault(key, (policy_text, raw_text))
+            groups.setdefault(key, []).append(i)
+
+        hits: list[tuple[str, PrePurchaseReport]] = []
+        pending = {}
+        for key, (policy_text, raw_text) in prepared.items():
+            cached = _RESULT_CACHE.get(key)
+            if cached is not None:
+                hits.append((key, PrePurchaseReport.model_validate_json(cached)))
+            else:
+                pending[executor.submit(self._run_uncached, policy_text, raw_text, key)] = key
+
+        print(
+            f"📦 Pre-purchase batch: {len(policy_texts)} policies, {len(groups)} unique, "
+            f"{len(hits)} cached, {len(pending)} to analyse"
+        )
 
-        # 2. LLM clause risk classification
+        try:
+            for key, report in hits:
+                for i in groups[key]:
+                    yield i, report
+
+            for future in as_completed(pending):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"⚠ Batch policy failed: {e}")
+                    result = e
+                for i in groups[pending[future]]:
+                    yield i, result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _run_uncached(self, policy_text: str, raw_text: str | None, key: str) -> PrePurchaseReport:
+        routed = route_sections(raw_text) if raw_text is not None else None
+        report, llm_ok = self._analyse(policy_text, routed)
+        # A degraded (LLM-failed) report is not worth pinning for every later request
+        if llm_ok:
+            _RESULT_CACHE.put(key, report.model_dump_json())
+        return report
+
+    def _classify(self, policy_text: str) -> dict | None:
+        """Single pass over the (truncated) policy text."""
         prompt = prepurchase_risk_prompt(policy_text)
         raw_output = generate(
             prompt, self.model, self.tokenizer,
-            json_mode=True, max_new_tokens=400,
+            schema=ClauseRiskAssessment, max_new_tokens=400,
         )
-        if not raw_output or raw_output.strip() in ("{}", ""):
-            print("⚠ LLM empty — retrying")
-            raw_output = generate(
-                prompt, self.model, self.tokenizer,
-                json_mode=True, max_new_tokens=400,
-            )
 
         parsed = _safe_json_parse(raw_output)
         if parsed is None:
             print("⚠ JSON parse failed — deterministic fallback only")
         print("RAW LLM OUTPUT:", (raw_output or "EMPTY")[:300])
+        return parsed
+
+    def _classify_sections(self, routed: list) -> dict | None:
+        """Map each routed section to its fields, reduce to one label per field."""
+
+        def classify(item) -> dict | None:
+            section, fields = item
+            raw_output = generate(
+                prepurchase_section_prompt(re.sub(r"\s+", " ", section.text), fields),
+                self.model, self.tokenizer,
+                schema=clause_risk_subset(fields), max_new_tokens=40 * len(fields),
+            )
+            return _safe_json_parse(raw_output)
+
+        results = [r for r in _MAP_EXECUTOR.map(classify, routed) if r is not None]
+        print(f"🔄 Map-reduce: {len(results)}/{len(routed)} sections classified")
+        if not results:
+            print("⚠ No section parsed — deterministic fallback only")
+            return None
+        return merge_field_risks(results)
+
+    def _analyse(self, policy_text: str, routed: list | None = None) -> tuple[PrePurchaseReport, bool]:
+
+        # 1. Deterministic feature extraction
+        features = extract_structured_features(policy_text)
+        print(f"🔍 Features: {features}")
+
+        # 2. LLM clause risk classification — decoding is constrained to the
+        #    schema, so every value is already one of the four risk labels.
+        #    Full-document runs classify routed sections instead; a wording
+        #    with no routable section falls back to its opening window.
+        if routed:
+            parsed = self._classify_sections(routed)
+        else:
+            parsed = self._classify(policy_text[:POLICY_TEXT_CHARS])
 
         # 3. Build ClauseRiskAssessment
+        llm_ok = False
         try:
             if parsed is None:
                 raise ValueError("LLM output invalid")
@@ -262,6 +422,7 @@ class PrePurchaseEngine:
             for key, default in _NOT_FOUND_DEFAULTS.items():
                 parsed.setdefault(key, default)
             clause_risk = ClauseRiskAssessment(**parsed)
+            llm_ok = True
             print("✅ LLM clause parse OK")
         except Exception as e:
             print(f"⚠ Clause build failed ({e}) — using defaults")
@@ -331,7 +492,7 @@ class PrePurchaseEngine:
             ),
         )
 
-        return PrePurchaseReport(
+        report = PrePurchaseReport(
             clause_risk=clause_risk,
             score_breakdown=score_breakdown,
             overall_policy_rating=rating,
@@ -345,4 +506,5 @@ class PrePurchaseEngine:
             positive_flags=score_data.get("positive_flags", []),
             irdai_compliance=irdai_compliance,
             broker_risk_analysis=broker_risk_analysis,
-        )
\ No newline at end of file
+        )
+        return report, llm_ok
\ No newline at end of file
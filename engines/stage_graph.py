@@ -0,0 +1,63 @@
+# engines/stage_graph.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Stage Dependency Graph
+#
+# Tiny DAG runner for engine pipelines. Each stage is a callable that receives
+# the results of the stages it depends on as keyword arguments. A stage is
+# submitted to the executor as soon as all of its dependencies have finished,
+# so independent stages (e.g. two LLM prompts and a FAISS lookup) overlap.
+#
+# LLM stages that start together reach the generation scheduler within its
+# admit window and are prefilled / decoded as one batch.
+#
+# The calling thread only coordinates — it never runs a stage — so a small
+# shared executor cannot deadlock on stages waiting for their dependencies.
+# ══════════════════════════════════════════════════════════════════════════════
+
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable
+
+
+class StageGraph:
+
+    def __init__(self):
+        self._stages: dict[str, tuple[Callable[..., Any], tuple[str, ...]]] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], deps: tuple[str, ...] = ()) -> "StageGraph":
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def run(self, executor: Executor) -> dict[str, Any]:
+        """
+        Run every stage and return {stage name: result}.
+        The first stage to raise cancels whatever has not started and re-raises.
+        """
+        results: dict[str, Any] = {}
+        running: dict[Future, str] = {}
+        waiting = dict(self._stages)
+
+        def _launch_ready() -> None:
+            for name, (fn, deps) in list(waiting.items()):
+                if all(dep in results for dep in deps):
+                    kwargs = {dep: results[dep] for dep in deps}
+                    running[executor.submit(fn, **kwargs)] = name
+                    del waiting[name]
+
+        _launch_ready()
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+            _launch_ready()
+
+        return results
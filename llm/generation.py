@@ -1,7 +1,29 @@
 import torch
 import re
 import json
-import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from queue import Empty
+from typing import Iterator
+
+from transformers import TextIteratorStreamer
+
+from llm.json_constraint import JsonSchemaConstraint
+from llm.prefix_cache import common_prefix
+from llm.prompts import CLAUSE_MATCHING_HEADER, DOCUMENTATION_ANALYSIS_HEADER, FUSED_AUDIT_HEADER
+from llm.prepurchase_prompt import PREPURCHASE_RISK_HEADER, PREPURCHASE_RISK_RULES
+from llm.scheduler import get_scheduler
+
+# Static prompt headers whose KV cache the scheduler keeps warm.
+# "" covers the chat template + system message shared by every prompt.
+_STATIC_HEADERS = {
+    "clause_matching":        (CLAUSE_MATCHING_HEADER, True),
+    "documentation_analysis": (DOCUMENTATION_ANALYSIS_HEADER, True),
+    "fused_audit":            (FUSED_AUDIT_HEADER, True),
+    "prepurchase_risk":       (PREPURCHASE_RISK_HEADER, True),
+    "prepurchase_rules":      (PREPURCHASE_RISK_RULES, True),
+    "system_json":            ("", True),
+    "system_text":            ("", False),
+}
 
 
 def generate(
@@ -12,9 +34,201 @@ def generate(
     json_mode: bool = False,
     timeout: int = 300,
     temperature: float = 0.0,
+    schema=None,
+    kv_slot=None,
 ):
     """
     Robust generator for MedGemma 4B-IT.
+
+    Prompts from every engine are queued on the shared scheduler
+    (llm/scheduler.py) and decoded in dynamic batches.
+
+    Passing a Pydantic schema implies json_mode and constrains decoding to
+    that schema (llm/json_constraint.py), so the output always parses.
+    If the constraint did not close the JSON — the schema failed to compile,
+    the decode was cut off, or the request timed out / errored — and the
+    output does not parse, the call is retried once, as the engines used to
+    do themselves.
+
+    prompt may also be a list of chat messages (multi-turn). With a KVSlot
+    the conversation's cache is reused and refreshed in place.
+    """
+    json_mode = json_mode or schema is not None
+    args = (prompt, model, tokenizer, max_new_tokens, json_mode, timeout, schema, kv_slot)
+
+    output, constrained = _generate_once(*args)
+    if schema is None or constrained or _parses(output):
+        return output
+
+    print(f"⚠ {schema.__name__}: constrained JSON incomplete and output did not parse — retrying once")
+    return _generate_once(*args)[0]
+
+
+def _parses(output: str) -> bool:
+    try:
+        return bool(json.loads(output))
+    except (TypeError, ValueError):
+        return False
+
+
+def _generate_once(
+    prompt, model, tokenizer, max_new_tokens: int, json_mode: bool, timeout: int, schema, kv_slot,
+) -> tuple[str, bool]:
+    """One scheduler round trip: (output, whether the schema constraint closed the JSON)."""
+    encoded = _encode_prompt(prompt, model, tokenizer, json_mode, max_new_tokens)
+    if encoded is None:
+        return ("{}" if json_mode else ""), False
+    input_ids, eos_id, pad_id = encoded
+
+    constraint = None
+    if schema is not None:
+        try:
+            constraint = JsonSchemaConstraint(schema, tokenizer, max_tokens=max_new_tokens)
+        except (TypeError, ValueError) as e:
+            print(f"⚠ Constrained decoding unavailable for {schema.__name__} ({e}) — unconstrained JSON")
+
+    # --------------------------------------------------
+    # Hand off to the continuous-batching scheduler
+    # --------------------------------------------------
+    request = get_scheduler(model, tokenizer).submit(
+        input_ids[0],
+        max_new_tokens=max_new_tokens,
+        eos_id=eos_id,
+        pad_id=pad_id,
+        constraint=constraint,
+        kv_slot=kv_slot,
+    )
+
+    try:
+        new_tokens = request.future.result(timeout=timeout)
+    except FutureTimeoutError:
+        request.cancelled = True
+        print(f"⚠ Generation timed out")
+        return ("{}" if json_mode else ""), False
+    except Exception as e:
+        print("❌ Generation error:", e)
+        return ("{}" if json_mode else ""), False
+
+    # --------------------------------------------------
+    # Decode
+    # --------------------------------------------------
+    print(f"New tokens generated: {len(new_tokens)}")
+
+    decoded = tokenizer.decode(
+        new_tokens,
+        skip_special_tokens=True,
+        clean_up_tokenization_spaces=True,
+    ).strip()
+
+    if not decoded:
+        decoded_raw = tokenizer.decode(new_tokens, skip_special_tokens=False)
+        decoded = re.sub(r"<[^>]+>", "", decoded_raw).strip()
+
+        if not decoded:
+            return ("{}" if json_mode else ""), False
+
+    print("MODEL RAW OUTPUT:", repr(decoded[:300]))
+
+    if constraint is not None and constraint.done:
+        return decoded, True
+
+    if json_mode:
+        # Field salvage only knows the pre-purchase risk keys
+        salvage = schema is None or set(schema.model_fields) <= set(_KEYS)
+        return _extract_json(decoded, salvage), False
+
+    return decoded, False
+
+
+def generate_stream(
+    prompt: str,
+    model,
+    tokenizer,
+    max_new_tokens: int = 150,
+    timeout: int = 300,
+    temperature: float = 0.0,
+    kv_slot=None,
+) -> Iterator[str]:
+    """
+    Streaming variant of generate() for free-text answers.
+
+    Yields decoded text pieces as the scheduler produces tokens, via a
+    TextIteratorStreamer attached to the request. Closing the iterator
+    early cancels the request so its batch slot is freed. kv_slot is
+    refreshed before the stream ends.
+    """
+    encoded = _encode_prompt(prompt, model, tokenizer, False, max_new_tokens)
+    if encoded is None:
+        return
+    input_ids, eos_id, pad_id = encoded
+
+    # timeout bounds the wait for each piece, not the whole decode
+    streamer = TextIteratorStreamer(
+        tokenizer,
+        skip_prompt=True,
+        timeout=timeout,
+        skip_special_tokens=True,
+        clean_up_tokenization_spaces=True,
+    )
+    request = get_scheduler(model, tokenizer).submit(
+        input_ids[0],
+        max_new_tokens=max_new_tokens,
+        eos_id=eos_id,
+        pad_id=pad_id,
+        streamer=streamer,
+        kv_slot=kv_slot,
+    )
+
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+    except Empty:
+        print(f"⚠ Streaming generation timed out")
+    finally:
+        request.cancelled = True   # no-op if already finished
+
+
+# --------------------------------------------------
+# PREFIX CACHE WARM-UP
+# --------------------------------------------------
+
+def warm_prefix_cache(model, tokenizer) -> None:
+    """
+    Register every static prompt header with the scheduler's prefix cache.
+    The worker prefills them in the background while it is idle.
+    """
+    scheduler = get_scheduler(model, tokenizer)
+    for name, (header, json_mode) in _STATIC_HEADERS.items():
+        ids = _header_ids(header, model, tokenizer, json_mode)
+        if ids is not None and ids.shape[0] > 0:
+            scheduler.register_prefix(name, ids)
+    print(f"✅ Prefix cache: {len(_STATIC_HEADERS)} static header(s) registered")
+
+
+def _header_ids(header: str, model, tokenizer, json_mode: bool):
+    """
+    Token ids of the chat-wrapped prompt up to the end of `header`.
+    Encodes the header with two different tails and keeps what they share,
+    so template tokens after the user turn and boundary merges are excluded.
+    """
+    a = _encode_prompt(header + "A", model, tokenizer, json_mode, 0)
+    b = _encode_prompt(header + "Z", model, tokenizer, json_mode, 0)
+    if a is None or b is None:
+        return None
+    return common_prefix(a[0][0], b[0][0])
+
+
+# --------------------------------------------------
+# PROMPT ENCODING
+# --------------------------------------------------
+
+def _encode_prompt(prompt: str | list[dict], model, tokenizer, json_mode: bool, max_new_tokens: int):
+    """
+    Wrap the prompt in the Gemma chat format and tokenise it.
+    A list prompt is a multi-turn conversation; the system message goes
+    into its first user turn.
+    Returns (input_ids, eos_id, pad_id), or None if tokenisation failed.
     """
 
     # --------------------------------------------------
@@ -42,12 +256,14 @@ def generate(
     else:
         system_msg = "Give clear and direct answers."
 
+    if isinstance(prompt, str):
+        prompt = [{"role": "user", "content": prompt}]
     messages = [
-        {"role": "user", "content": f"{system_msg}\n\n{prompt}"},
+        {"role": m["role"], "content": f"{system_msg}\n\n{m['content']}" if i == 0 else m["content"]}
+        for i, m in enumerate(prompt)
     ]
 
     input_ids = None
-    attention_mask = None
 
     # --------------------------------------------------
     # apply_chat_template (preferred)
@@ -66,8 +282,6 @@ def generate(
         else:
             input_ids = chat_result["input_ids"].to(model.device)
 
-        attention_mask = torch.ones_like(input_ids)
-
         print(f"✅ apply_chat_template OK — {input_ids.shape[1]} tokens")
 
     except Exception as e:
@@ -79,12 +293,11 @@ def generate(
     # --------------------------------------------------
     if input_ids is None:
         bos = tokenizer.bos_token or "<bos>"
-        gemma_prompt = (
-            f"{bos}<start_of_turn>user\n"
-            f"{system_msg}\n\n{prompt}"
-            f"<end_of_turn>\n"
-            f"<start_of_turn>model\n"
-        )
+        gemma_prompt = bos + "".join(
+            f"<start_of_turn>{'user' if m['role'] == 'user' else 'model'}\n"
+            f"{m['content']}<end_of_turn>\n"
+            for m in messages
+        ) + "<start_of_turn>model\n"
 
         try:
             inputs = tokenizer(
@@ -96,100 +309,24 @@ def generate(
             ).to(model.device)
 
             input_ids = inputs["input_ids"]
-            attention_mask = inputs["attention_mask"]
 
             print(f"✅ Gemma fallback OK — {input_ids.shape[1]} tokens")
 
         except Exception as e:
             print(f"❌ fallback failed ({e})")
-            return "{}" if json_mode else ""
+            return None
 
     input_len = input_ids.shape[1]
     print(f"Input tokens: {input_len} | Max new: {max_new_tokens}")
 
-    result_container = {"output": None, "error": None}
-
-    # --------------------------------------------------
-    # Generation thread
-    # --------------------------------------------------
-    def _run():
-        try:
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-
-            with torch.no_grad():
-                output = model.generate(
-                    input_ids=input_ids,
-                    attention_mask=attention_mask,
-
-                    max_new_tokens=max_new_tokens,
-                    
-
-                    # deterministic = safer for structured output
-                    do_sample=False,
-                    temperature=0.1,
-
-                    repetition_penalty=1.1,
-                    use_cache=True,
-
-                    eos_token_id=eos_id,
-                    pad_token_id=pad_id,
-
-                    early_stopping=True,
-                )
-
-            result_container["output"] = output
-
-        except Exception as e:
-            result_container["error"] = e
-
-    thread = threading.Thread(target=_run, daemon=True)
-    thread.start()
-    thread.join(timeout)
-
-    if thread.is_alive():
-        print(f"⚠ Generation timed out")
-        return "{}" if json_mode else ""
-
-    if result_container["error"]:
-        print("❌ Generation error:", result_container["error"])
-        return "{}" if json_mode else ""
-
-    if result_container["output"] is None:
-        return "{}" if json_mode else ""
-
-    # --------------------------------------------------
-    # Decode
-    # --------------------------------------------------
-    new_tokens = result_container["output"][0][input_len:]
-    print(f"New tokens generated: {len(new_tokens)}")
-
-    decoded = tokenizer.decode(
-        new_tokens,
-        skip_special_tokens=True,
-        clean_up_tokenization_spaces=True,
-    ).strip()
-
-    if not decoded:
-        decoded_raw = tokenizer.decode(new_tokens, skip_special_tokens=False)
-        decoded = re.sub(r"<[^>]+>", "", decoded_raw).strip()
-
-        if not decoded:
-            return "{}" if json_mode else ""
-
-    print("MODEL RAW OUTPUT:", repr(decoded[:300]))
-
-    if json_mode:
-        return _extract_json(decoded)
-
-    return decoded
+    return input_ids, eos_id, pad_id
 
 
 # --------------------------------------------------
 # JSON EXTRACTION
 # --------------------------------------------------
 
-def _extract_json(text: str) -> str:
+def _extract_json(text: str, salvage: bool = True) -> str:
     try:
         parsed = json.loads(text.strip())
         if isinstance(parsed, dict):
@@ -204,7 +341,7 @@ def _extract_json(text: str) -> str:
         except:
             pass
 
-    return _salvage_json(text)
+    return _salvage_json(text) if salvage else "{}"
 
 
 # --------------------------------------------------
@@ -0,0 +1,294 @@
+# llm/json_constraint.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Schema-Constrained JSON Decoding
+#
+# Compiles a flat Pydantic output schema (ClauseRiskAssessment,
+# ClauseMatchResult, DocumentationAnalysisResult) into a token-level state
+# machine. At every decode step the scheduler asks which tokens are allowed
+# and masks everything else, so MedGemma can only ever emit:
+#
+#   {"field": <value>, "field": <value>, ...}
+#
+# with keys in schema order and values drawn from:
+#   Literal[...]  → one of the allowed strings (token trie)
+#   bool          → true | false
+#   str           → free text without quotes, backslashes or control chars
+#   List[str]     → [] or ["...", "..."] with a bounded item count
+#
+# Keys, braces and any enum tail that only one option can complete are
+# "forced": forced_run() returns them so the scheduler can append them
+# without spending a forward pass per token (jump-forward).
+#
+# Pure Python — no torch. The scheduler turns allowed() into a logits mask.
+# ══════════════════════════════════════════════════════════════════════════════
+
+import copy
+import re
+import threading
+from typing import Literal, get_args, get_origin
+
+# Free-text fields are capped so the JSON always closes inside max_new_tokens:
+# with a max_tokens budget the per-string cap shrinks until the worst case
+# (every string and list item at the cap) fits, and a schema that cannot fit
+# _MIN_STRING_TOKENS per string is refused (generate() falls back to plain JSON)
+_MAX_STRING_TOKENS = 80
+_MIN_STRING_TOKENS = 8
+_MAX_LIST_ITEMS    = 6
+
+# Tokens that may not appear inside a JSON string we emit verbatim
+_UNSAFE_IN_STRING = re.compile(r'["\\\x00-\x1f\x7f]')
+
+
+class _Literal:
+    def __init__(self, ids: list[int]):
+        self.ids = ids
+
+
+class _Choice:
+    def __init__(self, options: list[list[int]]):
+        self.options = options
+
+
+class _FreeString:
+    pass
+
+
+class _StringList:
+    def __init__(self, open_item: list[int], next_item: list[int], close: list[int]):
+        self.open_item = open_item    # '"'
+        self.next_item = next_item    # ', "'
+        self.close     = close        # ']'
+
+
+_STRING = _FreeString()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SCHEMA COMPILATION
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _encode(tokenizer, text: str) -> list[int]:
+    ids = tokenizer.encode(text, add_special_tokens=False)
+    # A tokenizer that injects a prefix space would corrupt enum values
+    if tokenizer.decode(ids) != text:
+        raise ValueError(f"tokenizer does not round-trip {text!r}")
+    return ids
+
+
+class _CompiledSchema:
+    def __init__(self, schema, tokenizer):
+        self.quote_id = self._single(tokenizer, '"')
+        self.ops: list = []
+        self.fixed_tokens = 0     # worst-case grammar tokens outside free text
+        self.free_slots   = 0     # free strings, counting every possible list item
+
+        pending = "{"
+        for i, (name, field) in enumerate(schema.model_fields.items()):
+            pending += ("" if i == 0 else ", ") + f'"{name}": '
+            annotation = field.annotation
+            origin     = get_origin(annotation)
+
+            if origin is Literal:
+                self.ops.append(_Literal(_encode(tokenizer, pending + '"')))
+                self.ops.append(_Choice([_encode(tokenizer, f'{v}"') for v in get_args(annotation)]))
+            elif annotation is bool:
+                self.ops.append(_Literal(_encode(tokenizer, pending)))
+                self.ops.append(_Choice([_encode(tokenizer, "true"), _encode(tokenizer, "false")]))
+            elif annotation is str:
+                self.ops.append(_Literal(_encode(tokenizer, pending + '"')))
+                self.ops.append(_STRING)
+            elif origin is list and get_args(annotation) == (str,):
+                self.ops.append(_Literal(_encode(tokenizer, pending + "[")))
+                self.ops.append(_StringList(
+                    open_item=[self.quote_id],
+                    next_item=_encode(tokenizer, ', "'),
+                    close=_encode(tokenizer, "]"),
+                ))
+            else:
+                raise TypeError(f"unsupported field for constrained decoding: {name}: {annotation}")
+            pending = ""
+
+        self.ops.append(_Literal(_encode(tokenizer, "}")))
+
+        for op in self.ops:
+            if isinstance(op, _Literal):
+                self.fixed_tokens += len(op.ids)
+            elif isinstance(op, _Choice):
+                self.fixed_tokens += max(len(o) for o in op.options)
+            elif op is _STRING:
+                self.fixed_tokens += 1                          # closing quote
+                self.free_slots   += 1
+            else:
+                per_item = max(len(op.open_item), len(op.next_item)) + 1
+                self.fixed_tokens += _MAX_LIST_ITEMS * per_item + len(op.close)
+                self.free_slots   += _MAX_LIST_ITEMS
+
+    @staticmethod
+    def _single(tokenizer, text: str) -> int:
+        ids = _encode(tokenizer, text)
+        if len(ids) != 1:
+            raise ValueError(f"{text!r} is not a single token")
+        return ids[0]
+
+
+_compiled: dict[tuple[type, int], _CompiledSchema] = {}
+_string_safe: dict[int, list[int]] = {}
+_compile_lock = threading.Lock()
+
+
+def _compiled_for(schema, tokenizer) -> _CompiledSchema:
+    key = (schema, id(tokenizer))
+    if key not in _compiled:
+        with _compile_lock:
+            if key not in _compiled:
+                _compiled[key] = _CompiledSchema(schema, tokenizer)
+    return _compiled[key]
+
+
+def string_safe_token_ids(tokenizer) -> list[int]:
+    """
+    Vocabulary ids allowed inside a free-text JSON string.
+    Excludes quotes, backslashes, control chars, byte-fallback and special tokens.
+    Computed once per tokenizer — one pass over the vocab.
+    """
+    key = id(tokenizer)
+    if key not in _string_safe:
+        with _compile_lock:
+            if key not in _string_safe:
+                special = set(tokenizer.all_special_ids)
+                pieces  = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+                _string_safe[key] = [
+                    i for i, piece in enumerate(pieces)
+                    if piece
+                    and i not in special
+                    and not _UNSAFE_IN_STRING.search(piece)
+                    and not (piece.startswith("<") and piece.endswith(">"))
+                ]
+    return _string_safe[key]
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# DECODE-TIME STATE MACHINE
+# ══════════════════════════════════════════════════════════════════════════════
+
+class JsonSchemaConstraint:
+    """
+    Per-request constraint state. One instance per generation.
+
+    allowed()     → (token ids, free_string) — the next-token whitelist;
+                    free_string=True also admits every string-safe token
+    advance(id)   → consume one emitted token
+    forced_run()  → tokens fully determined by the grammar from here on
+    done          → the JSON object is closed
+    """
+
+    def __init__(self, schema, tokenizer, max_tokens: int | None = None):
+        """
+        max_tokens: the generation's max_new_tokens — free strings are capped
+        so the closed object always fits. ValueError if it cannot.
+        """
+        compiled   = _compiled_for(schema, tokenizer)
+        self._ops  = compiled.ops
+        self._quote = compiled.quote_id
+
+        self.string_cap = _MAX_STRING_TOKENS
+        if max_tokens is not None and compiled.free_slots:
+            spare = max_tokens - compiled.fixed_tokens
+            self.string_cap = min(_MAX_STRING_TOKENS, spare // compiled.free_slots)
+            if self.string_cap < _MIN_STRING_TOKENS:
+                raise ValueError(
+                    f"{schema.__name__} cannot close within {max_tokens} tokens "
+                    f"({compiled.fixed_tokens} fixed + {compiled.free_slots} strings)"
+                )
+        self.reset()
+
+    def reset(self) -> None:
+        self._op     = 0
+        self._prefix: list[int] = []   # tokens emitted in the current literal / choice
+        self._count  = 0               # tokens in the current free string
+        self._phase  = "open"          # _StringList: open → string → sep → string ...
+        self._items  = 0
+
+    @property
+    def done(self) -> bool:
+        return self._op >= len(self._ops)
+
+    def allowed(self) -> tuple[list[int], bool]:
+        if self.done:
+            return [], False
+
+        expect = self._expect()
+        if expect is _STRING:
+            return [self._quote], self._count < self.string_cap
+        if isinstance(expect, _Literal):
+            return [expect.ids[len(self._prefix)]], False
+
+        k = len(self._prefix)
+        return sorted({
+            option[k] for option in expect.options
+            if option[:k] == self._prefix and len(option) > k
+        }), False
+
+    def advance(self, token_id: int) -> None:
+        expect = self._expect()
+
+        if expect is _STRING:
+            if token_id == self._quote:
+                self._end_part(None)
+            else:
+                self._count += 1
+            return
+
+        self._prefix.append(token_id)
+        if isinstance(expect, _Literal):
+            if len(self._prefix) == len(expect.ids):
+                self._end_part(expect.ids)
+        elif self._prefix in expect.options:
+            self._end_part(list(self._prefix))
+
+    def forced_run(self) -> list[int]:
+        probe = copy.copy(self)
+        probe._prefix = list(self._prefix)
+
+        forced: list[int] = []
+        while not probe.done:
+            ids, free_string = probe.allowed()
+            if free_string or len(ids) != 1:
+                break
+            probe.advance(ids[0])
+            forced.append(ids[0])
+        return forced
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+
+    def _expect(self):
+        op = self._ops[self._op]
+        if not isinstance(op, _StringList):
+            return op
+        if self._phase == "string":
+            return _STRING
+        if self._phase == "open":
+            return _Choice([op.close, op.open_item])
+        if self._items >= _MAX_LIST_ITEMS:
+            return _Literal(op.close)
+        return _Choice([op.next_item, op.close])
+
+    def _end_part(self, ids: list[int] | None) -> None:
+        op = self._ops[self._op]
+        self._prefix = []
+        self._count  = 0
+
+        if isinstance(op, _StringList) and ids != op.close:
+            if self._phase == "string":
+                self._phase = "sep"
+            else:
+                self._phase  = "string"
+                self._items += 1
+            return
+
+        self._op    += 1
+        self._phase  = "open"
+        self._items  = 0
@@ -0,0 +1,127 @@
+# llm/prefix_cache.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Shared-Prefix KV Cache
+#
+# clause_matching_prompt, documentation_analysis_prompt and
+# prepurchase_risk_prompt all open with a long fixed instruction block, and
+# generate() wraps every prompt in the same chat template + system message.
+# That boilerplate used to be re-prefilled on every call.
+#
+# Each static header is registered once as token ids (chat template included).
+# The scheduler prefills it a single time and keeps the past_key_values;
+# a prompt whose ids start with a registered header gets a copy of that
+# cache and only the variable policy / rejection text is prefilled.
+#
+# Matching is by token ids, not text — if a header tokenises differently
+# inside a real prompt (merge across the boundary) it simply misses.
+#
+# KVSlot is the per-conversation counterpart: the /chat session keeps the
+# cache of everything fed to the model so far (services/chat_memory.py),
+# and the next turn reuses the longest common token prefix.
+# ══════════════════════════════════════════════════════════════════════════════
+
+import copy
+import threading
+
+import torch
+
+
+class PrefixEntry:
+    """Token ids of one static header and, once prefilled, its KV cache."""
+
+    def __init__(self, name: str, ids: torch.Tensor):
+        self.name  = name
+        self.ids   = ids        # 1-D LongTensor on model.device
+        self.cache = None       # past_key_values for ids, filled by the scheduler
+        self.hits  = 0
+
+    def __len__(self) -> int:
+        return self.ids.shape[0]
+
+
+class PrefixCache:
+    """
+    Registry of static prompt headers for one model.
+    register() may be called from any thread; fill and lookup run on the
+    scheduler's worker thread, which owns the GPU.
+    """
+
+    def __init__(self):
+        self._entries: list[PrefixEntry] = []
+        self._lock = threading.Lock()
+
+    def register(self, name: str, ids: torch.Tensor) -> None:
+        with self._lock:
+            if any(e.ids.shape == ids.shape and torch.equal(e.ids, ids) for e in self._entries):
+                return
+            self._entries.append(PrefixEntry(name, ids))
+            # Longest first, so lookup returns the most specific header
+            self._entries.sort(key=len, reverse=True)
+
+    def discard(self, entry: PrefixEntry) -> None:
+        with self._lock:
+            if entry in self._entries:
+                self._entries.remove(entry)
+
+    def unfilled(self) -> list[PrefixEntry]:
+        with self._lock:
+            return [e for e in self._entries if e.cache is None]
+
+    def lookup(self, input_ids: torch.Tensor) -> PrefixEntry | None:
+        """Longest prefilled header that input_ids strictly extends."""
+        with self._lock:
+            entries = list(self._entries)
+        for entry in entries:
+            n = len(entry)
+            if entry.cache is None or input_ids.shape[0] <= n:
+                continue
+            if torch.equal(input_ids[:n], entry.ids):
+                entry.hits += 1
+                return entry
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                e.name: {"tokens": len(e), "ready": e.cache is not None, "hits": e.hits}
+                for e in self._entries
+            }
+
+
+class KVSlot:
+    """
+    Holder for one conversation's KV cache between turns.
+    The scheduler reads `cache` on admit and writes the new ids / cache back
+    when the request retires; an empty slot just means a full prefill.
+    """
+
+    def __init__(self):
+        self.ids   = None      # 1-D LongTensor — tokens the cache covers
+        self.cache = None
+
+    @property
+    def nbytes(self) -> int:
+        if self.cache is None:
+            return 0
+        layers = getattr(self.cache, "layers", None)
+        if layers is not None:
+            tensors = [t for layer in layers for t in (layer.keys, layer.values) if t is not None]
+        else:
+            tensors = list(self.cache.key_cache) + list(self.cache.value_cache)
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def clear(self) -> None:
+        self.ids, self.cache = None, None
+
+
+def clone_cache(cache):
+    """Independent copy of a prefilled cache — decode appends to it in place."""
+    return copy.deepcopy(cache)
+
+
+def common_prefix(a: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
+    """Leading ids shared by two 1-D tensors."""
+    n = min(a.shape[0], b.shape[0])
+    diff = (a[:n] != b[:n]).nonzero()
+    return a[: int(diff[0]) if diff.numel() else n]
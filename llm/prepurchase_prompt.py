@@ -1,17 +1,10 @@
-def prepurchase_risk_prompt(policy_text: str) -> str:
-    """
-    Prompt for MedGemma 4B-IT via apply_chat_template.
+# Bump whenever the prompt text changes — cached pre-purchase results are keyed on it
+PREPURCHASE_PROMPT_VERSION = 2
 
-    This is the USER turn content only — the system instruction is
-    injected by generation.py via the chat template messages list.
-
-    Key design decisions:
-    - Compact classification guide (saves tokens, model still gets full guidance)
-    - Example output right before the policy text (in-context learning)
-    - Explicit "JSON OUTPUT:" marker right at the end (anchors assistant turn)
-    - No unicode box-drawing chars (some tokenizers mangle them)
-    """
-    return f"""Classify 10 health insurance policy clauses by risk level.
+# Classification guide shared by the single-pass and per-section prompts.
+# Both are static headers — their KV caches are kept warm by the scheduler
+# (llm/prefix_cache.py). Output contracts come after, one per prompt.
+PREPURCHASE_RISK_RULES = """Classify health insurance policy clauses by risk level.
 
 ALLOWED VALUES (use EXACT wording only):
 "Low Risk" | "Moderate Risk" | "High Risk" | "Not Found"
@@ -40,10 +33,12 @@ SEMANTIC HINTS:
 - "room rent limited to X% of sum insured" -> room rent sublimit
 - "free look", "grievance", "ombudsman" -> transparency signals
 
-OUTPUT: JSON object with exactly these 10 keys. No text before or after.
+"""
+
+PREPURCHASE_RISK_HEADER = PREPURCHASE_RISK_RULES + """OUTPUT: JSON object with exactly these 10 keys. No text before or after.
 
 EXAMPLE (use real values from the policy, not these):
-{{
+{
   "waiting_period": "Moderate Risk",
   "pre_existing_disease": "High Risk",
   "room_rent_sublimit": "High Risk",
@@ -54,9 +49,43 @@ EXAMPLE (use real values from the policy, not these):
   "sublimits_and_caps": "Moderate Risk",
   "restoration_benefit": "High Risk",
   "transparency_of_terms": "Low Risk"
-}}
+}
+
+"""
+
+
+def prepurchase_risk_prompt(policy_text: str) -> str:
+    """
+    Prompt for MedGemma 4B-IT via apply_chat_template.
+
+    This is the USER turn content only — the system instruction is
+    injected by generation.py via the chat template messages list.
 
-POLICY TEXT:
+    Key design decisions:
+    - Compact classification guide (saves tokens, model still gets full guidance)
+    - Example output right before the policy text (in-context learning)
+    - Explicit "JSON OUTPUT:" marker right at the end (anchors assistant turn)
+    - No unicode box-drawing chars (some tokenizers mangle them)
+    """
+    return PREPURCHASE_RISK_HEADER + f"""POLICY TEXT:
 {policy_text}
 
-JSON OUTPUT:"""
\ No newline at end of file
+JSON OUTPUT:"""
+
+
+def prepurchase_section_prompt(section_text: str, fields: tuple[str, ...]) -> str:
+    """
+    Map-step prompt for full-document analysis (services/policy_sections.py):
+    one section of a longer wording, classified only for the clause keys it
+    was routed to. Shares PREPURCHASE_RISK_RULES — and so its warm prefix
+    KV — with the single-pass prompt; the output contract lists only the
+    routed keys.
+    """
+    return PREPURCHASE_RISK_RULES + f"""POLICY SECTION (one part of a longer policy):
+{section_text}
+
+OUTPUT: JSON object with exactly these {len(fields)} keys: {", ".join(fields)}
+No other keys. No text before or after.
+Use "Not Found" for a key this section does not actually address.
+
+JSON OUTPUT:"""
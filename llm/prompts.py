@@ -1,13 +1,11 @@
 # llm/prompts.py
+#
+# Static instruction blocks are module constants so the scheduler can keep
+# their KV cache warm (llm/prefix_cache.py). Anything that varies per call
+# must go after the header — never inside it.
 
 
-def clause_matching_prompt(
-    policy_text: str,
-    rejection_text: str,
-    user_context: str | None = None,
-) -> str:
-
-    return f"""You are a structured insurance claim audit AI specialising in Indian health insurance policies.
+CLAUSE_MATCHING_HEADER = """You are a structured insurance claim audit AI specialising in Indian health insurance policies.
 
 TASK: Identify which policy clause category is being applied in the claim rejection.
 
@@ -40,16 +38,25 @@ STRICT RULES:
 - Output ONLY the JSON object. No text before or after.
 
 EXAMPLE OUTPUT:
-{{
+{
   "clause_category": "Waiting period",
   "clause_detected": "Claims for any illness within the first 30 days of policy inception shall not be admissible.",
   "clause_clarity": "High",
   "rejection_alignment": "Strong",
   "explanation": "The rejection cites a 30-day waiting period. Policy clearly states claims within first 30 days are inadmissible.",
   "confidence": "High"
-}}
+}
+
+"""
 
-POLICY TEXT:
+
+def clause_matching_prompt(
+    policy_text: str,
+    rejection_text: str,
+    user_context: str | None = None,
+) -> str:
+
+    return CLAUSE_MATCHING_HEADER + f"""POLICY TEXT:
 {policy_text}
 
 REJECTION TEXT:
@@ -61,14 +68,7 @@ USER CONTEXT:
 JSON OUTPUT:"""
 
 
-def documentation_analysis_prompt(
-    policy_text: str,
-    rejection_text: str,
-    medical_text: str | None = None,
-    user_context: str | None = None,
-) -> str:
-
-    return f"""You are a structured insurance documentation audit AI specialising in Indian health insurance claims.
+DOCUMENTATION_ANALYSIS_HEADER = """You are a structured insurance documentation audit AI specialising in Indian health insurance claims.
 
 TASK: Analyse whether the claim rejection is procedural, substantive, or mixed based on the provided documents.
 
@@ -90,16 +90,111 @@ STRICT RULES:
 - Output ONLY the JSON object. No text before or after.
 
 EXAMPLE OUTPUT:
-{{
+{
   "missing_documents": ["Discharge summary", "Doctor's certificate"],
   "documentation_gap_severity": "High",
   "rejection_nature": "Procedural",
   "medical_ambiguity_detected": false,
   "explanation": "Rejection cites missing discharge summary and doctor's certificate. No substantive policy clause cited.",
   "confidence": "High"
-}}
+}
+
+"""
+
+
+def documentation_analysis_prompt(
+    policy_text: str,
+    rejection_text: str,
+    medical_text: str | None = None,
+    user_context: str | None = None,
+) -> str:
+
+    return DOCUMENTATION_ANALYSIS_HEADER + f"""POLICY TEXT:
+{policy_text}
+
+REJECTION TEXT:
+{rejection_text}
+
+MEDICAL DOCUMENTS:
+{medical_text or "Not provided"}
+
+USER CONTEXT:
+{user_context or "Not provided"}
+
+JSON OUTPUT:"""
+
+
+FUSED_AUDIT_HEADER = """You are a structured insurance claim audit AI specialising in Indian health insurance policies and claims.
+
+TASK: In ONE JSON object, (a) identify which policy clause category is being applied in the claim rejection, and (b) analyse whether the rejection is procedural, substantive, or mixed based on the provided documents.
+
+ALLOWED CLAUSE CATEGORIES (use exactly as written):
+- "Pre-existing disease"
+- "Waiting period"
+- "Policy exclusion"
+- "Room rent limit"
+- "Co-payment"
+- "Insufficient documentation"
+- "Authorization requirement"
+- "Not Detected"
+- "Other / unclear"
+
+ALIGNMENT GUIDE (rejection_alignment):
+- "Strong"       = rejection directly supported by a specific policy clause
+- "Partial"      = loosely or indirectly supported
+- "Weak"         = poorly supported or contradicted by policy text
+- "Not Detected" = no identifiable clause found
+
+REJECTION NATURE:
+- "Procedural"    = rejection due to missing paperwork, incomplete forms, or process errors (fixable by resubmission)
+- "Substantive"   = rejection due to policy exclusion, clause limitation, or non-coverage (requires appeal or clause challenge)
+- "Mixed"         = both procedural and substantive elements present
+- "Not Detected"  = cannot determine from provided text
+
+SEVERITY GUIDE (documentation_gap_severity):
+- "High"   = critical documents missing or completely absent
+- "Medium" = some documents incomplete or partially missing
+- "Low"    = documentation appears adequate
+
+CONFIDENCE GUIDE (clause_confidence, doc_confidence):
+- "High"   = clear match, unambiguous
+- "Medium" = reasonable match with some uncertainty
+- "Low"    = uncertain, insufficient information
+
+STRICT RULES:
+- Use ONLY the provided texts. Do NOT invent clauses, facts or medical details.
+- For clause_detected: quote the most relevant sentence from policy text, or write "Not found in policy text".
+- missing_documents: list specific document names that are absent or incomplete. Empty list if none.
+- medical_ambiguity_detected: true only if medical records contain vague, contradictory, or unclear diagnosis language.
+- Output ONLY the JSON object. No text before or after.
+
+EXAMPLE OUTPUT:
+{
+  "clause_category": "Waiting period",
+  "clause_detected": "Claims for any illness within the first 30 days of policy inception shall not be admissible.",
+  "clause_clarity": "High",
+  "rejection_alignment": "Strong",
+  "clause_explanation": "The rejection cites a 30-day waiting period. Policy clearly states claims within first 30 days are inadmissible.",
+  "clause_confidence": "High",
+  "missing_documents": [],
+  "documentation_gap_severity": "Low",
+  "rejection_nature": "Substantive",
+  "medical_ambiguity_detected": false,
+  "doc_explanation": "Rejection rests on a policy clause, not on missing paperwork.",
+  "doc_confidence": "High"
+}
+
+"""
+
+
+def fused_audit_prompt(
+    policy_text: str,
+    rejection_text: str,
+    medical_text: str | None = None,
+    user_context: str | None = None,
+) -> str:
 
-POLICY TEXT:
+    return FUSED_AUDIT_HEADER + f"""POLICY TEXT:
 {policy_text}
 
 REJECTION TEXT:
@@ -2,19 +2,37 @@
 #
 # Multilingual-aware prompt builder for the report chat service.
 # Lang instruction is placed FIRST — LLMs follow early instructions better.
+#
+# Session prompts are assembled against a token budget (report_chat_messages
+# with count_tokens): the oldest turns, the rolling summary of older turns
+# and then the report data are cut — in that order — until the prompt fits,
+# so generate()'s hard truncation never eats the language instruction.
+#
+# Prompt layout, most stable first — the session KV cache is reused up to
+# the first token that differs from the previous turn:
+#
+#   instructions + report data   report_chat_header(); same every turn
+#   rolling summary              changes when older turns are folded in
+#   kept turns + new question    append-only between folds
+#
+# A fold (or a turn dropped for budget) re-prefills from the summary on —
+# the summary and a few recent turns — never the report header.
+
+from typing import Callable
 
 from llm.multilingual_translations import SYSTEM_LANG_INSTRUCTION
 
+# generate() truncates encoded prompts at 1800 tokens; the rest of that is
+# left for its system message and the chat template
+CHAT_PROMPT_TOKEN_BUDGET = 1600
+_TURN_OVERHEAD_TOKENS    = 8       # <start_of_turn>role … <end_of_turn>
+
+# Each message is clipped to this many chars when folded into the summary
+_SUMMARY_INPUT_CHARS = 600
 
-def report_chat_prompt(
-    report_data: dict,
-    history: list[dict],
-    user_question: str,
-    lang: str = "en",
-) -> str:
-    lang = lang if lang in SYSTEM_LANG_INSTRUCTION else "en"
-    lang_instruction = SYSTEM_LANG_INSTRUCTION[lang]
 
+def _report_block(report_data: dict) -> tuple[str, str]:
+    """(report type heading, report summary text) for the chat header."""
     is_prepurchase = "clause_risk" in report_data and "appeal_strength" not in report_data
 
     if is_prepurchase:
@@ -69,13 +87,11 @@ REAPPLICATION STEPS:
 
 REGULATORY CONSIDERATIONS: {report_data.get('regulatory_considerations', 'N/A')}"""
 
-    history_block = ""
-    if history:
-        lines = []
-        for msg in history[-6:]:
-            role = "User" if msg["role"] == "user" else "Assistant"
-            lines.append(f"{role}: {msg['content']}")
-        history_block = "\nCONVERSATION HISTORY:\n" + "\n".join(lines) + "\n"
+    return report_type, report_summary.strip()
+
+
+def _header(lang: str, report_type: str, report_summary: str) -> str:
+    lang_instruction = SYSTEM_LANG_INSTRUCTION[lang]
 
     # ── Lang instruction is FIRST so the model sees it before anything else ──
     return f"""{lang_instruction}
@@ -88,11 +104,126 @@ Do not provide legal or financial advice — provide regulatory information and
 
 REPORT TYPE: {report_type}
 REPORT DATA:
-{report_summary.strip()}
-{history_block}
-USER QUESTION: {user_question}
+{report_summary}
+"""
+
+
+def _frame(
+    lang: str,
+    report_type: str,
+    report_summary: str,
+    history_block: str,
+    user_question: str,
+) -> str:
+    return (
+        _header(lang, report_type, report_summary)
+        + f"{history_block}\nUSER QUESTION: {user_question}\n\nANSWER:"
+    )
+
+
+def report_chat_header(report_data: dict, lang: str = "en") -> str:
+    """
+    The untrimmed start of every report_chat_messages() prompt for this
+    report — instructions plus report data, before any summary or turn.
+    """
+    lang = lang if lang in SYSTEM_LANG_INSTRUCTION else "en"
+    return _header(lang, *_report_block(report_data))
+
+
+def report_chat_messages(
+    report_data: dict,
+    history: list[dict],
+    user_question: str,
+    lang: str = "en",
+    summary: str = "",
+    count_tokens: Callable[[str], int] | None = None,
+    budget: int = CHAT_PROMPT_TOKEN_BUDGET,
+) -> list[dict]:
+    """
+    Report chat prompt as Gemma turns — used for session and stateless chat.
+
+    The report header (plus the rolling summary of earlier turns) rides in
+    the first user turn and each later question is its own turn, so
+    consecutive turns only ever append tokens — the session's KV cache
+    (services/chat_memory.py) covers everything before the new question.
+
+    history is every turn the summary does not cover yet. With count_tokens
+    the result fits `budget`: the oldest turns go first, then the summary,
+    then the last turn, then report lines from the end. The language
+    instruction and the question are always kept.
+    """
+    lang = lang if lang in SYSTEM_LANG_INSTRUCTION else "en"
+    report_type, report_summary = _report_block(report_data)
+
+    # Gemma's template needs strict user/model alternation — keep whole pairs only
+    pairs = [
+        (q["content"], a["content"])
+        for q, a in zip(history, history[1:])
+        if q["role"] == "user" and a["role"] != "user" and q.get("content") and a.get("content")
+    ]
+
+    def build(pairs: list, summary: str, report_summary: str) -> list[dict]:
+        summary_block = f"\nEARLIER IN THIS CONVERSATION (summary):\n{summary}\n" if summary else ""
+        questions = [q for q, _ in pairs] + [user_question]
+        messages = [{
+            "role": "user",
+            "content": _frame(lang, report_type, report_summary, summary_block, questions[0]),
+        }]
+        for (_, answer), question in zip(pairs, questions[1:]):
+            messages.append({"role": "assistant", "content": answer})
+            messages.append({"role": "user", "content": f"USER QUESTION: {question}\n\nANSWER:"})
+        return messages
+
+    messages = build(pairs, summary, report_summary)
+    if count_tokens is None:
+        return messages
+
+    def fits(messages: list[dict]) -> bool:
+        used = sum(count_tokens(m["content"]) + _TURN_OVERHEAD_TOKENS for m in messages)
+        return used <= budget
+
+    while not fits(messages) and len(pairs) > 1:
+        pairs = pairs[1:]
+        messages = build(pairs, summary, report_summary)
+    if not fits(messages) and summary:
+        summary = ""
+        messages = build(pairs, summary, report_summary)
+    if not fits(messages) and pairs:
+        pairs = []
+        messages = build(pairs, summary, report_summary)
+    if not fits(messages):
+        # Longest head of the report that fits — binary search over lines
+        lines = report_summary.split("\n")
+        lo, hi = 0, len(lines) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if fits(build([], "", "\n".join(lines[:mid]) + "\n  …")):
+                lo = mid
+            else:
+                hi = mid - 1
+        messages = build([], "", "\n".join(lines[:lo]) + "\n  …")
+    return messages
+
+
+def history_summary_prompt(previous_summary: str, messages: list[dict]) -> str:
+    """Fold older chat turns into the session's rolling summary."""
+    turns = "\n".join(
+        f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content'][:_SUMMARY_INPUT_CHARS]}"
+        for m in messages
+    )
+    return f"""Update the running summary of a conversation between a user and CareBridge AI about the user's insurance report.
+
+Keep: facts the user shared (conditions, amounts, dates, hospitals), what they asked and the key conclusions of each answer.
+Drop: greetings, repetition, generic advice.
+Write at most 6 short lines in English. No preamble.
+
+CURRENT SUMMARY:
+{previous_summary or "None"}
+
+NEW TURNS:
+{turns}
 
-ANSWER:"""
+UPDATED SUMMARY:"""
 
 
 def learn_prompt(question: str, lang: str = "en") -> str:
@@ -0,0 +1,663 @@
+# llm/scheduler.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Continuous-Batching Generation Scheduler
+#
+# generate() used to spawn a thread per call and run model.generate() with a
+# batch size of one, so concurrent /audit, /prepurchase and /chat requests
+# queued up behind each other on the single MedGemma instance.
+#
+# Every prompt now goes through one GenerationScheduler per model. A single
+# worker thread owns the GPU and runs a step-level greedy decode loop:
+#   1. Admit   — pending prompts are left-padded, prefilled together and
+#                merged into the running batch's KV cache between steps
+#   2. Decode  — one forward pass yields the next token for every sequence
+#   3. Retire  — sequences that hit EOS / max_new_tokens resolve their future
+#                and their rows are dropped from the KV cache immediately
+#
+# Decoding matches the old model.generate() call: greedy, repetition
+# penalty 1.1 over prompt + generated tokens, stop on EOS. Requests may
+# carry a TextIteratorStreamer; each new token is pushed to it as decoded.
+#
+# Requests may also carry a JsonSchemaConstraint (llm/json_constraint.py).
+# Disallowed tokens are masked before argmax, and tokens the grammar forces
+# (keys, braces, enum tails) are appended without their own decode step —
+# they ride along as extra input positions in the next forward pass.
+#
+# Prompts that start with a registered static header (llm/prefix_cache.py)
+# are admitted from a copy of that header's KV cache and only prefill the
+# variable tail. Chat turns carrying a KVSlot go one better: the slot holds
+# the conversation's cache from the previous turn, so only the new user turn
+# is prefilled, and the row's cache is written back to the slot on retire.
+#
+# If the batched loop fails (unsupported cache layout, OOM), the affected
+# requests are re-run one by one through model.generate() — the original
+# path — and after repeated failures batching is switched off entirely.
+# ══════════════════════════════════════════════════════════════════════════════
+
+import copy
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+from transformers import LogitsProcessor, RepetitionPenaltyLogitsProcessor
+
+from llm.json_constraint import string_safe_token_ids
+from llm.prefix_cache import PrefixCache, clone_cache, common_prefix
+
+# 6GB VRAM budget — 4 concurrent 1800-token KV caches fit alongside 4-bit weights
+_MAX_BATCH_SIZE = 4
+
+# How long an idle worker waits after the first arrival to gather a batch
+_ADMIT_WAIT_SECONDS = 0.02
+
+_REPETITION_PENALTY = 1.1
+
+# Batched-loop failures tolerated before falling back to model.generate() for good
+_MAX_BATCH_FAILURES = 3
+
+
+class GenerationRequest:
+    """A single prompt queued for (or undergoing) decode."""
+
+    def __init__(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        eos_id: int,
+        pad_id: int,
+        streamer=None,
+        constraint=None,
+        kv_slot=None,
+    ):
+        self.input_ids      = input_ids          # 1-D LongTensor on model.device
+        self.max_new_tokens = max_new_tokens
+        self.eos_id         = eos_id
+        self.pad_id         = pad_id
+        self.streamer       = streamer           # TextIteratorStreamer-compatible, optional
+        self.constraint     = constraint         # JsonSchemaConstraint, optional
+        self.kv_slot        = kv_slot            # KVSlot, optional — reused and refreshed
+
+        self.future: Future = Future()
+        self.cancelled = False
+        self._prompt_streamed = False
+        self.restart()
+
+    def restart(self) -> None:
+        """Reset decode state — used when a failed batch is re-run singly."""
+        self.generated: list[int] = []
+        self.pending:   list[int] = []   # emitted but not yet fed to the model
+        self.fed = 0                     # generated tokens already in the KV cache
+        self._seen = self.input_ids.clone()   # drives the repetition penalty
+        if self.constraint is not None:
+            self.constraint.reset()
+            self._force()
+
+    @property
+    def finished(self) -> bool:
+        if self.cancelled:
+            return True
+        if len(self.generated) >= self.max_new_tokens:
+            return True
+        return bool(self.generated) and self.generated[-1] == self.eos_id
+
+    def accept(self, token: int) -> None:
+        """Record a sampled token, then any tokens the grammar forces after it."""
+        self._emit(token)
+        if self.constraint is not None and token != self.eos_id:
+            self.constraint.advance(token)
+            self._force()
+
+    def _force(self) -> None:
+        for token in self.constraint.forced_run():
+            self.constraint.advance(token)
+            self._emit(token)
+        if self.constraint.done:
+            self.generated.append(self.eos_id)
+
+    def _emit(self, token: int) -> None:
+        self.generated.append(token)
+        self.pending.append(token)
+        self._seen = torch.cat([self._seen, self._seen.new_tensor([token])])
+        if self.streamer is not None and token != self.eos_id:
+            if not self._prompt_streamed:
+                # model.generate() puts the prompt first and skip_prompt streamers
+                # drop that first put — do the same so no answer token is lost
+                self.streamer.put(self.input_ids.unsqueeze(0).cpu())
+                self._prompt_streamed = True
+            self.streamer.put(torch.tensor([token]))
+
+    def resolve(self) -> None:
+        """Hand the generated ids to the waiting caller and close the stream."""
+        if self.streamer is not None:
+            self.streamer.end()
+        if not self.future.done():
+            self.future.set_result(self.generated)
+
+
+class _ConstraintLogitsProcessor(LogitsProcessor):
+    """Adapts a JsonSchemaConstraint to model.generate() for the fallback path."""
+
+    def __init__(self, request: GenerationRequest, prompt_len: int, mask_fn):
+        self.request    = request
+        self.prompt_len = prompt_len
+        self.mask_fn    = mask_fn
+        self.consumed   = 0
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        constraint = self.request.constraint
+        for token in input_ids[0, self.prompt_len + self.consumed:].tolist():
+            constraint.advance(token)
+            self.consumed += 1
+        if constraint.done:
+            allowed = torch.zeros_like(scores, dtype=torch.bool)
+            allowed[:, self.request.eos_id] = True
+            return scores.masked_fill(~allowed, float("-inf"))
+        return self.mask_fn(constraint, scores)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# KV CACHE HELPERS
+# Work on both the layered Cache API (cache.layers[i].keys) and the older
+# key_cache / value_cache lists. Each layer is handled independently, so
+# sliding-window layers that keep fewer positions stay right-aligned.
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _num_layers(cache) -> int:
+    return len(cache.layers) if hasattr(cache, "layers") else len(cache.key_cache)
+
+
+def _get_kv(cache, i: int) -> tuple[torch.Tensor, torch.Tensor]:
+    if hasattr(cache, "layers"):
+        return cache.layers[i].keys, cache.layers[i].values
+    return cache.key_cache[i], cache.value_cache[i]
+
+
+def _set_kv(cache, i: int, keys: torch.Tensor, values: torch.Tensor, total_len: int) -> None:
+    if hasattr(cache, "layers"):
+        layer = cache.layers[i]
+        layer.keys, layer.values = keys, values
+        # Sliding-window layers track the absolute sequence length separately
+        if hasattr(layer, "cumulative_length"):
+            layer.cumulative_length = total_len
+    else:
+        cache.key_cache[i], cache.value_cache[i] = keys, values
+
+
+def _pad_left(t: torch.Tensor, n: int) -> torch.Tensor:
+    """Left-pad a [B, H, T, D] tensor with n zero positions."""
+    if n <= 0:
+        return t
+    pad = t.new_zeros(t.shape[0], t.shape[1], n, t.shape[3])
+    return torch.cat([pad, t], dim=2)
+
+
+def _merge_caches(cache_a, len_a: int, cache_b, len_b: int):
+    """Concatenate two caches along the batch dim, right-aligning positions."""
+    total = max(len_a, len_b)
+    for i in range(_num_layers(cache_a)):
+        ka, va = _get_kv(cache_a, i)
+        kb, vb = _get_kv(cache_b, i)
+        width = max(ka.shape[2], kb.shape[2])
+        keys   = torch.cat([_pad_left(ka, width - ka.shape[2]), _pad_left(kb, width - kb.shape[2])], dim=0)
+        values = torch.cat([_pad_left(va, width - va.shape[2]), _pad_left(vb, width - vb.shape[2])], dim=0)
+        _set_kv(cache_a, i, keys, values, total)
+    return cache_a
+
+
+def _select_rows(cache, rows: torch.Tensor, total_len: int) -> None:
+    for i in range(_num_layers(cache)):
+        k, v = _get_kv(cache, i)
+        _set_kv(cache, i, k.index_select(0, rows), v.index_select(0, rows), total_len)
+
+
+def _trim_left(cache, n: int, total_len: int) -> None:
+    """Drop the first n sequence positions (all-padding columns) from every layer."""
+    for i in range(_num_layers(cache)):
+        k, v = _get_kv(cache, i)
+        # A layer holding fewer than total_len positions only stores the tail
+        drop = max(0, n - (total_len - k.shape[2]))
+        _set_kv(cache, i, k[:, :, drop:], v[:, :, drop:], total_len - n)
+
+
+def _crop(cache, n: int, total_len: int) -> bool:
+    """
+    Keep the first n positions. Only exact when every layer still holds the
+    full sequence — a sliding-window layer that dropped its head cannot be
+    rewound, so the caller falls back to a full prefill.
+    """
+    for i in range(_num_layers(cache)):
+        if _get_kv(cache, i)[0].shape[2] != total_len:
+            return False
+    for i in range(_num_layers(cache)):
+        k, v = _get_kv(cache, i)
+        _set_kv(cache, i, k[:, :, :n], v[:, :, :n], n)
+    if hasattr(cache, "_seen_tokens"):
+        cache._seen_tokens = n
+    return True
+
+
+def _extract_row(cache, row: int, real: torch.Tensor):
+    """Batch-1 copy of one row's cache with its padding columns removed."""
+    twin = copy.copy(cache)
+    if hasattr(cache, "layers"):
+        twin.layers = [copy.copy(layer) for layer in cache.layers]
+    else:
+        twin.key_cache, twin.value_cache = list(cache.key_cache), list(cache.value_cache)
+
+    length = int(real.sum().item())
+    for i in range(_num_layers(cache)):
+        k, v = _get_kv(cache, i)
+        cols = real[-k.shape[2]:].nonzero().squeeze(-1)
+        _set_kv(twin, i, k[row:row + 1].index_select(2, cols), v[row:row + 1].index_select(2, cols), length)
+    if hasattr(twin, "_seen_tokens"):
+        twin._seen_tokens = length
+    return twin
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SCHEDULER
+# ══════════════════════════════════════════════════════════════════════════════
+
+class GenerationScheduler:
+    """
+    Central batching scheduler for one model instance.
+    Callers submit() token ids and wait on the returned request's future.
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size: int = _MAX_BATCH_SIZE):
+        self.model          = model
+        self.tokenizer      = tokenizer
+        self.max_batch_size = max_batch_size
+        self.device         = model.device
+
+        self._pending: "queue.Queue[GenerationRequest]" = queue.Queue()
+        self._penalty  = RepetitionPenaltyLogitsProcessor(_REPETITION_PENALTY)
+        self._string_mask: torch.Tensor | None = None
+        self.prefixes  = PrefixCache()
+        self._failures = 0
+        self._batching = True
+
+        # Running batch state — only touched by the worker thread
+        self._active: list[GenerationRequest] = []
+        self._cache = None
+        self._mask: torch.Tensor | None = None   # [B, T] — 0 marks left padding
+
+        self._worker = threading.Thread(target=self._loop, name="generation-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        eos_id: int,
+        pad_id: int,
+        streamer=None,
+        constraint=None,
+        kv_slot=None,
+    ) -> GenerationRequest:
+        request = GenerationRequest(
+            input_ids.to(self.device), max_new_tokens, eos_id, pad_id, streamer, constraint, kv_slot
+        )
+        self._pending.put(request)
+        return request
+
+    def register_prefix(self, name: str, ids: torch.Tensor) -> None:
+        """Add a static header to the prefix cache and wake the worker to prefill it."""
+        self.prefixes.register(name, ids.to(self.device))
+        self._pending.put(None)
+
+    # --------------------------------------------------
+    # Worker loop
+    # --------------------------------------------------
+
+    def _loop(self) -> None:
+        while True:
+            if not self._active:
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                first = self._pending.get()          # block while idle
+                if first is None:                    # register_prefix() wake-up
+                    self._warm_prefixes()
+                    continue
+                time.sleep(_ADMIT_WAIT_SECONDS)      # let concurrent callers join
+                if first.cancelled:                  # caller gave up while queued
+                    first.resolve()
+                    continue
+                self._serve([first] + self._drain(self.max_batch_size - 1))
+                continue
+
+            room = self.max_batch_size - len(self._active)
+            self._serve(self._drain(room) if room > 0 else [])
+
+    def _drain(self, limit: int) -> list[GenerationRequest]:
+        taken: list[GenerationRequest] = []
+        while len(taken) < limit:
+            try:
+                request = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                continue
+            if request.cancelled:
+                request.resolve()
+                continue
+            taken.append(request)
+        return taken
+
+    def _serve(self, newcomers: list[GenerationRequest]) -> None:
+        if not self._batching:
+            for request in newcomers:
+                self._generate_single(request)
+            return
+
+        try:
+            with torch.no_grad():
+                if newcomers:
+                    self._admit(newcomers)
+                if self._active:
+                    self._step()
+        except Exception as e:
+            self._failures += 1
+            print(f"⚠ Batched decode failed ({e}) — re-running {len(self._active) + len(newcomers)} request(s) singly")
+            stranded = self._active + [r for r in newcomers if r not in self._active]
+            self._reset()
+            if self._failures >= _MAX_BATCH_FAILURES:
+                print("⚠ Disabling continuous batching — falling back to model.generate()")
+                self._batching = False
+            for request in stranded:
+                if request.future.done():
+                    continue
+                if request.streamer is not None and request.generated:
+                    # Tokens already reached the client — end with what was sent
+                    request.resolve()
+                    continue
+                request.restart()
+                self._generate_single(request)
+
+    def _reset(self) -> None:
+        self._active = []
+        self._cache  = None
+        self._mask   = None
+
+    # --------------------------------------------------
+    # Admit: prefill newcomers and merge into the running batch
+    # --------------------------------------------------
+
+    def _admit(self, newcomers: list[GenerationRequest]) -> None:
+        self._fill_prefixes()
+
+        cold: list[GenerationRequest] = []
+        for request in newcomers:
+            cache, start = self._reusable(request)
+            if cache is None:
+                cold.append(request)
+            else:
+                self._merge_in([request], *self._prefill_from(request, cache, start))
+        if cold:
+            self._merge_in(cold, *self._prefill(cold))
+        self._retire()
+
+    def _prefill(self, requests: list[GenerationRequest]):
+        # Grammar-forced openers ({"key": ") are prefilled with the prompt
+        prompts = [
+            torch.cat([r.input_ids, r.input_ids.new_tensor(r.pending)]) for r in requests
+        ]
+        width = max(p.shape[0] for p in prompts)
+        ids  = torch.full((len(requests), width), requests[0].pad_id, dtype=torch.long, device=self.device)
+        mask = torch.zeros((len(requests), width), dtype=torch.long, device=self.device)
+        for row, (request, prompt) in enumerate(zip(requests, prompts)):
+            n = prompt.shape[0]
+            ids[row, width - n:]  = prompt
+            mask[row, width - n:] = 1
+            request.fed    += len(request.pending)
+            request.pending = []
+
+        out = self.model(
+            input_ids=ids,
+            attention_mask=mask,
+            position_ids=(mask.cumsum(-1) - 1).clamp(min=0),
+            use_cache=True,
+            logits_to_keep=1,
+        )
+        return out.past_key_values, mask, out.logits[:, -1, :]
+
+    def _reusable(self, request: GenerationRequest):
+        """(cache, length) to start the prefill from — session slot, static header, or nothing."""
+        entry  = self.prefixes.lookup(request.input_ids)
+        header = len(entry) if entry is not None else 0
+
+        slot = request.kv_slot
+        if slot is not None and slot.cache is not None:
+            cache, ids = slot.cache, slot.ids
+            slot.clear()   # the running batch owns it now
+            n = min(common_prefix(request.input_ids, ids).shape[0], request.input_ids.shape[0] - 1)
+            if n > header and _crop(cache, n, ids.shape[0]):
+                return cache, n
+
+        if entry is not None:
+            return clone_cache(entry.cache), header
+        return None, 0
+
+    def _prefill_from(self, request: GenerationRequest, cache, start: int):
+        """Prefill only the tail after `start` cached positions."""
+        tail  = torch.cat([request.input_ids[start:], request.input_ids.new_tensor(request.pending)])
+        end   = start + tail.shape[0]
+        request.fed    += len(request.pending)
+        request.pending = []
+
+        positions = torch.arange(start, end, device=self.device)
+        out = self.model(
+            input_ids=tail.unsqueeze(0),
+            attention_mask=torch.ones((1, end), dtype=torch.long, device=self.device),
+            position_ids=positions.unsqueeze(0),
+            past_key_values=cache,
+            cache_position=positions,
+            use_cache=True,
+            logits_to_keep=1,
+        )
+        mask = torch.ones((1, end), dtype=torch.long, device=self.device)
+        return out.past_key_values, mask, out.logits[:, -1, :]
+
+    def _warm_prefixes(self) -> None:
+        try:
+            with torch.no_grad():
+                self._fill_prefixes()
+        except Exception as e:
+            print(f"⚠ Prefix cache warm-up failed ({e})")
+
+    def _fill_prefixes(self) -> None:
+        for entry in self.prefixes.unfilled():
+            try:
+                out = self.model(input_ids=entry.ids.unsqueeze(0), use_cache=True, logits_to_keep=1)
+            except Exception as e:
+                print(f"⚠ Prefix cache: {entry.name} prefill failed ({e}) — dropped")
+                self.prefixes.discard(entry)
+                continue
+            entry.cache = out.past_key_values
+            print(f"✅ Prefix cache: {entry.name} ({len(entry)} tokens) prefilled")
+
+    def _merge_in(self, requests: list[GenerationRequest], cache, mask: torch.Tensor, logits: torch.Tensor) -> None:
+        self._append_tokens(requests, logits)
+
+        width = mask.shape[1]
+        if self._cache is None:
+            self._cache, self._mask = cache, mask
+        else:
+            run_len = self._mask.shape[1]
+            self._cache = _merge_caches(self._cache, run_len, cache, width)
+            total = max(run_len, width)
+            self._mask = torch.cat([
+                torch.nn.functional.pad(self._mask, (total - run_len, 0)),
+                torch.nn.functional.pad(mask, (total - width, 0)),
+            ], dim=0)
+        self._active.extend(requests)
+
+    # --------------------------------------------------
+    # Decode: one forward pass for every active sequence
+    # --------------------------------------------------
+
+    def _step(self) -> None:
+        # Usually one pending token per row; jump-forward rows carry more,
+        # so the chunk is left-padded to the longest and masked
+        width = max(len(r.pending) for r in self._active)
+        ids   = torch.full((len(self._active), width), self._active[0].pad_id, dtype=torch.long, device=self.device)
+        chunk = torch.zeros((len(self._active), width), dtype=torch.long, device=self.device)
+        for row, request in enumerate(self._active):
+            n = len(request.pending)
+            ids[row, width - n:]   = ids.new_tensor(request.pending)
+            chunk[row, width - n:] = 1
+            request.fed    += n
+            request.pending = []
+
+        total = self._mask.shape[1]
+        position_ids = self._mask.sum(-1, keepdim=True) + (chunk.cumsum(-1) - 1).clamp(min=0)
+        self._mask = torch.cat([self._mask, chunk], dim=1)
+
+        out = self.model(
+            input_ids=ids,
+            attention_mask=self._mask,
+            position_ids=position_ids,
+            past_key_values=self._cache,
+            cache_position=torch.arange(total, total + width, device=self.device),
+            use_cache=True,
+            logits_to_keep=1,
+        )
+        self._cache = out.past_key_values
+        self._append_tokens(self._active, out.logits[:, -1, :])
+        self._retire()
+
+    def _append_tokens(self, requests: list[GenerationRequest], logits: torch.Tensor) -> None:
+        rows = []
+        for row, request in enumerate(requests):
+            scores = self._penalty(request._seen.unsqueeze(0), logits[row:row + 1].float())
+            if request.constraint is not None:
+                scores = self._constrain(request.constraint, scores)
+            rows.append(scores)
+        # One device → host copy per step; EOS / length checks then run on ints
+        tokens = torch.cat(rows).argmax(dim=-1).tolist()
+        for request, token in zip(requests, tokens):
+            request.accept(token)
+
+    def _constrain(self, constraint, scores: torch.Tensor) -> torch.Tensor:
+        ids, free_string = constraint.allowed()
+        if free_string:
+            allowed = self._string_safe_mask(scores.shape[-1]).clone()
+        else:
+            allowed = torch.zeros(scores.shape[-1], dtype=torch.bool, device=scores.device)
+        if ids:
+            allowed[torch.tensor(ids, device=scores.device)] = True
+        return scores.masked_fill(~allowed, float("-inf"))
+
+    def _string_safe_mask(self, vocab_size: int) -> torch.Tensor:
+        if self._string_mask is None or self._string_mask.shape[0] != vocab_size:
+            mask = torch.zeros(vocab_size, dtype=torch.bool, device=self.device)
+            safe = [i for i in string_safe_token_ids(self.tokenizer) if i < vocab_size]
+            mask[torch.tensor(safe, device=self.device)] = True
+            self._string_mask = mask
+        return self._string_mask
+
+    # --------------------------------------------------
+    # Retire: resolve finished sequences, shrink the batch
+    # --------------------------------------------------
+
+    def _retire(self) -> None:
+        keep = [i for i, r in enumerate(self._active) if not r.finished]
+        if len(keep) == len(self._active):
+            return
+
+        for row, request in enumerate(self._active):
+            if request.finished and not request.future.done():
+                self._save_kv(request, row)
+                request.resolve()
+
+        if not keep:
+            self._reset()
+            return
+
+        total = self._mask.shape[1]
+        rows  = torch.tensor(keep, device=self.device)
+        _select_rows(self._cache, rows, total)
+        self._mask   = self._mask.index_select(0, rows)
+        self._active = [self._active[i] for i in keep]
+
+        # Columns that are padding for every surviving row can go
+        leading = int((self._mask.sum(0) == 0).long().cumprod(0).sum().item())
+        if leading:
+            _trim_left(self._cache, leading, total)
+            self._mask = self._mask[:, leading:]
+
+    def _save_kv(self, request: GenerationRequest, row: int) -> None:
+        """Write the row's cache back to its session slot before the caller wakes."""
+        if request.kv_slot is None:
+            return
+        try:
+            fed = request.input_ids.new_tensor(request.generated[:request.fed])
+            request.kv_slot.ids   = torch.cat([request.input_ids, fed])
+            request.kv_slot.cache = _extract_row(self._cache, row, self._mask[row].bool())
+        except Exception as e:
+            print(f"⚠ Could not keep session KV cache ({e})")
+            request.kv_slot.clear()
+
+    # --------------------------------------------------
+    # Original single-sequence path (fallback)
+    # --------------------------------------------------
+
+    def _generate_single(self, request: GenerationRequest) -> None:
+        if request.kv_slot is not None:
+            request.kv_slot.clear()   # model.generate() does not hand its cache back
+        if request.cancelled:
+            request.resolve()
+            return
+        try:
+            # Grammar-forced opener is already in request.generated — feed it as prompt
+            prefix    = list(request.generated)
+            input_ids = torch.cat([request.input_ids, request.input_ids.new_tensor(prefix)]).unsqueeze(0)
+
+            extra = {}
+            if request.constraint is not None:
+                extra["logits_processor"] = [
+                    _ConstraintLogitsProcessor(request, input_ids.shape[1], self._constrain)
+                ]
+
+            with torch.no_grad():
+                output = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    max_new_tokens=max(1, request.max_new_tokens - len(prefix)),
+                    do_sample=False,
+                    temperature=0.1,
+                    repetition_penalty=_REPETITION_PENALTY,
+                    use_cache=True,
+                    eos_token_id=request.eos_id,
+                    pad_token_id=request.pad_id,
+                    early_stopping=True,
+                    streamer=request.streamer,
+                    **extra,
+                )
+            request.generated = prefix + output[0][input_ids.shape[1]:].tolist()
+            request.future.set_result(request.generated)
+        except Exception as e:
+            if request.streamer is not None:
+                request.streamer.end()
+            request.future.set_exception(e)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# REGISTRY — one scheduler per loaded model
+# ══════════════════════════════════════════════════════════════════════════════
+
+_schedulers: dict[int, GenerationScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model, tokenizer) -> GenerationScheduler:
+    key = id(model)
+    if key not in _schedulers:
+        with _schedulers_lock:
+            if key not in _schedulers:   # double-checked locking
+                _schedulers[key] = GenerationScheduler(model, tokenizer)
+                print(f"✅ Generation scheduler started (max batch {_MAX_BATCH_SIZE})")
+    return _schedulers[key]
@@ -1,68 +1,68 @@
 # main.py
 
 import os
+import json
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from typing import Iterator
 
 from fastapi import FastAPI, HTTPException, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from llm.model_loader import ModelLoader
 from engines.post_rejection_engine import PostRejectionEngine
-from engines.pre_purchase_engine import PrePurchaseEngine
+from engines.pre_purchase_engine import PrePurchaseEngine, POLICY_TEXT_CHARS, FULL_DOCUMENT_CHARS
 from engines.policy_comparison_engine import PolicyComparisonEngine
 
-from schemas.request import PostRejectionRequest, PrePurchaseRequest
+from schemas.request import PostRejectionRequest, PrePurchaseRequest, PrePurchaseBatchRequest
 from schemas.chat import ReportChatResponse
-from schemas.policy_comparison import PolicyComparisonReport
-
-from services.report_chat_service import run_report_chat
-from services.chat_memory import create_session
-from services.document_parser import extract_text_from_file
-
-# ── OCR extractor (new) ───────────────────────────────────────────────────────
-# Falls back gracefully to document_parser if ocr/extractor.py not yet present
-try:
-    from ocr.extractor import extract_text_from_bytes as ocr_extract
-    _HAS_OCR = True
-    print("✅ OCR engine loaded")
-except ImportError:
-    _HAS_OCR = False
-    print("⚠️  ocr/extractor.py not found — file uploads use document_parser only")
+from schemas.policy_comparison import PolicyComparisonReport, PolicyComparisonMatrix
 
+from llm.generation import generate, generate_stream, warm_prefix_cache
+from llm.report_chat_prompt import learn_prompt
+from services.report_chat_service import run_report_chat, stream_report_chat
+from services.chat_memory import create_session, configure_session_backend, configure_kv_budget
+from services.upload_extraction import extract_upload, HAS_OCR
 
 # ══════════════════════════════════════════════════════════════════════════════
 # HELPERS
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _extract_upload(filename: str, content_type: str, content: bytes) -> str:
-    """
-    Unified extraction: tries ocr.extractor first (pdfplumber + Tesseract),
-    falls back to services.document_parser (existing logic).
-    """
-    text = ""
+# Default extraction budget (matches ocr.extractor's LLM-safety cap). Pre-purchase
+# uses only POLICY_TEXT_CHARS after whitespace collapse; the extra covers newlines.
+# Full-document pre-purchase reads up to FULL_DOCUMENT_CHARS.
+_UPLOAD_MAX_CHARS      = 4000
+_PREPURCHASE_MAX_CHARS = POLICY_TEXT_CHARS + 300
 
-    if _HAS_OCR:
-        try:
-            text = ocr_extract(
-                data      = content,
-                filename  = filename,
-                mime_type = content_type or "",
-            )
-        except Exception as e:
-            print(f"⚠️  ocr_extract failed ({e}) — trying document_parser")
+# Policies accepted per /prepurchase/batch call
+_PREPURCHASE_BATCH_MAX = 500
 
-    if not text or len(text.strip()) < 30:
-        try:
-            text = extract_text_from_file(
-                filename     = filename,
-                content_type = content_type,
-                content      = content,
-            )
-        except Exception as e:
-            print(f"⚠️  document_parser failed ({e})")
 
-    return text.strip()
+# ── Off-loop executors for the async upload endpoints ─────────────────────────
+# Extraction threads drive ocr.extractor, which fans scanned pages out to its
+# own process pool. Inference threads block on the generation scheduler, so
+# concurrent uploads land in the same decode batch — sized to match it.
+_EXTRACT_EXECUTOR   = ThreadPoolExecutor(max_workers=4, thread_name_prefix="upload-extract")
+_INFERENCE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="inference")
+
+
+async def _run_in(executor: ThreadPoolExecutor, fn, *args, **kwargs):
+    """Run a blocking call on `executor` and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+async def _extract_upload_async(file: UploadFile, max_chars: int = _UPLOAD_MAX_CHARS) -> str:
+    """Read an upload on the event loop, extract its text off it."""
+    content = await file.read()
+    return await _run_in(
+        _EXTRACT_EXECUTOR, extract_upload,
+        file.filename or "", file.content_type or "", content, max_chars,
+    )
 
 
 def _lang_from_request(obj) -> str:
@@ -70,17 +70,70 @@ def _lang_from_request(obj) -> str:
     return getattr(obj, "lang", None) or "en"
 
 
+def _sse(events: Iterator[dict]) -> StreamingResponse:
+    """Wrap an event iterator as a Server-Sent-Events response."""
+    def _encode():
+        try:
+            for event in events:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            print("⚠️ SSE stream error:", e)
+            yield f"data: {json.dumps({'type': 'error', 'detail': 'Stream interrupted.'})}\n\n"
+
+    return StreamingResponse(
+        _encode(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _ndjson(events: Iterator[dict]) -> StreamingResponse:
+    """Wrap an event iterator as a newline-delimited JSON response."""
+    def _encode():
+        try:
+            for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print("⚠️ NDJSON stream error:", e)
+            yield json.dumps({"type": "error", "detail": "Stream interrupted."}) + "\n"
+
+    return StreamingResponse(
+        _encode(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # ENGINE REGISTRY
 # ══════════════════════════════════════════════════════════════════════════════
 
 _engines: dict = {}
 
+# Chat session storage — "memory" serves a single worker; "sqlite" shares
+# sessions between `uvicorn main:app --workers N` processes on one host
+_SESSION_BACKEND = os.environ.get("CAREBRIDGE_SESSION_BACKEND", "memory")
+_SESSION_DB_PATH = os.environ.get("CAREBRIDGE_SESSION_DB") or None
+
+# GPU memory for idle chat sessions' KV caches (services/chat_memory.py)
+_KV_BUDGET_MB = os.environ.get("CAREBRIDGE_KV_BUDGET_MB")
+
+# Page-OCR processes per API process (ocr/extractor.py) — defaults to one per
+# core but one; lower it when running several uvicorn workers on one host
+_OCR_WORKERS = os.environ.get("CAREBRIDGE_OCR_WORKERS")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🔄 CareBridge AI starting up...")
 
+    configure_session_backend(_SESSION_BACKEND, _SESSION_DB_PATH)
+    if _KV_BUDGET_MB:
+        configure_kv_budget(int(_KV_BUDGET_MB) * 2**20)
+    if _OCR_WORKERS and HAS_OCR:
+        from ocr.extractor import configure_ocr_pool
+        configure_ocr_pool(int(_OCR_WORKERS))
+
     loader = ModelLoader()
     model, tokenizer = loader.get_model()
 
@@ -90,9 +143,13 @@ async def lifespan(app: FastAPI):
     _engines["model"]          = model
     _engines["tokenizer"]      = tokenizer
 
+    warm_prefix_cache(model, tokenizer)
+
     print("✅ All engines ready")
     yield
     print("🔄 CareBridge AI shutting down...")
+    _EXTRACT_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    _INFERENCE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -120,7 +177,7 @@ app.add_middleware(
 def health():
     return {
         "status":  "CareBridge AI v2.1 running",
-        "ocr":     _HAS_OCR,
+        "ocr":     HAS_OCR,
         "engines": list(_engines.keys()),
     }
 
@@ -132,25 +189,49 @@ def health():
 @app.post("/prepurchase")
 def prepurchase(request: PrePurchaseRequest):
     try:
-        result = _engines["pre_purchase"].run(request.policy_text)
+        result = _engines["pre_purchase"].run(request.policy_text, request.full_document)
         return result.model_dump()
     except Exception as e:
         print("⚠️ /prepurchase error:", e)
         raise HTTPException(500, "Pre-purchase engine error. Please try again.")
 
 
+# ── Pre-purchase — batch ──────────────────────────────────────────────────────
+
+@app.post("/prepurchase/batch")
+def prepurchase_batch(request: PrePurchaseBatchRequest):
+    """
+    Score a catalogue of policies. Streams one NDJSON line per input policy
+    as it completes ('result' with its index and report, or 'error'), then
+    a final 'done' line. Duplicate policies are analysed once.
+    """
+    if not request.policies:
+        raise HTTPException(422, "No policies supplied.")
+    if len(request.policies) > _PREPURCHASE_BATCH_MAX:
+        raise HTTPException(422, f"At most {_PREPURCHASE_BATCH_MAX} policies per batch.")
+
+    def events():
+        failed = 0
+        for index, result in _engines["pre_purchase"].run_batch(
+            request.policies, request.full_document,
+        ):
+            if isinstance(result, Exception):
+                failed += 1
+                yield {"type": "error", "index": index, "detail": "Pre-purchase engine error."}
+            else:
+                yield {"type": "result", "index": index, "report": result.model_dump()}
+        yield {"type": "done", "total": len(request.policies), "failed": failed}
+
+    return _ndjson(events())
+
+
 # ── Pre-purchase — file upload ────────────────────────────────────────────────
 
 @app.post("/prepurchase/upload")
-async def prepurchase_upload(file: UploadFile = File(...)):
+async def prepurchase_upload(file: UploadFile = File(...), full_document: bool = False):
     try:
-        content = await file.read()
-
-        extracted_text = _extract_upload(
-            filename     = file.filename or "",
-            content_type = file.content_type or "",
-            content      = content,
-        )
+        max_chars      = FULL_DOCUMENT_CHARS if full_document else _PREPURCHASE_MAX_CHARS
+        extracted_text = await _extract_upload_async(file, max_chars=max_chars)
 
         print(f"📄 OCR extracted {len(extracted_text)} chars from '{file.filename}'")
 
@@ -163,7 +244,9 @@ async def prepurchase_upload(file: UploadFile = File(...)):
                 ),
             )
 
-        result = _engines["pre_purchase"].run(extracted_text)
+        result = await _run_in(
+            _INFERENCE_EXECUTOR, _engines["pre_purchase"].run, extracted_text, full_document,
+        )
         return result.model_dump()
 
     except HTTPException:
@@ -198,33 +281,15 @@ async def audit_upload(
     medical_file:   UploadFile | None = File(None),
 ):
     try:
-        # Extract policy document
-        policy_bytes = await policy_file.read()
-        policy_text  = _extract_upload(
-            filename     = policy_file.filename or "",
-            content_type = policy_file.content_type or "",
-            content      = policy_bytes,
+        # Extract all documents concurrently, off the event loop
+        policy_text, rejection_text, medical_text = await asyncio.gather(
+            _extract_upload_async(policy_file),
+            _extract_upload_async(rejection_file),
+            _extract_upload_async(medical_file) if medical_file else asyncio.sleep(0, result=""),
         )
         print(f"📄 Policy OCR: {len(policy_text)} chars")
-
-        # Extract rejection letter
-        rejection_bytes = await rejection_file.read()
-        rejection_text  = _extract_upload(
-            filename     = rejection_file.filename or "",
-            content_type = rejection_file.content_type or "",
-            content      = rejection_bytes,
-        )
         print(f"📄 Rejection OCR: {len(rejection_text)} chars")
-
-        # Extract optional medical records
-        medical_text = ""
         if medical_file:
-            medical_bytes = await medical_file.read()
-            medical_text  = _extract_upload(
-                filename     = medical_file.filename or "",
-                content_type = medical_file.content_type or "",
-                content      = medical_bytes,
-            )
             print(f"📄 Medical OCR: {len(medical_text)} chars")
 
         # Validate minimum content
@@ -241,7 +306,7 @@ async def audit_upload(
             user_explanation       = None,
         )
 
-        result = _engines["post_rejection"].run(audit_request)
+        result = await _run_in(_INFERENCE_EXECUTOR, _engines["post_rejection"].run, audit_request)
         return result.model_dump()
 
     except HTTPException:
@@ -277,7 +342,17 @@ def report_chat(request: ReportChatRequest):
         raise HTTPException(500, "Chat service error.")
 
 
-        # main.py — add this after /report-chat
+@app.post("/report-chat/stream")
+def report_chat_stream(request: ReportChatRequest):
+    """SSE variant of /report-chat — token events, then a final 'done' event."""
+    return _sse(stream_report_chat(
+        model         = _engines["model"],
+        tokenizer     = _engines["tokenizer"],
+        report_data   = request.report_data,
+        user_question = request.question,
+        lang          = request.lang,
+    ))
+
 
 class LearnRequest(BaseModel):
     question: str
@@ -290,11 +365,8 @@ def learn(request: LearnRequest):
     Answers general insurance literacy questions in any supported language.
     """
     try:
-        from llm.report_chat_prompt import learn_prompt
-        from engines import inference
-
         prompt = learn_prompt(request.question, lang=request.lang)
-        raw = inference.generate(
+        raw = generate(
             prompt,
             _engines["model"],
             _engines["tokenizer"],
@@ -316,6 +388,36 @@ def learn(request: LearnRequest):
         raise HTTPException(500, "Learn service error.")
 
 
+@app.post("/learn/stream")
+def learn_stream(request: LearnRequest):
+    """SSE variant of /learn."""
+
+    def _events():
+        prompt = learn_prompt(request.question, lang=request.lang)
+        answer = ""
+        for piece in generate_stream(
+            prompt,
+            _engines["model"],
+            _engines["tokenizer"],
+            max_new_tokens=400,
+            temperature=0.4,
+        ):
+            if not answer:
+                piece = piece.lstrip()
+            if piece:
+                answer += piece
+                yield {"type": "token", "text": piece}
+
+        answer = answer.strip()
+        if len(answer) < 8:
+            answer = _learn_fallback(request.question, request.lang)
+            yield {"type": "token", "text": answer}
+
+        yield {"type": "done", "answer": answer, "sources": _learn_sources(request.question)}
+
+    return _sse(_events())
+
+
 def _learn_fallback(question: str, lang: str) -> str:
     """Static answers for common insurance literacy questions."""
     q = question.lower()
@@ -447,6 +549,18 @@ def continue_chat(request: ContinueChatRequest):
         raise HTTPException(500, "Chat service error.")
 
 
+@app.post("/chat/stream")
+def continue_chat_stream(request: ContinueChatRequest):
+    """SSE variant of /chat — token events, then a final 'done' event."""
+    return _sse(stream_report_chat(
+        model         = _engines["model"],
+        tokenizer     = _engines["tokenizer"],
+        session_id    = request.session_id,
+        user_question = request.question,
+        lang          = request.lang,
+    ))
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # POLICY COMPARISON
 # ══════════════════════════════════════════════════════════════════════════════
@@ -469,6 +583,33 @@ def compare_policies(request: PolicyComparisonRequest):
         raise HTTPException(500, "Comparison engine error.")
 
 
+class PolicyMatrixRequest(BaseModel):
+    policies: list[str]
+    names:    list[str] | None = None   # defaults to "Policy A", "Policy B", ...
+
+
+# Policies per /compare/matrix call — an advisor shortlist, not a catalogue
+_COMPARE_MATRIX_MAX = 12
+
+
+@app.post("/compare/matrix", response_model=PolicyComparisonMatrix)
+def compare_matrix(request: PolicyMatrixRequest):
+    """
+    N-way comparison: each policy is analysed once, then ranked and diffed
+    pairwise from the reports — N LLM calls instead of one /compare per pair.
+    """
+    if not 2 <= len(request.policies) <= _COMPARE_MATRIX_MAX:
+        raise HTTPException(422, f"Compare between 2 and {_COMPARE_MATRIX_MAX} policies.")
+    try:
+        result = _engines["comparison"].compare_matrix(request.policies, request.names)
+        return result.model_dump()
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    except Exception as e:
+        print("⚠️ /compare/matrix error:", e)
+        raise HTTPException(500, "Comparison engine error.")
+
+
 # ── Comparison — file upload ──────────────────────────────────────────────────
 
 @app.post("/compare/upload")
@@ -477,14 +618,10 @@ async def compare_upload(
     policy_b_file: UploadFile = File(...),
 ):
     try:
-        a_bytes = await policy_a_file.read()
-        b_bytes = await policy_b_file.read()
-
-        policy_a_text = _extract_upload(
-            policy_a_file.filename or "", policy_a_file.content_type or "", a_bytes
-        )
-        policy_b_text = _extract_upload(
-            policy_b_file.filename or "", policy_b_file.content_type or "", b_bytes
+        # Both sides go through PrePurchaseEngine — extract only what it reads
+        policy_a_text, policy_b_text = await asyncio.gather(
+            _extract_upload_async(policy_a_file, max_chars=_PREPURCHASE_MAX_CHARS),
+            _extract_upload_async(policy_b_file, max_chars=_PREPURCHASE_MAX_CHARS),
         )
 
         print(f"📄 Compare A: {len(policy_a_text)} chars | B: {len(policy_b_text)} chars")
@@ -492,7 +629,8 @@ async def compare_upload(
         if len(policy_a_text) < 80 or len(policy_b_text) < 80:
             raise HTTPException(422, "Could not extract sufficient text from one or both files.")
 
-        result = _engines["comparison"].compare(
+        result = await _run_in(
+            _INFERENCE_EXECUTOR, _engines["comparison"].compare,
             policy_a_text = policy_a_text,
             policy_b_text = policy_b_text,
         )
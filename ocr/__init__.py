@@ -1,2 +1,2 @@
 # ocr/__init__.py
-from ocr.extractor import extract_text_from_file, extract_text_from_bytes
\ No newline at end of file
+from ocr.extractor import extract_text_from_file, extract_text_from_bytes, extract_with_metadata
@@ -29,6 +29,22 @@
 # TESSERACT SYSTEM INSTALL (Ubuntu/Debian):
 #   sudo apt-get install tesseract-ocr tesseract-ocr-hin tesseract-ocr-mar \
 #                        tesseract-ocr-tam tesseract-ocr-eng
+#
+# PARALLEL PAGE OCR
+# ─────────────────
+# Scanned pages are rendered and Tesseract'd in a process pool (one page per
+# task). The PDF is written to a temp file once and workers open it by path,
+# so only page indices and text cross the process boundary. Results are
+# yielded in page order as soon as each next page is done.
+# Pool size: OCR_MAX_WORKERS, or configure_ocr_pool(n) at startup (main.py
+# calls it with CAREBRIDGE_OCR_WORKERS when set).
+#
+# LAZY, BUDGETED EXTRACTION
+# ─────────────────────────
+# PDFs are read as a generator of cleaned page text (_pdf_pages). Callers
+# pass max_chars — the text they will actually use — and extraction stops
+# rendering / OCRing as soon as that much text is in hand. At most
+# OCR_MAX_WORKERS scanned pages are in flight ahead of the consumer.
 # ══════════════════════════════════════════════════════════════════════════════
 
 from __future__ import annotations
@@ -37,8 +53,13 @@ import io
 import os
 import re
 import logging
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Union
+from typing import Iterator, Union
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +112,49 @@ _MIN_TEXT_PAGE_CHARS = 30
 # Max characters to pass to the LLM (MedGemma context window safety)
 _MAX_OUTPUT_CHARS = 4000
 
+# Render resolution for OCR — 200 DPI is sufficient for Tesseract accuracy
+_OCR_DPI = 200
+
+# Page-OCR process pool size — leave one core for the request threads
+OCR_MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# OCR PROCESS POOL
+# ══════════════════════════════════════════════════════════════════════════════
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def configure_ocr_pool(max_workers: int) -> None:
+    """Set the page-OCR pool size. 1 runs OCR in the calling thread."""
+    global OCR_MAX_WORKERS, _pool
+    with _pool_lock:
+        OCR_MAX_WORKERS = max(1, int(max_workers))
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _get_ocr_pool() -> ProcessPoolExecutor | None:
+    global _pool
+    if OCR_MAX_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            try:
+                # spawn — the API process holds CUDA and scheduler threads, unsafe to fork
+                _pool = ProcessPoolExecutor(
+                    max_workers=OCR_MAX_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"OCR pool started ({OCR_MAX_WORKERS} workers)")
+            except Exception as e:
+                logger.warning(f"OCR pool unavailable ({e}) — OCR runs serially")
+                return None
+        return _pool
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # PUBLIC API
@@ -122,6 +186,7 @@ def extract_text_from_bytes(
     data: bytes,
     filename: str = "",
     mime_type: str = "",
+    max_chars: int = _MAX_OUTPUT_CHARS,
 ) -> str:
     """
     Extract text from raw bytes (FastAPI UploadFile.read()).
@@ -131,21 +196,43 @@ def extract_text_from_bytes(
     data      : raw file bytes
     filename  : original filename (used for extension hint)
     mime_type : MIME type if known (e.g. "application/pdf", "image/jpeg")
+    max_chars : characters the caller will use — PDF pages past this
+                budget are never extracted or OCR'd
+    """
+    return extract_with_metadata(data, filename, mime_type, max_chars)[0]
+
+
+def extract_with_metadata(
+    data: bytes,
+    filename: str = "",
+    mime_type: str = "",
+    max_chars: int = _MAX_OUTPUT_CHARS,
+) -> tuple[str, str, bool]:
+    """
+    Same as extract_text_from_bytes(), plus the name of the layer that
+    produced the text: "pdfplumber" | "pymupdf" | "pdfminer" | "pdf_ocr" |
+    "image_ocr" | "text" | "raw" — or "none" if every layer came back empty —
+    and whether extraction stopped on the max_chars budget (True means the
+    document may hold more text than was returned).
     """
     if not data:
-        return ""
+        return "", "none", False
 
     # Detect type
     detected = _detect_type(data, filename, mime_type)
 
     if detected == "pdf":
-        return _extract_pdf_bytes(data)
+        return _extract_pdf_layers(data, max_chars)
     elif detected == "image":
-        return _ocr_image_bytes(data)
+        return _budgeted(_ocr_image_bytes(data), "image_ocr", max_chars)
     elif detected == "text":
-        return data.decode("utf-8", errors="replace")[:_MAX_OUTPUT_CHARS]
+        return _budgeted(data.decode("utf-8", errors="replace"), "text", max_chars)
     else:
-        return _extract_unknown_bytes(data)
+        return _extract_unknown_layers(data, max_chars)
+
+
+def _budgeted(text: str, layer: str, max_chars: int) -> tuple[str, str, bool]:
+    return text[:max_chars], (layer if text else "none"), len(text) > max_chars
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -190,120 +277,231 @@ def _detect_type(data: bytes, filename: str, mime_type: str) -> str:
 # PDF EXTRACTION — 3-layer fallback
 # ══════════════════════════════════════════════════════════════════════════════
 
-def _extract_pdf_bytes(data: bytes) -> str:
+def _extract_pdf_bytes(data: bytes, max_chars: int = _MAX_OUTPUT_CHARS) -> str:
+    return _extract_pdf_layers(data, max_chars)[0]
+
+
+def _extract_pdf_layers(data: bytes, max_chars: int = _MAX_OUTPUT_CHARS) -> tuple[str, str, bool]:
+    """
+    Pull pages until max_chars of text is collected, then stop.
+    Returns (text, name of the layer that produced it, stopped on budget).
+    Stopping is reported even if the page that hit the budget was the last
+    one — the remaining pages were never looked at.
+    """
+    pages: list[str] = []
+    layer = "none"
+    total = 0
+    stopped = False
+
+    page_iter = _pdf_pages(data)
+    try:
+        for layer, page_text in page_iter:
+            pages.append(page_text)
+            total += len(page_text) + 2
+            if total >= max_chars:
+                stopped = True
+                break
+    finally:
+        page_iter.close()
+
+    if not pages:
+        logger.error("All PDF extraction methods failed — returning empty string")
+    text, layer, truncated = _budgeted(_clean("\n\n".join(pages)), layer, max_chars)
+    return text, layer, stopped or truncated
+
+
+def _pdf_pages(data: bytes) -> Iterator[tuple[str, str]]:
     """
     Layer 1: pdfplumber  — best for structured policy PDFs
     Layer 2: pymupdf     — faster, handles more edge cases
     Layer 3: pdfminer    — slowest but most compatible
     Layer 4: OCR         — scanned PDFs with no text layer
-    """
-    text = ""
 
-    # ── Layer 1: pdfplumber ───────────────────────────────────────────────────
-    if _HAS_PDFPLUMBER and not text:
-        try:
-            text = _pdfplumber_extract(data)
-            if text:
-                logger.debug(f"pdfplumber: {len(text)} chars")
-        except Exception as e:
-            logger.warning(f"pdfplumber failed: {e}")
-
-    # ── Layer 2: pymupdf ──────────────────────────────────────────────────────
-    if _HAS_PYMUPDF and not text:
+    Yields (layer, cleaned page text). A layer is abandoned for the next one
+    only if it yields nothing; once it has produced a page it is kept.
+    """
+    layers = []
+    if _HAS_PDFPLUMBER:
+        layers.append(("pdfplumber", _pdfplumber_pages))
+    if _HAS_PYMUPDF:
+        layers.append(("pymupdf", _pymupdf_pages))
+    if _HAS_PDFMINER:
+        layers.append(("pdfminer", _pdfminer_pages))
+    if _HAS_TESSERACT and _HAS_PYMUPDF:
+        layers.append(("pdf_ocr", _ocr_pdf_pages))
+
+    for layer, pages_fn in layers:
+        produced = False
+        page_iter = pages_fn(data)
         try:
-            text = _pymupdf_extract(data)
-            if text:
-                logger.debug(f"pymupdf: {len(text)} chars")
+            for page_text in page_iter:
+                page_text = _clean(page_text)
+                if page_text:
+                    produced = True
+                    yield layer, page_text
         except Exception as e:
-            logger.warning(f"pymupdf failed: {e}")
+            logger.warning(f"{layer} failed: {e}")
+        finally:
+            page_iter.close()
+        if produced:
+            logger.debug(f"{layer}: text layer used")
+            return
 
-    # ── Layer 3: pdfminer ─────────────────────────────────────────────────────
-    if _HAS_PDFMINER and not text:
-        try:
-            text = pdfminer_extract(io.BytesIO(data)) or ""
-            text = _clean(text)
-            logger.debug(f"pdfminer: {len(text)} chars")
-        except Exception as e:
-            logger.warning(f"pdfminer failed: {e}")
 
-    # ── Layer 4: OCR fallback for scanned PDFs ────────────────────────────────
-    if not text and _HAS_TESSERACT and _HAS_PYMUPDF:
-        try:
-            text = _ocr_pdf_via_pymupdf(data)
-            logger.debug(f"OCR fallback: {len(text)} chars")
-        except Exception as e:
-            logger.warning(f"PDF OCR fallback failed: {e}")
+def _pdfplumber_pages(data: bytes) -> Iterator[str]:
+    """
+    pdfplumber with per-page text extraction, yielded in page order.
+    If a page has <30 chars (scanned), falls back to OCR for that page —
+    those pages are OCR'd in the process pool while text pages keep going.
+    """
+    ocr = _PageOcr(data)
+
+    def entries():
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            for page_num, page in enumerate(pdf.pages):
+                try:
+                    page_text = page.extract_text(
+                        x_tolerance=3,
+                        y_tolerance=3,
+                        layout=True,
+                    ) or ""
+                except Exception as e:
+                    logger.warning(f"pdfplumber page {page_num+1} error: {e}")
+                    page_text = ""
+
+                if len(page_text.strip()) < _MIN_TEXT_PAGE_CHARS and _HAS_TESSERACT:
+                    # Scanned page — OCR it
+                    logger.debug(f"Page {page_num+1}: OCR fallback")
+                    yield ocr.submit(page_num)
+                else:
+                    yield page_text.strip()
+
+    yield from _in_page_order(entries(), ocr)
+
+
+def _pymupdf_pages(data: bytes) -> Iterator[str]:
+    """pymupdf text extraction — fast and handles rotated/complex PDFs."""
+    doc = fitz.open(stream=data, filetype="pdf")
+    try:
+        for page in doc:
+            text = page.get_text("text")
+            if text.strip():
+                yield text.strip()
+    finally:
+        doc.close()
 
-    if not text:
-        logger.error("All PDF extraction methods failed — returning empty string")
 
-    return text[:_MAX_OUTPUT_CHARS]
+def _pdfminer_pages(data: bytes) -> Iterator[str]:
+    """pdfminer has no cheap per-page entry point — whole document as one page."""
+    yield pdfminer_extract(io.BytesIO(data)) or ""
 
 
-def _pdfplumber_extract(data: bytes) -> str:
+def _ocr_pdf_pages(data: bytes) -> Iterator[str]:
     """
-    pdfplumber with per-page text extraction.
-    If a page has <30 chars (scanned), falls back to OCR for that page.
+    Render each PDF page as an image, then run Tesseract.
+    Used when the PDF has no text layer (fully scanned).
     """
-    pages_text: list[str] = []
+    ocr = _PageOcr(data)
+    doc = fitz.open(stream=data, filetype="pdf")
+    page_count = doc.page_count
+    doc.close()
+    yield from _in_page_order((ocr.submit(i) for i in range(page_count)), ocr)
 
-    with pdfplumber.open(io.BytesIO(data)) as pdf:
-        for page_num, page in enumerate(pdf.pages):
-            try:
-                page_text = page.extract_text(
-                    x_tolerance=3,
-                    y_tolerance=3,
-                    layout=True,
-                ) or ""
-
-                if len(page_text.strip()) < _MIN_TEXT_PAGE_CHARS:
-                    # Scanned page — try OCR
-                    if _HAS_TESSERACT:
-                        img = page.to_image(resolution=200).original
-                        page_text = _ocr_pil_image(img)
-                        logger.debug(f"Page {page_num+1}: OCR fallback ({len(page_text)} chars)")
-                    else:
-                        logger.debug(f"Page {page_num+1}: blank, no OCR available")
-
-                if page_text.strip():
-                    pages_text.append(page_text.strip())
 
-            except Exception as e:
-                logger.warning(f"pdfplumber page {page_num+1} error: {e}")
-                continue
-
-    return _clean("\n\n".join(pages_text))
+# ── Parallel page OCR ─────────────────────────────────────────────────────────
 
+class _PageOcr:
+    """
+    Page-OCR dispatcher for one document. submit() returns a handle — a
+    pool future, or the page index when OCR runs in-process (deferred until
+    resolve(), so serial OCR is lazy too).
+    """
 
-def _pymupdf_extract(data: bytes) -> str:
-    """pymupdf text extraction — fast and handles rotated/complex PDFs."""
-    doc   = fitz.open(stream=data, filetype="pdf")
-    pages = []
-    for page in doc:
-        text = page.get_text("text")
-        if text.strip():
-            pages.append(text.strip())
-    doc.close()
-    return _clean("\n\n".join(pages))
+    def __init__(self, data: bytes):
+        self.data     = data
+        self.pool     = _get_ocr_pool()
+        self.window   = OCR_MAX_WORKERS
+        self.inflight = 0
+        self._path    = None
+        self._futures = []
+
+    @property
+    def full(self) -> bool:
+        """True when the consumer should wait on the oldest page before reading ahead."""
+        return self.pool is None or self.inflight >= self.window
+
+    def submit(self, page_index: int):
+        if self.pool is None:
+            return page_index
+        if self._path is None:
+            fd, self._path = tempfile.mkstemp(suffix=".pdf", prefix="carebridge_ocr_")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.data)
+        future = self.pool.submit(_ocr_pdf_page, self._path, page_index)
+        self._futures.append(future)
+        self.inflight += 1
+        return future
+
+    def resolve(self, entry) -> str:
+        if isinstance(entry, str):
+            return entry
+        try:
+            if isinstance(entry, int):
+                return _ocr_pdf_page(self.data, entry)
+            self.inflight -= 1
+            return entry.result()
+        except Exception as e:
+            logger.warning(f"OCR page failed: {e}")
+            return ""
+
+    def close(self) -> None:
+        for future in self._futures:
+            future.cancel()
+        if self._path is not None:
+            # Still-running workers hold the file open — unlink is safe on POSIX
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+            self._path = None
 
 
-def _ocr_pdf_via_pymupdf(data: bytes) -> str:
+def _in_page_order(entries: Iterator, ocr: _PageOcr) -> Iterator[str]:
     """
-    Render each PDF page as an image via pymupdf, then run Tesseract.
-    Used when the PDF has no text layer (fully scanned).
+    Yield page texts in order from a stream of texts and OCR handles.
+    Reads ahead only while fewer than ocr.window pages are being OCR'd, so
+    stopping early never leaves more than that much work behind.
     """
-    doc   = fitz.open(stream=data, filetype="pdf")
-    pages = []
-    for page in doc:
-        # 200 DPI is sufficient for Tesseract accuracy
-        mat  = fitz.Matrix(200 / 72, 200 / 72)
-        pix  = page.get_pixmap(matrix=mat, alpha=False)
-        img  = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        text = _ocr_pil_image(img)
-        if text.strip():
-            pages.append(text.strip())
-    doc.close()
-    return _clean("\n\n".join(pages))
+    buffer: deque = deque()
+    try:
+        for entry in entries:
+            buffer.append(entry)
+            while buffer and (isinstance(buffer[0], str) or ocr.full):
+                yield ocr.resolve(buffer.popleft())
+        while buffer:
+            yield ocr.resolve(buffer.popleft())
+    finally:
+        entries.close()
+        ocr.close()
+
+
+def _ocr_pdf_page(source: Union[str, bytes], page_index: int) -> str:
+    """
+    Render one PDF page and OCR it. `source` is a path (process-pool task)
+    or the PDF bytes (in-process).
+    """
+    if _HAS_PYMUPDF:
+        doc = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+        try:
+            mat = fitz.Matrix(_OCR_DPI / 72, _OCR_DPI / 72)
+            pix = doc[page_index].get_pixmap(matrix=mat, alpha=False)
+            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        finally:
+            doc.close()
+    else:
+        with pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source)) as pdf:
+            img = pdf.pages[page_index].to_image(resolution=_OCR_DPI).original
+    return _ocr_pil_image(img)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -361,13 +559,17 @@ def _ocr_pil_image(img: "Image.Image") -> str:
 # ══════════════════════════════════════════════════════════════════════════════
 
 def _extract_unknown_bytes(data: bytes) -> str:
+    return _extract_unknown_layers(data)[0]
+
+
+def _extract_unknown_layers(data: bytes, max_chars: int = _MAX_OUTPUT_CHARS) -> tuple[str, str, bool]:
     """Try PDF, then image OCR, then raw UTF-8 decode."""
     # Try PDF
     if data[:4] == b"%PDF" or _HAS_PDFPLUMBER:
         try:
-            text = _extract_pdf_bytes(data)
+            text, layer, truncated = _extract_pdf_layers(data, max_chars)
             if text:
-                return text
+                return text, layer, truncated
         except Exception:
             pass
 
@@ -376,15 +578,15 @@ def _extract_unknown_bytes(data: bytes) -> str:
         try:
             text = _ocr_image_bytes(data)
             if text:
-                return text
+                return _budgeted(text, "image_ocr", max_chars)
         except Exception:
             pass
 
     # Raw decode as last resort
     try:
-        return data.decode("utf-8", errors="replace")[:_MAX_OUTPUT_CHARS]
+        return _budgeted(data.decode("utf-8", errors="replace"), "raw", max_chars)
     except Exception:
-        return ""
+        return "", "none", False
 
 
 # ══════════════════════════════════════════════════════════════════════════════
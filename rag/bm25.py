@@ -0,0 +1,77 @@
+# rag/bm25.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — BM25 Sparse Index
+#
+# Okapi BM25 over the regulatory chunks, backed by an inverted index
+# (term → [(chunk id, term frequency)]). Scoring only touches the postings of
+# the query terms, so a lookup over a few hundred chunks is microseconds and
+# needs no model. Used by HybridRegulatoryRetriever for sparse-only answers
+# and as the lexical half of reciprocal-rank fusion.
+#
+# Pure Python — no numpy, no faiss.
+# ══════════════════════════════════════════════════════════════════════════════
+
+import math
+import re
+from collections import Counter, defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Function words that carry no retrieval signal in regulatory text
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have if in is it its of on or shall
+that the this to was were will with within any such may not no be been
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+
+    def __init__(self, docs: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.doc_len: list[int] = []
+
+        for doc_id, doc in enumerate(docs):
+            terms = tokenize(doc)
+            self.doc_len.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((doc_id, tf))
+
+        self.n_docs = len(docs)
+        self.avg_len = (sum(self.doc_len) / self.n_docs) if self.n_docs else 0.0
+
+        # Lucene-style idf — always positive, even for very common terms
+        self.idf = {
+            term: math.log(1 + (self.n_docs - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def known_terms(self, query: str) -> tuple[int, int]:
+        """(query terms in the vocabulary, total query terms)"""
+        terms = set(tokenize(query))
+        return sum(1 for t in terms if t in self.postings), len(terms)
+
+    def search(self, query: str, top_k: int = 5) -> list[tuple[int, float]]:
+        """Top-k (chunk id, score), best first. Chunks with no query term are never returned."""
+        scores: dict[int, float] = defaultdict(float)
+        k1, b, avg = self.k1, self.b, self.avg_len or 1.0
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in postings:
+                norm = k1 * (1 - b + b * self.doc_len[doc_id] / avg)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
@@ -0,0 +1,218 @@
+# rag/build_index.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Persisted Regulatory Index
+#
+# Offline build step for HybridRegulatoryRetriever. Chunks every file in
+# rag/regulatory_docs, embeds the chunks once and writes to rag/index/:
+#
+#   regulatory.faiss   FAISS index (IndexFlatL2)
+#   chunks.json        chunks + metadata (rag/chunking.py), in index order
+#   manifest.json      doc content hashes + embedding / chunking parameters,
+#                      and which docs could not be read
+#
+# At runtime load_index() memory-maps the FAISS file, so startup is a file
+# open and every worker process shares one copy in the OS page cache. The
+# index is rebuilt only when the manifest no longer matches the docs. A doc
+# that fails to read is recorded as failed under its hash, so it is retried
+# once it changes — not on every start.
+#
+# faiss is imported on first use: sparse-only mode (load_chunks) and the
+# manifest check run without it.
+#
+# Run: python -m rag.build_index [--force]
+# ══════════════════════════════════════════════════════════════════════════════
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from rag.chunking import MAX_CHUNK_CHARS, Chunk, chunk_document
+
+
+_RAG_DIR   = Path(__file__).resolve().parent
+DOCS_DIR   = _RAG_DIR / "regulatory_docs"
+INDEX_DIR  = _RAG_DIR / "index"
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+
+# Bump when chunk boundaries change so stored indexes are rebuilt
+_CHUNKER = "structure-v1"
+
+_INDEX_FILE    = "regulatory.faiss"
+_CHUNKS_FILE   = "chunks.json"
+_MANIFEST_FILE = "manifest.json"
+
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+def _mmap_flags(faiss) -> int:
+    """Zero-copy mmap of flat codes where this faiss build supports it."""
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# MANIFEST
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _doc_files(docs_dir: Path) -> list[Path]:
+    return sorted(docs_dir.glob("*.txt")) if docs_dir.exists() else []
+
+
+def _doc_hash(file: Path) -> str:
+    try:
+        return hashlib.blake2b(file.read_bytes(), digest_size=20).hexdigest()
+    except OSError:
+        return "unreadable"
+
+
+def _manifest_for(docs_dir: Path) -> dict:
+    """Everything that determines the index contents."""
+    return {
+        "embed_model":     EMBED_MODEL,
+        "chunker":         _CHUNKER,
+        "max_chunk_chars": MAX_CHUNK_CHARS,
+        "docs": {f.name: _doc_hash(f) for f in _doc_files(docs_dir)},
+    }
+
+
+def _read_manifest(index_dir: Path) -> dict | None:
+    try:
+        return json.loads((index_dir / _MANIFEST_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def index_is_current(docs_dir: Path = DOCS_DIR, index_dir: Path = INDEX_DIR) -> bool:
+    stored = _read_manifest(index_dir)
+    if stored is None or not (index_dir / _INDEX_FILE).exists():
+        return False
+    wanted = _manifest_for(docs_dir)
+    return all(stored.get(k) == v for k, v in wanted.items())
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# BUILD / LOAD
+# ══════════════════════════════════════════════════════════════════════════════
+
+def chunk_documents(docs_dir: Path = DOCS_DIR) -> tuple[list[Chunk], list[str]]:
+    """(chunks in index order, names of files that could not be read)"""
+    chunks: list[Chunk] = []
+    failed: list[str] = []
+    for file in _doc_files(docs_dir):
+        try:
+            content = file.read_text(encoding="utf-8", errors="ignore")
+            file_chunks = chunk_document(content, file.name)
+            chunks.extend(file_chunks)
+            print(f"  Loaded {len(file_chunks)} chunks from {file.name}")
+        except Exception as e:
+            print(f"⚠️ Failed to load {file.name}: {e}")
+            failed.append(file.name)
+    return chunks, failed
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_index(
+    embed_model=None,
+    docs_dir: Path = DOCS_DIR,
+    index_dir: Path = INDEX_DIR,
+    force: bool = False,
+) -> bool:
+    """
+    Chunk, embed and persist the regulatory docs. Returns False when the
+    stored index already matches the docs and force is not set.
+    """
+    if not force and index_is_current(docs_dir, index_dir):
+        return False
+
+    manifest = _manifest_for(docs_dir)
+    chunks, failed = chunk_documents(docs_dir)
+    # Failed docs keep their hash — the manifest stays current until they change
+    manifest["failed"] = failed
+
+    if not chunks:
+        print("⚠️ No chunks to index — skipping FAISS build")
+        return False
+
+    if embed_model is None:
+        from sentence_transformers import SentenceTransformer
+        embed_model = SentenceTransformer(EMBED_MODEL)
+
+    embeddings = embed_model.encode(
+        [c.text for c in chunks], batch_size=64, show_progress_bar=False
+    )
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    # IndexFlatL2 = exact search, fine for <10k chunks
+    faiss = _faiss()
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+
+    # Manifest goes last — a crash mid-build leaves the old manifest, which
+    # no longer matches, so the next start rebuilds instead of loading junk.
+    index_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(index_dir / _INDEX_FILE, faiss.serialize_index(index).tobytes())
+    _write_atomic(
+        index_dir / _CHUNKS_FILE,
+        json.dumps([c.to_dict() for c in chunks], ensure_ascii=False).encode("utf-8"),
+    )
+    manifest["chunks"]    = len(chunks)
+    manifest["dimension"] = int(embeddings.shape[1])
+    _write_atomic(index_dir / _MANIFEST_FILE, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    print(f"✅ Regulatory index built — {len(chunks)} chunks → {index_dir}")
+    return True
+
+
+def _read_chunks(index_dir: Path) -> list[Chunk]:
+    data = json.loads((index_dir / _CHUNKS_FILE).read_text(encoding="utf-8"))
+    return [Chunk.from_dict(d) for d in data]
+
+
+def load_index(index_dir: Path = INDEX_DIR) -> tuple["faiss.Index", list[Chunk]]:
+    """Memory-map the persisted index and load its chunks."""
+    faiss = _faiss()
+    path  = str(index_dir / _INDEX_FILE)
+    try:
+        index = faiss.read_index(path, _mmap_flags(faiss))
+    except RuntimeError as e:
+        print(f"⚠️ mmap load failed ({e}) — reading index into memory")
+        index = faiss.read_index(path)
+    return index, _read_chunks(index_dir)
+
+
+def load_chunks(docs_dir: Path = DOCS_DIR, index_dir: Path = INDEX_DIR) -> list[Chunk]:
+    """Chunks without touching FAISS or the embedding model (sparse-only mode)."""
+    if index_is_current(docs_dir, index_dir):
+        return _read_chunks(index_dir)
+    return chunk_documents(docs_dir)[0]
+
+
+def load_or_build_index(embed_model=None) -> tuple["faiss.Index | None", list[Chunk]]:
+    """Runtime entry point: rebuild only if a source doc changed, then load."""
+    try:
+        build_index(embed_model)
+        if not index_is_current():
+            return None, []
+        return load_index()
+    except Exception as e:
+        print(f"⚠️ Regulatory index unavailable: {e}")
+        return None, []
+
+
+if __name__ == "__main__":
+    if not build_index(force="--force" in sys.argv[1:]):
+        print("✅ Regulatory index is up to date")
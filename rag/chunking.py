@@ -0,0 +1,170 @@
+# rag/chunking.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Structure-Aware Regulatory Chunker
+#
+# Regulatory text is split along its own structure instead of fixed windows:
+#
+#   section   ALL-CAPS heading line ("WAITING PERIOD", "STEP 2 — IGMS") or a
+#             numbered heading ("4.2.", "Regulation 12", "Section 3(a)")
+#   sub-clause ALL-CAPS line ending in ':' inside a section
+#             ("ELIGIBILITY TO FILE BEFORE OMBUDSMAN:")
+#   paragraph blank-line separated block; bullet lists stay with their lead-in
+#
+# Paragraphs of one (sub-)section are packed into chunks of up to
+# MAX_CHUNK_CHARS, never across a section boundary and never mid-paragraph —
+# only a paragraph longer than the budget is split, at sentence ends.
+# Chunks do not overlap, so identical-text duplicates no longer occur.
+#
+# Every chunk carries its source file, section id and [start, end) offsets:
+# text == document[start:end], so reports can cite the exact section.
+# ══════════════════════════════════════════════════════════════════════════════
+
+import re
+
+MAX_CHUNK_CHARS = 1000
+_MIN_CHUNK_CHARS = 30    # heading-only fragments carry no content
+
+PREAMBLE = "Preamble"
+
+_PARAGRAPH_RE = re.compile(r"\S[\s\S]*?(?=\n[ \t]*\n|\Z)")
+_SENTENCE_END_RE = re.compile(r"(?<=[.;!?])\s+(?=[A-Z0-9(\-])")
+
+# "WAITING PERIOD", "STEP 1 — INSURER GRIEVANCE OFFICER", "THIRD PARTY ADMINISTRATORS (TPA)"
+_CAPS_HEADING_RE = re.compile(r"^[A-Z0-9][A-Z0-9 ,&()'/.—–\-]*:?$")
+
+# "4.", "4.2)", "Regulation 12", "Section 3(a)" — a bare "30 days" is not a heading
+_NUMBERED_RE = re.compile(
+    r"^(?:(?P<word>section|regulation|clause|chapter|article|rule)\s+(?P<wnum>\d+(?:\.\d+)*(?:\([a-z0-9]+\))?)"
+    r"|(?P<num>\d+(?:\.\d+)*)[.)])(?=\s|$)",
+    re.IGNORECASE,
+)
+
+
+class Chunk:
+    """A contiguous span of one regulatory document."""
+
+    __slots__ = ("text", "source", "section", "start", "end")
+
+    def __init__(self, text: str, source: str, section: str, start: int, end: int):
+        self.text    = text
+        self.source  = source
+        self.section = section
+        self.start   = start
+        self.end     = end
+
+    def to_dict(self) -> dict:
+        return {
+            "text": self.text, "source": self.source, "section": self.section,
+            "start": self.start, "end": self.end,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Chunk":
+        return cls(d["text"], d["source"], d["section"], d["start"], d["end"])
+
+    def __repr__(self) -> str:
+        return f"Chunk({self.source}:{self.start}-{self.end} § {self.section!r})"
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# HEADINGS
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _caps_heading(line: str) -> bool:
+    return (
+        len(line) <= 100
+        and sum(c.isalpha() for c in line) >= 3
+        and bool(_CAPS_HEADING_RE.match(line))
+    )
+
+
+def _numbered_heading(line: str) -> str | None:
+    m = _NUMBERED_RE.match(line)
+    if not m:
+        return None
+    if m.group("word"):
+        return f"{m.group('word').title()} {m.group('wnum')}"
+    return m.group("num")
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CHUNKING
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _sentence_spans(text: str, start: int, end: int) -> list[tuple[int, int]]:
+    spans, s = [], start
+    for m in _SENTENCE_END_RE.finditer(text, start, end):
+        spans.append((s, m.start()))
+        s = m.end()
+    spans.append((s, end))
+    return spans
+
+
+def _pack(
+    text: str,
+    source: str,
+    section: str,
+    spans: list[tuple[int, int]],
+    max_chars: int,
+) -> list[Chunk]:
+    """Greedily merge consecutive spans of one section up to max_chars."""
+    pieces: list[tuple[int, int]] = []
+    for start, end in spans:
+        if end - start > max_chars:
+            pieces.extend(_sentence_spans(text, start, end))
+        else:
+            pieces.append((start, end))
+
+    chunks: list[Chunk] = []
+    cur_start = cur_end = None
+    for start, end in pieces:
+        if cur_start is not None and end - cur_start > max_chars:
+            chunks.append(Chunk(text[cur_start:cur_end], source, section, cur_start, cur_end))
+            cur_start = None
+        if cur_start is None:
+            cur_start = start
+        cur_end = end
+    if cur_start is not None:
+        chunks.append(Chunk(text[cur_start:cur_end], source, section, cur_start, cur_end))
+
+    return [c for c in chunks if len(c.text) >= _MIN_CHUNK_CHARS]
+
+
+def chunk_document(text: str, source: str, max_chars: int = MAX_CHUNK_CHARS) -> list[Chunk]:
+    """Split one regulatory document into section-bounded chunks, in order."""
+    paragraphs = [(m.start(), m.end()) for m in _PARAGRAPH_RE.finditer(text)]
+
+    # A single-line, non-heading first paragraph is the document title
+    if paragraphs:
+        first = text[paragraphs[0][0]:paragraphs[0][1]].strip()
+        if "\n" not in first and not _caps_heading(first) and _numbered_heading(first) is None:
+            paragraphs = paragraphs[1:]
+
+    chunks: list[Chunk] = []
+    top = section = PREAMBLE
+    spans: list[tuple[int, int]] = []
+
+    def flush():
+        chunks.extend(_pack(text, source, section, spans, max_chars))
+        spans.clear()
+
+    for start, end in paragraphs:
+        end = start + len(text[start:end].rstrip())
+        first_line = text[start:end].split("\n", 1)[0].strip()
+
+        if _caps_heading(first_line):
+            flush()
+            heading = first_line.rstrip(":").strip()
+            if first_line.endswith(":") and top != PREAMBLE:
+                section = f"{top} / {heading}"     # sub-clause of the current section
+            else:
+                top = section = heading
+        elif (number := _numbered_heading(first_line)) is not None:
+            flush()
+            top = section = number
+
+        spans.append((start, end))
+
+    flush()
+    return chunks
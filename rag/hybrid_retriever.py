@@ -1,119 +1,198 @@
 # rag/hybrid_retriever.py
 
-from pathlib import Path
+import hashlib
+import re
+
 import numpy as np
 
-from sentence_transformers import SentenceTransformer
-import faiss
+from services.cache_store import LRUCache
+from rag.bm25 import BM25Index
+from rag.chunking import Chunk
+from rag.build_index import EMBED_MODEL, load_chunks, load_or_build_index
 
 
 # Minimum relevance threshold — L2 distance below this = relevant
 # All-MiniLM-L6-v2 typical range: 0.0 (identical) to ~2.0 (unrelated)
 _RELEVANCE_THRESHOLD = 1.2
 
-# Characters per chunk — enough for a complete regulatory paragraph
-_CHUNK_SIZE = 400
-_CHUNK_OVERLAP = 80
+# Reciprocal-rank fusion constant (Cormack et al. use 60)
+_RRF_K = 60
 
+# Short keyword queries whose terms are all in the BM25 vocabulary
+# ("waiting period", "ombudsman") are answered sparse-only — no encode
+_SPARSE_QUERY_MAX_TERMS = 4
+
+# Rejection letters cluster heavily — cache normalised query → embedding,
+# (embedding bucket, depth) → dense hits and (normalised query, top_k) →
+# result. 384-d float32 ≈ 1.5 KB per embedding.
+_EMBED_CACHE_ITEMS  = 4096
+_DENSE_CACHE_ITEMS  = 1024
+_RESULT_CACHE_ITEMS = 1024
+
+# Embeddings are unit-length; rounding each component to 1/64 puts
+# near-identical queries in the same dense bucket. Only the FAISS half is
+# shared by bucket — BM25 depends on the exact query terms and is re-fused.
+_BUCKET_SCALE = 64
 
-def _chunk_text(text: str, chunk_size: int, overlap: int) -> list[str]:
-    """
-    Split text into overlapping character-level chunks.
-    Overlap preserves context at chunk boundaries.
-    """
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end].strip()
-        if len(chunk) > 30:   # skip tiny fragments
-            chunks.append(chunk)
-        start += chunk_size - overlap
-    return chunks
+
+def _normalise_query(query: str) -> str:
+    return re.sub(r"[^\w]+", " ", query.lower()).strip()
+
+
+def _embedding_bucket(embedding: np.ndarray) -> str:
+    quantised = np.round(embedding * _BUCKET_SCALE).astype(np.int8)
+    return hashlib.blake2b(quantised.tobytes(), digest_size=16).hexdigest()
 
 
 class HybridRegulatoryRetriever:
     """
-    Semantic retriever over IRDAI regulatory documents.
-    Uses sentence-transformers + FAISS with relevance threshold filtering.
+    Hybrid retriever over IRDAI regulatory documents.
+    BM25 (rag/bm25.py) and sentence-transformers + a persisted FAISS index
+    with relevance threshold filtering, fused by reciprocal rank.
+    With dense=False — or if the embedding model cannot be loaded — it
+    answers from the BM25 index alone.
     Designed as a singleton — load once, reuse across requests.
     """
 
-    def __init__(self):
-        print("🔄 Loading sentence transformer...")
-        self.embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-        self.text_chunks: list[str] = []
-        self.index: faiss.Index | None = None
-        self._load_documents()
-        self._build_index()
-        print(f"✅ Retriever ready — {len(self.text_chunks)} chunks indexed")
-
-    def _load_documents(self):
-        base_path = Path("rag/regulatory_docs")
-        if not base_path.exists():
-            print("⚠️ regulatory_docs directory not found — retriever will return empty results")
-            return
-
-        for file in sorted(base_path.glob("*.txt")):
+    def __init__(self, dense: bool = True):
+        self.embed_model = None
+        self.index = None
+        self.chunks: list[Chunk] = []
+
+        if dense:
             try:
-                content = file.read_text(encoding="utf-8", errors="ignore")
-                chunks = _chunk_text(content, _CHUNK_SIZE, _CHUNK_OVERLAP)
-                self.text_chunks.extend(chunks)
-                print(f"  Loaded {len(chunks)} chunks from {file.name}")
+                from sentence_transformers import SentenceTransformer
+                print("🔄 Loading sentence transformer...")
+                self.embed_model = SentenceTransformer(EMBED_MODEL)
+                # Persisted + memory-mapped (rag/build_index.py) — re-embeds only
+                # when a regulatory doc has changed since the last build
+                self.index, self.chunks = load_or_build_index(self.embed_model)
             except Exception as e:
-                print(f"⚠️ Failed to load {file.name}: {e}")
+                print(f"⚠️ Dense retrieval unavailable ({e}) — BM25 only")
+                self.embed_model = None
 
-    def _build_index(self):
-        if not self.text_chunks:
-            print("⚠️ No chunks to index — skipping FAISS build")
-            return
+        if self.index is None:
+            self.chunks = load_chunks()
+
+        # Section-bounded, non-overlapping chunks (rag/chunking.py)
+        self.text_chunks = [c.text for c in self.chunks]
 
-        embeddings = self.embed_model.encode(
-            self.text_chunks,
-            batch_size=64,
-            show_progress_bar=False,
+        self.bm25 = BM25Index(self.text_chunks)
+        # Every chunk id → first id with identical text, for dedup in NumPy
+        first_id: dict[str, int] = {}
+        self._canonical = np.array(
+            [first_id.setdefault(chunk, i) for i, chunk in enumerate(self.text_chunks)],
+            dtype=np.int64,
         )
-        dimension = embeddings.shape[1]
+        self.embedding_cache = LRUCache(_EMBED_CACHE_ITEMS)
+        self.dense_cache     = LRUCache(_DENSE_CACHE_ITEMS)
+        self.result_cache    = LRUCache(_RESULT_CACHE_ITEMS)
+        mode = "BM25 + dense" if self.index is not None else "BM25 only"
+        print(f"✅ Retriever ready — {len(self.text_chunks)} chunks indexed ({mode})")
 
-        # IndexFlatL2 = exact search, fine for <10k chunks
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(np.array(embeddings, dtype=np.float32))
+    @property
+    def dense_available(self) -> bool:
+        return self.index is not None and self.embed_model is not None
 
-    def retrieve(self, query: str, top_k: int = 5) -> str:
+    def retrieve(self, query: str, top_k: int = 5, sparse_only: bool | None = None) -> str:
         """
         Retrieve top-k relevant regulatory chunks for a query.
-        Returns empty string if index not built or no relevant results found.
+        sparse_only=None picks automatically: BM25 alone for short keyword
+        queries or when dense retrieval is unavailable, RRF fusion otherwise.
         """
-        if self.index is None or not self.text_chunks:
+        if not self.text_chunks:
             return "Regulatory references not available."
 
-        query_embedding = self.embed_model.encode([query])
-        distances, indices = self.index.search(
-            np.array(query_embedding, dtype=np.float32),
-            min(top_k * 2, len(self.text_chunks)),  # fetch extra for threshold filtering
-        )
-
-        # ✅ Filter by relevance threshold — don't return irrelevant chunks
-        results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:
-                continue
-            if dist > _RELEVANCE_THRESHOLD:
-                continue   # too dissimilar — skip
-            results.append((dist, self.text_chunks[idx]))
+        norm      = _normalise_query(query)
+        embedding = None
+        if self.dense_available and not self._sparse_only(query, sparse_only):
+            embedding = self._embed(norm)
+
+        # ✅ Result cache — a hit skips BM25, FAISS and (with a cached
+        #    embedding) the sentence transformer entirely
+        key = ("dense" if embedding is not None else "sparse", norm, top_k)
+        result = self.result_cache.get(key)
+        if result is None:
+            scores = self._fused_scores(
+                query, embedding,
+                min(top_k * 2, len(self.text_chunks)),   # fetch extra for threshold filtering
+            )
+            result = self._format(scores, top_k)
+            self.result_cache.put(key, result)
+        return result
+
+    def cache_stats(self) -> dict:
+        return {
+            "embeddings": self.embedding_cache.stats(),
+            "dense":      self.dense_cache.stats(),
+            "results":    self.result_cache.stats(),
+        }
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+
+    def _sparse_only(self, query: str, sparse_only: bool | None) -> bool:
+        if sparse_only is not None:
+            return sparse_only
+        known, total = self.bm25.known_terms(query)
+        return 0 < total <= _SPARSE_QUERY_MAX_TERMS and known == total
+
+    def _embed(self, normalised: str) -> np.ndarray:
+        embedding = self.embedding_cache.get(normalised)
+        if embedding is None:
+            embedding = np.asarray(
+                self.embed_model.encode([normalised], show_progress_bar=False), dtype=np.float32,
+            )[0]
+            self.embedding_cache.put(normalised, embedding)
+        return embedding
+
+    def _fused_scores(self, query: str, embedding: np.ndarray | None, depth: int) -> np.ndarray:
+        """
+        Per-chunk reciprocal-rank fusion scores; 0 = not retrieved.
+        Duplicate chunk texts are folded onto one entry before fusion.
 
-        if not results:
+        With an embedding, only chunks inside the dense relevance threshold
+        are retrieved and BM25 re-ranks them — BM25 alone returns any chunk
+        sharing a single term, so it cannot say "nothing relevant".
+        """
+        rrf = 1.0 / (_RRF_K + np.arange(1, depth + 1, dtype=np.float64))
+
+        # ✅ Reciprocal-rank fusion — scale-free, so BM25 scores and L2
+        #    distances never need to be calibrated against each other
+        sparse = np.zeros(len(self.text_chunks))
+        ids = [idx for idx, _ in self.bm25.search(query, depth)]
+        if ids:
+            np.maximum.at(sparse, self._canonical[ids], rrf[:len(ids)])
+
+        if embedding is None:
+            return sparse
+
+        dense = np.zeros_like(sparse)
+        kept  = self._dense_hits(embedding, depth)
+        if kept.size:
+            np.maximum.at(dense, self._canonical[kept], rrf[:kept.size])
+        return np.where(dense > 0, sparse + dense, 0.0)
+
+    def _dense_hits(self, embedding: np.ndarray, depth: int) -> np.ndarray:
+        """Chunk ids within the relevance threshold, nearest first — shared per bucket."""
+        key  = (_embedding_bucket(embedding), depth)
+        kept = self.dense_cache.get(key)
+        if kept is None:
+            distances, indices = self.index.search(embedding[np.newaxis, :], depth)
+            # ✅ Relevance threshold — don't return irrelevant chunks. Kept hits
+            #    are re-ranked by position among the survivors.
+            kept = indices[0][(indices[0] != -1) & (distances[0] <= _RELEVANCE_THRESHOLD)]
+            self.dense_cache.put(key, kept)
+        return kept
+
+    def _format(self, scores: np.ndarray, top_k: int) -> str:
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        order = order[scores[order] > 0]
+        if order.size == 0:
             return "No relevant regulatory references found for this query."
-
-        # ✅ Sort by distance (ascending = most relevant first), deduplicate, take top_k
-        results.sort(key=lambda x: x[0])
-        seen = set()
-        final = []
-        for dist, chunk in results:
-            if chunk not in seen:
-                seen.add(chunk)
-                final.append(chunk)
-            if len(final) >= top_k:
-                break
-
-        return "\n\n".join(final)
\ No newline at end of file
+        # ✅ Cite source file + section so reports can point at the exact clause
+        return "\n\n".join(
+            f"[{self.chunks[idx].source} § {self.chunks[idx].section}]\n{self.chunks[idx].text}"
+            for idx in order
+        )
@@ -13,6 +13,25 @@ SeverityLevel    = Literal["High", "Medium", "Low"]
 AlignmentLevel   = Literal["Strong", "Partial", "Weak", "Not Detected"]
 ClarityLevel     = Literal["High", "Medium", "Low"]
 
+ClauseCategory = Literal[
+    "Pre-existing disease",
+    "Waiting period",
+    "Policy exclusion",
+    "Room rent limit",
+    "Co-payment",
+    "Insufficient documentation",
+    "Authorization requirement",
+    "Not Detected",        # ✅ explicit — no clause could be identified
+    "Other / unclear",
+]
+
+RejectionNature = Literal[
+    "Procedural",
+    "Substantive",
+    "Mixed",
+    "Not Detected",    # ✅ when nature cannot be determined
+]
+
 
 # --------------------------------------------------
 # Clause Match Result
@@ -21,17 +40,7 @@ ClarityLevel     = Literal["High", "Medium", "Low"]
 class ClauseMatchResult(BaseModel):
     """Output of clause matching step — LLM + rule-based."""
 
-    clause_category: Literal[
-        "Pre-existing disease",
-        "Waiting period",
-        "Policy exclusion",
-        "Room rent limit",
-        "Co-payment",
-        "Insufficient documentation",
-        "Authorization requirement",
-        "Not Detected",        # ✅ explicit — no clause could be identified
-        "Other / unclear",
-    ] = "Other / unclear"
+    clause_category: ClauseCategory = "Other / unclear"
 
     clause_detected:     str           = "Unclear"
     clause_clarity:      ClarityLevel  = "Low"
@@ -51,15 +60,57 @@ class DocumentationAnalysisResult(BaseModel):
 
     documentation_gap_severity: SeverityLevel = "Low"
 
-    rejection_nature: Literal[
-        "Procedural",
-        "Substantive",
-        "Mixed",
-        "Not Detected",    # ✅ when nature cannot be determined
-    ] = "Not Detected"
+    rejection_nature: RejectionNature = "Not Detected"
 
     medical_ambiguity_detected: bool = False
 
     explanation: str = "No explanation available."
 
-    confidence: ConfidenceLevel = "Low"
\ No newline at end of file
+    confidence: ConfidenceLevel = "Low"
+
+
+# --------------------------------------------------
+# Fused Audit Result
+# --------------------------------------------------
+
+class FusedAuditResult(BaseModel):
+    """
+    One-generation output covering both LLM audit steps (fused mode).
+    Flat, with clause_/doc_ prefixes where the two schemas share a field
+    name, so it compiles for constrained decoding like the others.
+    """
+
+    clause_category:     ClauseCategory  = "Other / unclear"
+    clause_detected:     str             = "Unclear"
+    clause_clarity:      ClarityLevel    = "Low"
+    rejection_alignment: AlignmentLevel  = "Partial"
+    clause_explanation:  str             = "No explanation available."
+    clause_confidence:   ConfidenceLevel = "Low"
+
+    missing_documents:          List[str] = Field(default_factory=list)
+    documentation_gap_severity: SeverityLevel = "Low"
+    rejection_nature:           RejectionNature = "Not Detected"
+    medical_ambiguity_detected: bool = False
+    doc_explanation:            str             = "No explanation available."
+    doc_confidence:             ConfidenceLevel = "Low"
+
+    def split(self) -> tuple[ClauseMatchResult, DocumentationAnalysisResult]:
+        """Back to the two schemas the override / scoring steps expect."""
+        return (
+            ClauseMatchResult(
+                clause_category=self.clause_category,
+                clause_detected=self.clause_detected,
+                clause_clarity=self.clause_clarity,
+                rejection_alignment=self.rejection_alignment,
+                explanation=self.clause_explanation,
+                confidence=self.clause_confidence,
+            ),
+            DocumentationAnalysisResult(
+                missing_documents=self.missing_documents,
+                documentation_gap_severity=self.documentation_gap_severity,
+                rejection_nature=self.rejection_nature,
+                medical_ambiguity_detected=self.medical_ambiguity_detected,
+                explanation=self.doc_explanation,
+                confidence=self.doc_confidence,
+            ),
+        )
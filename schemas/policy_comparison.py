@@ -19,4 +19,37 @@ class PolicyComparisonReport(BaseModel):
     a_advantages:       list[str] = Field(default_factory=list)
     b_advantages:       list[str] = Field(default_factory=list)
     a_risks:            list[str] = Field(default_factory=list)
-    b_risks:            list[str] = Field(default_factory=list)
\ No newline at end of file
+    b_risks:            list[str] = Field(default_factory=list)
+
+# --------------------------------------------------
+# N-way comparison (/compare/matrix)
+# --------------------------------------------------
+
+class PolicyRanking(BaseModel):
+    rank:          int
+    policy:        str
+    score:         float
+    rating:        str
+    pairwise_wins: int     # pairs this policy is recommended in
+
+
+class PairwiseComparison(BaseModel):
+    """One pair of the matrix — same diff fields as PolicyComparisonReport."""
+    policy_a:           str
+    policy_b:           str
+    score_difference:   float   # policy_a score − policy_b score
+    recommended_policy: str     # policy_a, policy_b or "Neither"
+    key_differences:    list[str] = Field(default_factory=list)
+    a_advantages:       list[str] = Field(default_factory=list)
+    b_advantages:       list[str] = Field(default_factory=list)
+    a_risks:            list[str] = Field(default_factory=list)
+    b_risks:            list[str] = Field(default_factory=list)
+
+
+class PolicyComparisonMatrix(BaseModel):
+    policies:           list[str]
+    ranking:            list[PolicyRanking]
+    score_matrix:       list[list[float]]   # [i][j] = score of i − score of j
+    pairs:              list[PairwiseComparison]
+    recommended_policy: str                 # top-ranked name, or "Neither" if too close
+    summary:            str
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field
+from functools import lru_cache
+
+from pydantic import BaseModel, Field, create_model
 from typing import Any, Dict, List, Literal, Optional
 
 
@@ -34,6 +36,19 @@ class ClauseRiskAssessment(BaseModel):
     transparency_of_terms:      RiskLevel = "Not Found"
 
 
+@lru_cache(maxsize=None)
+def clause_risk_subset(fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    ClauseRiskAssessment restricted to `fields` (in the given order) — the
+    decoding schema for one routed section of a full-document analysis.
+    Cached so each field combination compiles its JSON constraint once.
+    """
+    return create_model(
+        "ClauseRiskSubset",
+        **{f: (RiskLevel, "Not Found") for f in fields},
+    )
+
+
 # --------------------------------------------------
 # IRDAI Compliance
 # --------------------------------------------------
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class PostRejectionRequest(BaseModel):
@@ -10,4 +10,11 @@ class PostRejectionRequest(BaseModel):
 
 
 class PrePurchaseRequest(BaseModel):
-    policy_text: str
\ No newline at end of file
+    policy_text: str
+    # Map-reduce over the whole wording instead of its first 1200 chars
+    full_document: bool = False
+
+
+class PrePurchaseBatchRequest(BaseModel):
+    policies: List[str]
+    full_document: bool = False
@@ -0,0 +1,81 @@
+# services/answer_cleanup.py
+#
+# Post-processing for free-text chat answers: strip a role prefix the model
+# sometimes echoes ("ANSWER:", "Assistant:") and cut at any prompt section it
+# starts repeating. StreamingAnswerCleaner does the same incrementally for
+# the /stream endpoints — the pieces it releases always concatenate to
+# clean_answer() of the full output.
+
+_ANSWER_PREFIXES = ("Answer:", "ANSWER:", "Assistant:", "ASSISTANT:", "ANSWER:\n")
+_ANSWER_MARKERS  = ("USER QUESTION:", "CONVERSATION HISTORY:", "REPORT TYPE:", "REPORT DATA:")
+
+
+def clean_answer(raw: str) -> str:
+    """Strip a leading role prefix and cut at any echoed prompt section."""
+    answer = raw.strip() if raw and raw.strip() else ""
+
+    for prefix in _ANSWER_PREFIXES:
+        if answer.startswith(prefix):
+            answer = answer[len(prefix):].strip()
+            break
+
+    for marker in _ANSWER_MARKERS:
+        idx = answer.find(marker)
+        if idx > 20:
+            answer = answer[:idx].strip()
+
+    return answer
+
+
+class StreamingAnswerCleaner:
+    """
+    Incremental clean_answer().
+
+    Text is only released once it can no longer change: nothing before the
+    role prefix is decided, a tail long enough to hide a partial marker is
+    held back, trailing whitespace waits for the next word, and nothing is
+    sent until the answer passes the 8-char fallback threshold.
+    """
+
+    _PREFIX_WINDOW = max(len(p) for p in _ANSWER_PREFIXES)
+    _HOLDBACK      = max(len(m) for m in _ANSWER_MARKERS) - 1
+
+    def __init__(self):
+        self.raw       = ""
+        self.sent      = 0
+        self.truncated = False
+
+    @property
+    def answer(self) -> str:
+        return clean_answer(self.raw)
+
+    def feed(self, piece: str) -> str:
+        self.raw += piece
+        if len(self.raw.lstrip()) < self._PREFIX_WINDOW:
+            return ""
+
+        cleaned = self.answer
+        # A cut happened if some marker's first occurrence sits past index 20
+        self.truncated = len(cleaned) < len(_uncut_answer(self.raw))
+        safe = len(cleaned) if self.truncated else len(cleaned) - self._HOLDBACK
+        return self._release(cleaned, safe)
+
+    def finish(self) -> str:
+        cleaned = self.answer
+        return self._release(cleaned, len(cleaned))
+
+    def _release(self, cleaned: str, safe: int) -> str:
+        end = len(cleaned[:max(0, safe)].rstrip())
+        if end < 8 or end <= self.sent:
+            return ""
+        chunk, self.sent = cleaned[self.sent:end], end
+        return chunk
+
+
+def _uncut_answer(raw: str) -> str:
+    """clean_answer() without marker truncation — used to detect a cut."""
+    answer = raw.strip() if raw and raw.strip() else ""
+    for prefix in _ANSWER_PREFIXES:
+        if answer.startswith(prefix):
+            return answer[len(prefix):].strip()
+    return answer
@@ -0,0 +1,244 @@
+# services/cache_store.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Tiered Result Cache
+#
+# Two tiers behind one get() / put():
+#   1. Memory — bounded LRU of recent entries, answers in microseconds
+#   2. SQLite — on-disk, survives restarts, bounded by total payload bytes
+#              with least-recently-used eviction
+#
+# Values are strings (callers store JSON). Keys are content hashes built with
+# cache_key(), so identical inputs map to the same entry across processes.
+# If the disk tier cannot be opened (read-only FS), the cache runs memory-only.
+#
+# The SQLite file is opened on first use, not at construction, so importing a
+# module that declares a cache touches no disk. Disk hits only note the access
+# time in memory; the notes are written in one transaction every
+# _TOUCH_FLUSH_EVERY hits, and before any eviction so it sees fresh times
+# (notes still pending at exit are lost — that only affects eviction order).
+# The disk byte count is per process: read from the file when it is opened,
+# then tracked locally — processes sharing one file each enforce disk_bytes
+# against their own view and can overshoot it until they reopen.
+#
+# LRUCache is the memory tier on its own, for per-process values that are not
+# worth persisting or are not strings (embeddings, retrieval results).
+# ══════════════════════════════════════════════════════════════════════════════
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Shared on-disk location for every cache — ignored by git
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".carebridge_cache"
+
+# Disk hits whose access times are batched into one UPDATE transaction
+_TOUCH_FLUSH_EVERY = 64
+
+
+def cache_key(*parts) -> str:
+    """BLAKE2b hex digest of the given parts (str / bytes), order-sensitive."""
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        h.update(len(data).to_bytes(8, "little"))   # length-prefix — no ambiguity
+        h.update(data)
+    return h.hexdigest()
+
+
+class LRUCache:
+
+    def __init__(self, max_items: int = 1024):
+        self.max_items = max_items
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                self._misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._hits += 1
+            return self._items[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "hits": self._hits, "misses": self._misses}
+
+
+class TieredCache:
+
+    def __init__(
+        self,
+        name: str,
+        memory_items: int = 256,
+        disk_bytes: int = 256 * 1024 * 1024,
+        path: Path | None = None,
+    ):
+        self.name         = name
+        self.memory_items = memory_items
+        self.disk_bytes   = disk_bytes
+        self.path         = path or CACHE_DIR / f"{name}.sqlite3"
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+
+        self._db = None
+        self._opened = False
+        self._disk_used = 0                      # this process's view, see header
+        self._touched: dict[str, float] = {}     # key -> last access, not yet written
+
+    def _open(self) -> None:
+        """Connect to the disk tier on first use — callers hold self._lock."""
+        if self._opened:
+            return
+        self._opened = True
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON entries(last_used)")
+            self._db.commit()
+            self._disk_used = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+            print(f"✅ Cache '{self.name}' ready — {self._disk_used // 1024} KB on disk")
+        except Exception as e:
+            print(f"⚠ Cache '{self.name}' disk tier unavailable ({e}) — memory only")
+            self._db = None
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            self._open()
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._hits["memory"] += 1
+                return value
+
+            value = self._disk_get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits["disk"] += 1
+            self._memory_put(key, value)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._open()
+            self._memory_put(key, value)
+            self._disk_put(key, value)
+
+    def flush(self) -> None:
+        """Write pending access times to disk."""
+        with self._lock:
+            self._flush_touches()
+            if self._db is not None:
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._open()
+            return {
+                "memory_entries": len(self._memory),
+                "disk_bytes":     self._disk_used,
+                "hits":           dict(self._hits),
+                "misses":         self._misses,
+            }
+
+    # --------------------------------------------------
+    # Tiers — callers hold self._lock
+    # --------------------------------------------------
+
+    def _memory_put(self, key: str, value: str) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str) -> str | None:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= _TOUCH_FLUSH_EVERY:
+                self._flush_touches()
+                self._db.commit()
+            return row[0]
+        except sqlite3.Error as e:
+            print(f"⚠ Cache '{self.name}' read failed ({e})")
+            return None
+
+    def _flush_touches(self) -> None:
+        """Apply batched access times; the caller commits."""
+        if self._db is None or not self._touched:
+            return
+        try:
+            self._db.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()],
+            )
+        except sqlite3.Error as e:
+            print(f"⚠ Cache '{self.name}' access-time update failed ({e})")
+        self._touched.clear()
+
+    def _disk_put(self, key: str, value: str) -> None:
+        if self._db is None:
+            return
+        size = len(value.encode("utf-8"))
+        if size > self.disk_bytes:
+            return
+        try:
+            self._flush_touches()                # eviction must see recent reads
+            self._touched.pop(key, None)
+            old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._disk_used += size - (old[0] if old else 0)
+
+            # Evict least recently used until back under the byte budget
+            while self._disk_used > self.disk_bytes:
+                victims = self._db.execute(
+                    "SELECT key, size FROM entries WHERE key != ? ORDER BY last_used LIMIT 32", (key,)
+                ).fetchall()
+                if not victims:
+                    break
+                for victim, victim_size in victims:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (victim,))
+                    self._disk_used -= victim_size
+                    if self._disk_used <= self.disk_bytes:
+                        break
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠ Cache '{self.name}' write failed ({e})")
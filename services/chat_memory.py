@@ -1,44 +1,84 @@
 # services/chat_memory.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Chat Sessions
+#
+# Module API over one SessionBackend (services/session_store.py):
+#
+#   "memory"  bounded per-process LRU + TTL store — single worker
+#   "sqlite"  WAL-mode SQLite file shared by every worker on the host, so
+#             `uvicorn main:app --workers N` can serve any session anywhere
+#
+# main.py picks one at startup from CAREBRIDGE_SESSION_BACKEND (and
+# CAREBRIDGE_SESSION_DB for the SQLite file) via configure_session_backend().
+# The per-session model KV cache below stays per process either way — a turn
+# served by a different worker simply re-prefills once.
+# ══════════════════════════════════════════════════════════════════════════════
 
-import uuid
-import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
 from typing import Optional
 
-# In-memory store — resets on server restart (acceptable for dev/Kaggle)
-_store: dict = {}
+from services.session_store import (
+    SessionBackend,
+    MemorySessionStore,
+    SQLiteSessionStore,
+)
 
-# Session TTL — 2 hours, prevents OOM on long-running Kaggle sessions
-_SESSION_TTL_SECONDS = 7200
+SESSION_BACKEND = "memory"       # until configure_session_backend() runs
+
+# Older name for the in-process store, kept for existing imports
+SessionStore = MemorySessionStore
+
+# Per-session model KV cache (llm.prefix_cache.KVSlot), least recently used
+# first. Lives in GPU memory next to the live decode batch, so it is capped
+# separately from the sessions themselves — a session whose cache was
+# evicted just re-prefills once.
+#
+# Default ≈ one full 1800-token MedGemma-4B cache (34 layers × 2 × 4 KV heads
+# × 256 dims × 2 bytes × 1800 ≈ 240 MB). llm/scheduler.py sizes the ~6 GB
+# card for four of those in flight, so idle sessions get a quarter of that
+# on top. Raise it with configure_kv_budget() on larger cards.
+KV_BUDGET_BYTES = 256 * 1024 * 1024
+_kv_store: "OrderedDict[str, object]" = OrderedDict()
+_kv_lock = threading.Lock()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# MODULE API
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _make_backend(backend: str, path: Path | None = None) -> SessionBackend:
+    on_evict = lambda session_id: drop_kv_cache(session_id)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, on_evict=on_evict)
+    if backend == "memory":
+        return MemorySessionStore(on_evict=on_evict)
+    raise ValueError(f"unknown session backend: {backend!r}")
+
+
+_sessions: SessionBackend = _make_backend(SESSION_BACKEND)
+
+
+def configure_session_backend(backend: str, path: Path | str | None = None) -> None:
+    """Switch session storage ("memory" | "sqlite"). Existing in-memory sessions are dropped."""
+    global SESSION_BACKEND, _sessions
+    _sessions = _make_backend(backend, Path(path) if path else None)
+    print(f"✅ Chat session backend: {backend}")
+    SESSION_BACKEND = backend
 
 
 def create_session(report_data: dict) -> str:
-    session_id = str(uuid.uuid4())
-    _store[session_id] = {
-        "report_data": report_data,
-        "history":     [],
-        "created_at":  time.time(),
-        "last_used":   time.time(),
-    }
-    _evict_expired()
-    return session_id
+    return _sessions.create(report_data)
 
 
 def get_session(session_id: str) -> Optional[dict]:
-    session = _store.get(session_id)
-    if session is None:
-        return None
-    # Check expiry
-    if time.time() - session["last_used"] > _SESSION_TTL_SECONDS:
-        del _store[session_id]
-        return None
-    session["last_used"] = time.time()
-    return session
+    return _sessions.get(session_id)
 
 
 def add_message(session_id: str, role: str, content: str) -> None:
-    session = get_session(session_id)
-    if session:
-        session["history"].append({"role": role, "content": content})
+    _sessions.append(session_id, role, content)
 
 
 def get_history(session_id: str, max_turns: int = 6) -> list[dict]:
@@ -46,23 +86,74 @@ def get_history(session_id: str, max_turns: int = 6) -> list[dict]:
     Return last N turns of conversation history.
     Each turn is {"role": "user"|"assistant", "content": str}.
     """
-    session = get_session(session_id)
-    if not session:
-        return []
-    return session["history"][-(max_turns * 2):]   # *2 — each turn = user + assistant
+    return _sessions.history(session_id, max_turns * 2)   # *2 — each turn = user + assistant
 
 
 def get_report_data(session_id: str) -> Optional[dict]:
-    session = get_session(session_id)
-    return session["report_data"] if session else None
-
-
-def _evict_expired() -> None:
-    """Remove sessions older than TTL — called on each new session creation."""
-    now = time.time()
-    expired = [
-        sid for sid, s in _store.items()
-        if now - s["last_used"] > _SESSION_TTL_SECONDS
-    ]
-    for sid in expired:
-        del _store[sid]
\ No newline at end of file
+    return _sessions.report(session_id)
+
+
+def set_summary(session_id: str, summary: str, upto: int) -> bool:
+    """Rolling summary of the session's first `upto` messages (monotonic)."""
+    return _sessions.set_summary(session_id, summary, upto)
+
+
+def session_stats() -> dict:
+    return _sessions.stats()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SESSION KV CACHE
+# ══════════════════════════════════════════════════════════════════════════════
+
+def configure_kv_budget(max_bytes: int) -> None:
+    """Set the GPU memory idle session KV caches may hold; evicts down to it now."""
+    global KV_BUDGET_BYTES
+    with _kv_lock:
+        KV_BUDGET_BYTES = max(0, int(max_bytes))
+        _evict_kv_over_budget()
+    print(f"✅ Session KV cache budget: {KV_BUDGET_BYTES // 2**20} MB")
+
+
+def take_kv_cache(session_id: str):
+    """
+    Remove and return the session's KVSlot, or None.
+    The caller owns it for the turn and hands it back with put_kv_cache().
+    """
+    with _kv_lock:
+        return _kv_store.pop(session_id, None)
+
+
+def put_kv_cache(session_id: str, slot) -> None:
+    """Store a session's KVSlot, evicting least recently used slots to fit the budget."""
+    if slot is None or slot.nbytes == 0 or not _sessions.exists(session_id):
+        return
+    with _kv_lock:
+        if slot.nbytes > KV_BUDGET_BYTES:
+            print(f"⚠ Session KV cache ({slot.nbytes // 2**20} MB) exceeds budget — not kept")
+            return
+        _kv_store[session_id] = slot
+        _kv_store.move_to_end(session_id)
+        _evict_kv_over_budget()
+
+
+def _evict_kv_over_budget() -> None:
+    """Drop least recently used slots until the budget holds. Caller holds _kv_lock."""
+    used = sum(s.nbytes for s in _kv_store.values())
+    while used > KV_BUDGET_BYTES:
+        _, evicted = _kv_store.popitem(last=False)
+        used -= evicted.nbytes
+
+
+def drop_kv_cache(session_id: str) -> None:
+    with _kv_lock:
+        _kv_store.pop(session_id, None)
+
+
+def kv_cache_stats() -> dict:
+    with _kv_lock:
+        return {
+            "sessions":     len(_kv_store),
+            "bytes":        sum(s.nbytes for s in _kv_store.values()),
+            "budget_bytes": KV_BUDGET_BYTES,
+        }
\ No newline at end of file
@@ -73,22 +73,14 @@ def run_clause_matcher(
     # --------------------------------------------------
     prompt = clause_matching_prompt(policy_text, rejection_text, user_context)
 
+    # Schema-constrained — generate() itself retries once if the constraint
+    # could not run (schema compile failure, timeout)
     raw_output = generate(
         prompt, model, tokenizer,
-        json_mode=True,
+        schema=ClauseMatchResult,
         max_new_tokens=256,   # clause matching needs less tokens than 10-field JSON
     )
-
-    # Retry with proper validation
     parsed = _safe_json_parse(raw_output)
-    if parsed is None:
-        print("⚠️ Clause matcher first parse failed — retrying...")
-        raw_output = generate(
-            prompt, model, tokenizer,
-            json_mode=True,
-            max_new_tokens=256,
-        )
-        parsed = _safe_json_parse(raw_output)
 
     print("RAW CLAUSE OUTPUT:", raw_output)
 
@@ -97,7 +89,7 @@ def run_clause_matcher(
     # --------------------------------------------------
     try:
         if parsed is None:
-            raise ValueError("JSON parse returned None after retry")
+            raise ValueError("JSON parse returned None")
 
         # Fill missing fields with safe defaults
         for key, default in _CLAUSE_DEFAULTS.items():
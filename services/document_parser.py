@@ -21,35 +21,67 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
-def extract_text_from_pdf(content: bytes) -> str:
+def extract_text_from_pdf(content: bytes, max_chars: Optional[int] = None) -> str:
     """
     Hybrid PDF extraction:
     1. Try pdfplumber (for digital PDFs)
     2. Fallback to OCR if no text found (for scanned PDFs)
     """
+    return _pdf_text(content, max_chars)[0]
+
+
+def _pdf_text(content: bytes, max_chars: Optional[int]) -> tuple[str, bool]:
+    """
+    extract_text_from_pdf() that stops reading pages once max_chars of raw
+    text is collected. Returns (text, stopped on budget).
+    """
     extracted_text = ""
+    page_count = None
+    stopped = False
+
+    def budget_hit() -> bool:
+        return max_chars is not None and len(extracted_text) >= max_chars
 
     # First attempt: digital extraction
     try:
         with pdfplumber.open(io.BytesIO(content)) as pdf:
+            page_count = len(pdf.pages)
             for page in pdf.pages:
                 text = page.extract_text()
                 if text:
                     extracted_text += text + "\n"
+                if budget_hit():
+                    stopped = True
+                    break
     except Exception as e:
         print("⚠️ pdfplumber failed:", e)
 
-    # Fallback: OCR
+    # Fallback: OCR — one page at a time when the page count is known,
+    # so pages past the budget are never rasterised
     if not extracted_text.strip():
         print("⚠️ Falling back to OCR for scanned PDF.")
+        extracted_text = ""
         try:
-            images = convert_from_bytes(content)
-            for img in images:
+            if page_count is None:
+                pages = iter(convert_from_bytes(content))
+            else:
+                pages = (
+                    img
+                    for number in range(1, page_count + 1)
+                    for img in convert_from_bytes(content, first_page=number, last_page=number)
+                )
+            for img in pages:
                 extracted_text += pytesseract.image_to_string(img) + "\n"
+                if budget_hit():
+                    stopped = True
+                    break
         except Exception as e:
             print("⚠️ OCR fallback failed:", e)
 
-    return clean_text(extracted_text)
+    text = clean_text(extracted_text)
+    if max_chars is None:
+        return text, False
+    return text[:max_chars], stopped or len(text) > max_chars
 
 
 def extract_text_from_image(content: bytes) -> str:
@@ -69,14 +101,32 @@ def extract_text_from_file(filename: str, content_type: str, content: bytes) ->
     """
     Unified entry point for all file types.
     """
+    return extract_text_with_budget(filename, content_type, content)[0]
+
+
+def extract_text_with_budget(
+    filename: str,
+    content_type: str,
+    content: bytes,
+    max_chars: Optional[int] = None,
+) -> tuple[str, bool]:
+    """
+    extract_text_from_file() limited to the max_chars the caller will use —
+    PDF pages past the budget are not read or OCR'd.
+    Returns (text, stopped on budget).
+    """
     if content_type == "application/pdf" or filename.endswith(".pdf"):
-        return extract_text_from_pdf(content)
+        return _pdf_text(content, max_chars)
 
     elif content_type.startswith("image/"):
-        return extract_text_from_image(content)
+        text = extract_text_from_image(content)
 
     else:
         try:
-            return clean_text(content.decode("utf-8", errors="ignore"))
+            text = clean_text(content.decode("utf-8", errors="ignore"))
         except Exception:
-            return ""
\ No newline at end of file
+            text = ""
+
+    if max_chars is None:
+        return text, False
+    return text[:max_chars], len(text) > max_chars
@@ -55,24 +55,19 @@ def run_documentation_analysis(
     )
 
     # --------------------------------------------------
-    # Two attempts with proper JSON validation
+    # Schema-constrained generation — generate() retries once itself if the
+    # constraint could not run (schema compile failure, timeout)
     # --------------------------------------------------
-    for attempt in range(2):
-        raw_output = generate(
-            prompt, model, tokenizer,
-            json_mode=True,
-            max_new_tokens=384,   # doc analysis needs more tokens than clause matching
-        )
-
-        print(f"RAW DOC OUTPUT (attempt {attempt + 1}):", raw_output)
-
-        if not raw_output or not raw_output.strip():
-            continue
+    raw_output = generate(
+        prompt, model, tokenizer,
+        schema=DocumentationAnalysisResult,
+        max_new_tokens=384,   # doc analysis needs more tokens than clause matching
+    )
 
-        parsed = _safe_json_parse(raw_output)
-        if parsed is None:
-            continue
+    print("RAW DOC OUTPUT:", raw_output)
 
+    parsed = _safe_json_parse(raw_output) if raw_output and raw_output.strip() else None
+    if parsed is not None:
         # Fill missing keys with safe defaults before Pydantic validation
         for key, default in _DOC_DEFAULTS.items():
             parsed.setdefault(key, default)
@@ -80,11 +75,10 @@ def run_documentation_analysis(
         try:
             return DocumentationAnalysisResult(**parsed)
         except Exception as e:
-            print(f"⚠️ DocumentationAnalysisResult validation failed (attempt {attempt + 1}):", e)
-            continue
+            print("⚠️ DocumentationAnalysisResult validation failed:", e)
 
     # --------------------------------------------------
     # Safe Fallback
     # --------------------------------------------------
-    print("⚠️ Documentation analysis fallback triggered after 2 attempts")
+    print("⚠️ Documentation analysis fallback triggered")
     return DocumentationAnalysisResult(**_DOC_DEFAULTS)
\ No newline at end of file
@@ -0,0 +1,122 @@
+# services/fused_audit.py
+#
+# Fused audit mode — clause matching and documentation analysis in ONE
+# generation. The policy / rejection text is prefilled once instead of twice
+# and the result is split back into ClauseMatchResult + DocumentationAnalysisResult,
+# so every downstream override and the confidence calibrator are unchanged.
+#
+# Opt-in via PostRejectionEngine(fused=True) / FUSED_AUDIT. Compare against
+# the split pipeline with ab_fused_audit.py before switching the default.
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from schemas.intermediate import (
+    ClauseMatchResult,
+    DocumentationAnalysisResult,
+    FusedAuditResult,
+)
+from llm.generation import generate
+from llm.prompts import fused_audit_prompt
+from services.clause_matcher import run_clause_matcher
+from services.documentation_analyzer import run_documentation_analysis
+from services.rule_engine import classify_rejection_rule_based
+
+
+_FUSED_DEFAULTS = {
+    "clause_category":            "Other / unclear",
+    "clause_detected":            "Unclear",
+    "clause_clarity":             "Low",
+    "rejection_alignment":        "Partial",
+    "clause_explanation":         "Unable to confidently interpret rejection clause.",
+    "clause_confidence":          "Low",
+    "missing_documents":          [],
+    "documentation_gap_severity": "Low",
+    "rejection_nature":           "Not Detected",
+    "medical_ambiguity_detected": False,
+    "doc_explanation":            "Unable to confidently interpret documentation.",
+    "doc_confidence":             "Low",
+}
+
+# Rule-hit path — the two split calls run side by side, as in the unfused graph
+_SPLIT_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fused-split")
+
+
+def _safe_json_parse(raw: str) -> dict | None:
+    """Try clean parse first, then regex extraction."""
+    try:
+        return json.loads(raw.strip())
+    except Exception:
+        pass
+    match = re.search(r"\{[\s\S]*\}", raw)
+    if match:
+        try:
+            return json.loads(match.group(0))
+        except Exception:
+            pass
+    return None
+
+
+def run_fused_audit(
+    model,
+    tokenizer,
+    policy_text:     str,
+    rejection_text:  str,
+    medical_text:    str | None = None,
+    user_context:    str | None = None,
+) -> tuple[ClauseMatchResult, DocumentationAnalysisResult]:
+
+    # --------------------------------------------------
+    # 1️⃣ RULE-BASED CLAUSE CHECK
+    # A keyword hit makes the clause step free — only documentation
+    # analysis needs the model, so there is nothing to fuse. The split
+    # calls are dispatched concurrently rather than one after the other.
+    # (PostRejectionEngine skips fused mode for these inputs altogether.)
+    # --------------------------------------------------
+    if classify_rejection_rule_based(rejection_text):
+        clause = _SPLIT_EXECUTOR.submit(
+            run_clause_matcher, model, tokenizer, policy_text, rejection_text, user_context
+        )
+        docs = _SPLIT_EXECUTOR.submit(
+            run_documentation_analysis,
+            model, tokenizer, policy_text, rejection_text, medical_text, user_context,
+        )
+        return clause.result(), docs.result()
+
+    # --------------------------------------------------
+    # 🔒 INPUT CLEANING — widest limits of the two split prompts
+    # --------------------------------------------------
+    policy_text    = re.sub(r"\s+", " ", (policy_text    or "").strip())[:4000]
+    rejection_text = re.sub(r"\s+", " ", (rejection_text or "").strip())[:1500]
+    medical_text   = re.sub(r"\s+", " ", (medical_text   or "").strip())[:2000]
+    user_context   = re.sub(r"\s+", " ", (user_context   or "").strip())[:500]
+
+    prompt = fused_audit_prompt(policy_text, rejection_text, medical_text, user_context)
+
+    # --------------------------------------------------
+    # 2️⃣ ONE schema-constrained generation for both results
+    # --------------------------------------------------
+    raw_output = generate(
+        prompt, model, tokenizer,
+        schema=FusedAuditResult,
+        max_new_tokens=640,   # clause (256) + documentation (384) budgets
+    )
+
+    print("RAW FUSED OUTPUT:", raw_output)
+
+    parsed = _safe_json_parse(raw_output) if raw_output and raw_output.strip() else None
+    if parsed is not None:
+        for key, default in _FUSED_DEFAULTS.items():
+            parsed.setdefault(key, default)
+
+        try:
+            return FusedAuditResult(**parsed).split()
+        except Exception as e:
+            print("⚠️ FusedAuditResult validation failed:", e)
+
+    # --------------------------------------------------
+    # Safe Fallback
+    # --------------------------------------------------
+    print("⚠️ Fused audit fallback triggered")
+    return FusedAuditResult(**_FUSED_DEFAULTS).split()
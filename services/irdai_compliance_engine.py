@@ -1,7 +1,7 @@
 # services/irdai_compliance_engine.py
 
-import re
 from schemas.pre_purchase import IRDAICompliance
+from services.pattern_engine import PatternEngine
 
 
 # ------------------------------------------------------------------
@@ -78,14 +78,20 @@ _COMPLIANCE_PENALTIES = [
 # Maximum raw weighted score (sum of all weights)
 _MAX_WEIGHTED_SCORE = sum(w for _, w in _COMPLIANCE_SIGNALS.values())
 
+# Signals and penalties compiled once (services/pattern_engine.py)
+_ENGINE = PatternEngine(patterns={
+    **{name: patterns for name, (patterns, _) in _COMPLIANCE_SIGNALS.items()},
+    **{f"penalty:{i}": [pattern] for i, (pattern, _, _) in enumerate(_COMPLIANCE_PENALTIES)},
+})
 
-def _check_signals(text: str) -> tuple[dict, float]:
+
+def _check_signals(scan) -> tuple[dict, float]:
     """Check compliance signals with phrase-level regex matching."""
     flags = {}
     weighted_score = 0.0
 
-    for flag_name, (patterns, weight) in _COMPLIANCE_SIGNALS.items():
-        matched = any(re.search(p, text) for p in patterns)
+    for flag_name, (_, weight) in _COMPLIANCE_SIGNALS.items():
+        matched = scan.has(flag_name)
         flags[flag_name] = matched
         if matched:
             weighted_score += weight
@@ -93,13 +99,13 @@ def _check_signals(text: str) -> tuple[dict, float]:
     return flags, weighted_score
 
 
-def _check_penalties(text: str) -> tuple[list, float]:
+def _check_penalties(scan) -> tuple[list, float]:
     """Check for compliance violation phrases."""
     violations = []
     total_penalty = 0.0
 
-    for pattern, penalty, description in _COMPLIANCE_PENALTIES:
-        if re.search(pattern, text):
+    for i, (_, penalty, description) in enumerate(_COMPLIANCE_PENALTIES):
+        if scan.has(f"penalty:{i}"):
             violations.append(description)
             total_penalty += penalty
 
@@ -113,13 +119,13 @@ def evaluate_irdai_compliance(policy_text: str) -> IRDAICompliance:
     with the scoring engine's compliance_scale config.
     """
 
-    text = policy_text.lower()
+    scan = _ENGINE.scan(policy_text.lower())
 
     # Positive compliance signals
-    compliance_flags, weighted_score = _check_signals(text)
+    compliance_flags, weighted_score = _check_signals(scan)
 
     # Penalty for red-flag clauses
-    violations, penalty = _check_penalties(text)
+    violations, penalty = _check_penalties(scan)
 
     # Net weighted score
     net_score = max(0.0, weighted_score + penalty)   # penalty values are negative
@@ -0,0 +1,125 @@
+# services/policy_sections.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Policy Section Triage (full-document pre-purchase)
+#
+# Map-reduce over a full policy wording instead of its first 1200 chars:
+#
+#   split    the wording is cut along its own headings / paragraphs
+#            (rag/chunking.py) into sections of up to SECTION_CHARS
+#   route    one keyword scan per section (services/pattern_engine.py) says
+#            which clause fields it can speak to; each field keeps only its
+#            SECTIONS_PER_FIELD best-matching sections
+#   map      the engine classifies each routed section for its fields only
+#   reduce   merge_field_risks() — worst risk across sections wins,
+#            "Not Found" only if no section found the clause
+#
+# Sections no field cares about (definitions, schedules of network
+# hospitals, boilerplate) never reach the LLM, so cost follows the number
+# of relevant sections, not the page count.
+# ══════════════════════════════════════════════════════════════════════════════
+
+from rag.chunking import Chunk, chunk_document
+from schemas.pre_purchase import ClauseRiskAssessment
+from services.pattern_engine import PatternEngine
+
+CLAUSE_FIELDS: tuple[str, ...] = tuple(ClauseRiskAssessment.model_fields)
+
+# Same window the single-pass prompt reads, so a section prompt costs the same
+SECTION_CHARS = 1200
+SECTIONS_PER_FIELD = 3
+
+# --------------------------------------------------
+# Triage keywords — lowercase, substring semantics
+# --------------------------------------------------
+_FIELD_KEYWORDS: dict[str, list[str]] = {
+    "waiting_period": [
+        "waiting period", "waiting", "cooling period", "months of continuous",
+        "first 30 days", "initial 30 days",
+    ],
+    "pre_existing_disease": [
+        "pre-existing", "pre existing", "preexisting", "existing disease",
+        "declared condition",
+    ],
+    "room_rent_sublimit": [
+        "room rent", "room charges", "room category", "boarding", "single private room",
+        "icu charges",
+    ],
+    "disease_specific_caps": [
+        "cataract", "joint replacement", "hernia", "dialysis", "specified disease",
+        "specific disease", "listed illness", "per eye",
+    ],
+    "co_payment": [
+        "co-pay", "copay", "co payment", "co-payment", "cost sharing", "cost-sharing",
+        "deductible",
+    ],
+    "exclusions_clarity": [
+        "exclusion", "excluded", "not covered", "not payable", "non-medical",
+        "consumables",
+    ],
+    "claim_procedure_complexity": [
+        "intimation", "intimate", "pre-authorization", "pre authorization",
+        "pre-authorisation", "cashless", "reimbursement", "claim form",
+        "submitted within", "inform within", "documents within",
+    ],
+    "sublimits_and_caps": [
+        "sublimit", "sub-limit", "limited to", "maximum payable", "limit per",
+        "cap at", "capped",
+    ],
+    "restoration_benefit": [
+        "restoration", "restored", "reinstat", "recharge", "refill",
+    ],
+    "transparency_of_terms": [
+        "free look", "free-look", "grievance", "ombudsman", "irdai", "portability",
+        "definitions",
+    ],
+}
+
+_TRIAGE_ENGINE = PatternEngine(literals=_FIELD_KEYWORDS)
+
+# Worst first — the reduce step keeps the first label any section reported
+_RISK_ORDER = ("High Risk", "Moderate Risk", "Low Risk")
+
+
+def split_policy_sections(policy_text: str, max_chars: int = SECTION_CHARS) -> list[Chunk]:
+    """Section-bounded chunks of the raw (newline-preserving) policy text."""
+    return chunk_document(policy_text, "policy", max_chars)
+
+
+def route_sections(
+    policy_text: str,
+    per_field: int = SECTIONS_PER_FIELD,
+) -> list[tuple[Chunk, tuple[str, ...]]]:
+    """
+    (section, clause fields it is routed to), in document order.
+
+    A field is routed to the per_field sections with the most keyword hits
+    for it; a chosen section is asked about every field it mentions.
+    """
+    sections = split_policy_sections(policy_text)
+    hits: list[dict[str, int]] = []
+    for section in sections:
+        scan = _TRIAGE_ENGINE.scan(section.text.lower())
+        hits.append({f: len(scan.of(f)) for f in CLAUSE_FIELDS if scan.has(f)})
+
+    chosen: set[int] = set()
+    for field in CLAUSE_FIELDS:
+        ranked = sorted(
+            (i for i, h in enumerate(hits) if field in h),
+            key=lambda i: -hits[i][field],
+        )
+        chosen.update(ranked[:per_field])
+
+    return [
+        (sections[i], tuple(f for f in CLAUSE_FIELDS if f in hits[i]))
+        for i in sorted(chosen)
+    ]
+
+
+def merge_field_risks(results: list[dict]) -> dict[str, str]:
+    """Reduce per-section classifications to one label per clause field."""
+    merged: dict[str, str] = {}
+    for field in CLAUSE_FIELDS:
+        seen = {r.get(field) for r in results}
+        merged[field] = next((level for level in _RISK_ORDER if level in seen), "Not Found")
+    return merged
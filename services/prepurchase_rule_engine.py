@@ -1,3 +1,111 @@
+from services.pattern_engine import PatternEngine
+
+
+# --------------------------------------------------
+# Boolean features — True if any keyword occurs
+# --------------------------------------------------
+_FEATURE_KEYWORDS = {
+    # Waiting Period
+    "has_waiting_period": ["waiting period"],
+
+    # Pre-existing disease
+    "mentions_pre_existing": [
+        "pre-existing",
+        "pre existing",
+        "preexisting"
+    ],
+
+    # Room rent
+    "room_rent_cap": ["room rent"],
+
+    # Co-payment
+    "co_payment": [
+        "co-pay",
+        "copay",
+        "co payment",
+        "co-payment"
+    ],
+
+    # Disease caps / sublimits
+    "disease_caps": [
+        "capped",
+        "cap at",
+        "limited to",
+        "limit per",
+        "maximum payable",
+        "sublimit",
+        "sub-limit",
+        "sublimits"
+    ],
+
+    # Consumables
+    "consumables_exclusion": [
+        "non-medical",
+        "consumables excluded",
+        "ppe kit",
+        "gloves",
+        "administrative charges"
+    ],
+
+    # Restoration benefit
+    "restoration_benefit": [
+        "restoration benefit",
+        "sum insured will be restored",
+        "restored once",
+        "reinstated"
+    ],
+
+    # Claim procedure complexity
+    "procedural_conditions": [
+        "pre-authorization",
+        "pre authorization",
+        "intimation within",
+        "submitted within",
+        "inform within",
+        "documents within"
+    ],
+
+    # Transparency & compliance
+    "free_look_period": ["free look"],
+    "grievance_redressal": ["grievance"],
+    "ombudsman_reference": ["ombudsman"],
+    "irdai_reference": ["irdai"],
+}
+
+# --------------------------------------------------
+# Tiered features — first tier with a keyword hit wins, else 0
+# --------------------------------------------------
+_FEATURE_TIERS = {
+    "waiting_period_years": [
+        (4, ["48 month", "4 year"]),
+        (3, ["36 month", "3 year"]),
+        (2, ["24 month", "2 year"]),
+        (1, ["12 month", "1 year"]),
+    ],
+    "room_rent_percent": [
+        (1, ["1%"]),
+        (2, ["2%"]),
+        (3, ["3%"]),
+    ],
+    "co_payment_percentage": [
+        (30, ["30%"]),
+        (25, ["25%"]),
+        (20, ["20%"]),
+        (10, ["10%"]),
+    ],
+}
+
+# Every keyword above, in one compiled engine (services/pattern_engine.py)
+_ENGINE = PatternEngine(literals={
+    **_FEATURE_KEYWORDS,
+    **{
+        f"{feature}={value}": keywords
+        for feature, tiers in _FEATURE_TIERS.items()
+        for value, keywords in tiers
+    },
+})
+
+
 def extract_structured_features(policy_text: str):
     """
     Extract deterministic insurance policy features
@@ -6,91 +114,12 @@ def extract_structured_features(policy_text: str):
     Improved keyword coverage.
     """
 
-    text = policy_text.lower()
-
-    features = {
-        # Waiting Period
-        "has_waiting_period": "waiting period" in text,
-        "waiting_period_years": (
-            4 if "48 month" in text or "4 year" in text else
-            3 if "36 month" in text or "3 year" in text else
-            2 if "24 month" in text or "2 year" in text else
-            1 if "12 month" in text or "1 year" in text else 0
-        ),
-
-        # Pre-existing disease
-        "mentions_pre_existing": any(k in text for k in [
-            "pre-existing",
-            "pre existing",
-            "preexisting"
-        ]),
-
-        # Room rent
-        "room_rent_cap": "room rent" in text,
-        "room_rent_percent": (
-            1 if "1%" in text else
-            2 if "2%" in text else
-            3 if "3%" in text else 0
-        ),
-
-        # Co-payment
-        "co_payment": any(k in text for k in [
-            "co-pay",
-            "copay",
-            "co payment",
-            "co-payment"
-        ]),
-        "co_payment_percentage": (
-            30 if "30%" in text else
-            25 if "25%" in text else
-            20 if "20%" in text else
-            10 if "10%" in text else 0
-        ),
-
-        # Disease caps / sublimits
-        "disease_caps": any(k in text for k in [
-            "capped",
-            "cap at",
-            "limited to",
-            "limit per",
-            "maximum payable",
-            "sublimit",
-            "sub-limit",
-            "sublimits"
-        ]),
-
-        # Consumables
-        "consumables_exclusion": any(k in text for k in [
-            "non-medical",
-            "consumables excluded",
-            "ppe kit",
-            "gloves",
-            "administrative charges"
-        ]),
-
-        # Restoration benefit
-        "restoration_benefit": any(k in text for k in [
-            "restoration benefit",
-            "sum insured will be restored",
-            "restored once",
-            "reinstated"
-        ]),
-
-        # Claim procedure complexity
-        "procedural_conditions": any(k in text for k in [
-            "pre-authorization",
-            "pre authorization",
-            "intimation within",
-            "submitted within",
-            "inform within",
-            "documents within"
-        ]),
-
-        # Transparency & compliance
-        "free_look_period": "free look" in text,
-        "grievance_redressal": "grievance" in text,
-        "ombudsman_reference": "ombudsman" in text,
-        "irdai_reference": "irdai" in text,
-    }
-
-    return features
\ No newline at end of file
+    scan = _ENGINE.scan(policy_text.lower())
+
+    features = {feature: scan.has(feature) for feature in _FEATURE_KEYWORDS}
+    for feature, tiers in _FEATURE_TIERS.items():
+        features[feature] = next(
+            (value for value, _ in tiers if scan.has(f"{feature}={value}")), 0
+        )
+
+    return features
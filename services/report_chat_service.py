@@ -9,15 +9,36 @@
 # report_chat_prompt imports FROM multilingual_translations (one-way only)
 # This file imports both — translations first, then prompt. Never reverse this.
 # ──────────────────────────────────────────────────────────────────────────────
-from llm.generation import generate
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from llm.generation import generate, generate_stream
 from llm.multilingual_translations import t, SPEECH_LANG_CODES   # ← FIRST
-from llm.report_chat_prompt import report_chat_prompt             # ← SECOND
+from llm.report_chat_prompt import (   # ← SECOND
+    report_chat_header, report_chat_messages, history_summary_prompt,
+)
+from llm.prefix_cache import KVSlot
 from schemas.chat import ReportChatResponse
-from services.chat_memory import get_session, add_message, get_history, get_report_data
+from services.answer_cleanup import StreamingAnswerCleaner, clean_answer
+from services.chat_memory import (
+    get_session, add_message, set_summary,
+    take_kv_cache, put_kv_cache, drop_kv_cache,
+)
 
 _MAX_HISTORY_TURNS = 6
 _SUPPORTED_LANGS   = set(SPEECH_LANG_CODES.keys())
 
+# Rolling history summary — once a session has _RECENT_TURNS + _SUMMARY_BATCH_TURNS
+# unsummarised turns, everything but the last _RECENT_TURNS is folded into the
+# session summary in the background, so prompts stay ~constant length
+_RECENT_TURNS        = 3
+_SUMMARY_BATCH_TURNS = 2
+_SUMMARY_MAX_CHARS   = 900
+_SUMMARY_EXECUTOR    = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+_summarising: set[str] = set()
+_summarising_lock      = threading.Lock()
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # INTENT KEYWORD SETS
@@ -184,50 +205,211 @@ def run_report_chat(
 
     lang = lang if lang in _SUPPORTED_LANGS else "en"
 
-    if session_id:
-        session = get_session(session_id)
-        if not session:
-            return ReportChatResponse(answer=_session_not_found_msg(lang))
-        report_data = get_report_data(session_id)
-        history     = get_history(session_id, max_turns=_MAX_HISTORY_TURNS)
-    else:
-        if not report_data:
-            return ReportChatResponse(answer=_no_report_msg(lang))
-        history = []
-
-    if not report_data:
-        return ReportChatResponse(answer=_no_report_msg(lang))
+    report_data, history, summary, error = _resolve_chat_context(session_id, report_data, lang)
+    if error:
+        return ReportChatResponse(answer=error)
 
-    prompt = report_chat_prompt(report_data, history, user_question, lang=lang)
+    prompt, kv_slot = _chat_prompt(
+        session_id, report_data, history, summary, user_question, lang, tokenizer,
+    )
 
     raw = generate(
     prompt, model, tokenizer,
-    max_new_tokens=450, json_mode=False, temperature=0.35,
+    max_new_tokens=450, json_mode=False, temperature=0.35, kv_slot=kv_slot,
 )
-    print(f"DEBUG raw='{raw}'")  # ← add this
+    if session_id:
+        put_kv_cache(session_id, kv_slot)
 
-    answer = raw.strip() if raw and raw.strip() else ""
+    answer = clean_answer(raw)
 
-    for prefix in ("Answer:", "ANSWER:", "Assistant:", "ASSISTANT:", "ANSWER:\n"):
-        if answer.startswith(prefix):
-            answer = answer[len(prefix):].strip()
-            break
+    if len(answer) < 8:
+        print(f"⚠ LLM answer too short ({len(answer)}) — deterministic fallback")
+        answer = _build_fallback_answer(user_question, report_data, lang)
 
-    for marker in ("USER QUESTION:", "CONVERSATION HISTORY:", "REPORT TYPE:", "REPORT DATA:"):
-        idx = answer.find(marker)
-        if idx > 20:
-            answer = answer[:idx].strip()
+    if session_id:
+        add_message(session_id, "user",      user_question)
+        add_message(session_id, "assistant", answer)
+        _schedule_summary(model, tokenizer, session_id, len(history) + 2)
 
+    sources = _extract_sources(answer, report_data)
+    return ReportChatResponse(answer=answer, session_id=session_id, sources=sources)
+
+
+def stream_report_chat(
+    model,
+    tokenizer,
+    user_question: str,
+    session_id: str | None = None,
+    report_data: dict | None = None,
+    lang: str = "en",
+) -> Iterator[dict]:
+    """
+    Streaming counterpart of run_report_chat().
+
+    Yields {"type": "token", "text": ...} events as the answer is decoded,
+    then one {"type": "done", ...} event carrying the full ReportChatResponse.
+    Prefix stripping and marker truncation are applied incrementally, so the
+    concatenated tokens always equal the final answer.
+    """
+    lang = lang if lang in _SUPPORTED_LANGS else "en"
+
+    report_data, history, summary, error = _resolve_chat_context(session_id, report_data, lang)
+    if error:
+        yield {"type": "done", **ReportChatResponse(answer=error).model_dump()}
+        return
+
+    prompt, kv_slot = _chat_prompt(
+        session_id, report_data, history, summary, user_question, lang, tokenizer,
+    )
+    cleaner = StreamingAnswerCleaner()
+
+    pieces = generate_stream(
+        prompt, model, tokenizer, max_new_tokens=450, temperature=0.35, kv_slot=kv_slot,
+    )
+    try:
+        for piece in pieces:
+            text = cleaner.feed(piece)
+            if text:
+                yield {"type": "token", "text": text}
+            if cleaner.truncated:
+                break   # echoed prompt marker — stop decoding early
+    finally:
+        pieces.close()
+        if session_id:
+            put_kv_cache(session_id, kv_slot)
+
+    tail = cleaner.finish()
+    if tail:
+        yield {"type": "token", "text": tail}
+
+    answer = cleaner.answer
     if len(answer) < 8:
         print(f"⚠ LLM answer too short ({len(answer)}) — deterministic fallback")
         answer = _build_fallback_answer(user_question, report_data, lang)
+        yield {"type": "token", "text": answer}
 
     if session_id:
         add_message(session_id, "user",      user_question)
         add_message(session_id, "assistant", answer)
+        _schedule_summary(model, tokenizer, session_id, len(history) + 2)
 
     sources = _extract_sources(answer, report_data)
-    return ReportChatResponse(answer=answer, session_id=session_id, sources=sources)
+    response = ReportChatResponse(answer=answer, session_id=session_id, sources=sources)
+    yield {"type": "done", **response.model_dump()}
+
+
+def _resolve_chat_context(
+    session_id: str | None,
+    report_data: dict | None,
+    lang: str,
+) -> tuple[dict | None, list[dict], str, str | None]:
+    """
+    Return (report_data, history, summary, error_message) for a chat turn.
+    history is only the messages the session summary does not cover yet.
+    """
+    if session_id:
+        # One lookup — the report payload is decompressed once per turn
+        session = get_session(session_id)
+        if not session:
+            return None, [], "", _session_not_found_msg(lang)
+        report_data  = session["report_data"]
+        summary      = session["summary"]
+        unsummarised = session["message_count"] - session["summary_upto"]
+        history      = session["history"][-unsummarised:] if unsummarised else []
+    else:
+        if not report_data:
+            return None, [], "", _no_report_msg(lang)
+        history, summary = [], ""
+
+    if not report_data:
+        return None, [], "", _no_report_msg(lang)
+
+    return report_data, history, summary, None
+
+
+def _chat_prompt(
+    session_id: str | None,
+    report_data: dict,
+    history: list[dict],
+    summary: str,
+    user_question: str,
+    lang: str,
+    tokenizer,
+):
+    """
+    Session turns use the multi-turn prompt plus the session's KV cache,
+    so only the new question is prefilled. Stateless calls get the same
+    prompt with no history and no cache.
+
+    Either way the prompt is fitted to CHAT_PROMPT_TOKEN_BUDGET here, so
+    generate() never has to truncate it.
+
+    Cache trade-off: a turn right after a summary fold (or one that had to
+    drop an old turn for budget) differs from the cached prompt at the
+    summary, so it re-prefills the summary and recent turns — the report
+    header stays cached, and the next turn appends again. If report lines
+    had to be cut, even the header differs: the slot is dropped and not
+    kept, as no later turn would share more than the instructions.
+    """
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    messages = report_chat_messages(
+        report_data, history[-(_MAX_HISTORY_TURNS * 2):], user_question,
+        lang=lang, summary=summary, count_tokens=count_tokens,
+    )
+    if not session_id:
+        return messages, None
+    if not messages[0]["content"].startswith(report_chat_header(report_data, lang)):
+        drop_kv_cache(session_id)
+        return messages, None
+    return messages, take_kv_cache(session_id) or KVSlot()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# ROLLING HISTORY SUMMARY
+# ══════════════════════════════════════════════════════════════════════════════
+
+def _schedule_summary(model, tokenizer, session_id: str, unsummarised: int) -> None:
+    """Fold older turns into the summary off the request path, once enough pile up."""
+    if unsummarised < (_RECENT_TURNS + _SUMMARY_BATCH_TURNS) * 2:
+        return
+    with _summarising_lock:
+        if session_id in _summarising:
+            return
+        _summarising.add(session_id)
+    _SUMMARY_EXECUTOR.submit(_refresh_summary, model, tokenizer, session_id)
+
+
+def _refresh_summary(model, tokenizer, session_id: str) -> None:
+    try:
+        session = get_session(session_id)
+        if not session:
+            return
+        count, upto = session["message_count"], session["summary_upto"]
+        fold_end    = count - _RECENT_TURNS * 2
+        if fold_end - upto < _SUMMARY_BATCH_TURNS * 2:
+            return
+
+        # history holds the last len(history) of `count` messages
+        history = session["history"]
+        older   = history[max(len(history) - (count - upto), 0): len(history) - (count - fold_end)]
+
+        raw = generate(
+            history_summary_prompt(session["summary"], older), model, tokenizer,
+            max_new_tokens=160, json_mode=False, temperature=0.0,
+        )
+        summary = (raw or "").strip()[:_SUMMARY_MAX_CHARS]
+        if not summary:
+            print(f"⚠ Empty chat summary for session {session_id} — keeping full history")
+            return
+        if set_summary(session_id, summary, fold_end):
+            print(f"🔄 Chat summary for session {session_id} now covers {fold_end} messages")
+    except Exception as e:
+        print(f"⚠ Chat summary failed for session {session_id}: {e}")
+    finally:
+        with _summarising_lock:
+            _summarising.discard(session_id)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -2,6 +2,7 @@
 
 import re
 from schemas.intermediate import ClauseMatchResult
+from services.pattern_engine import PatternEngine
 
 
 # --------------------------------------------------
@@ -63,6 +64,10 @@ _REJECTION_PATTERNS = [
 ]
 
 
+# Compiled once (services/pattern_engine.py)
+_REJECTION_ENGINE = PatternEngine(patterns=dict(_REJECTION_PATTERNS))
+
+
 def classify_rejection_rule_based(rejection_text: str | None) -> str | None:
     """
     Returns the best-matching clause category using phrase-level regex,
@@ -71,10 +76,11 @@ def classify_rejection_rule_based(rejection_text: str | None) -> str | None:
     if not rejection_text:
         return None
 
-    text = rejection_text.lower()
+    scan = _REJECTION_ENGINE.scan(rejection_text.lower())
 
-    for category, patterns in _REJECTION_PATTERNS:
-        if any(re.search(p, text) for p in patterns):
+    # Table order is priority order
+    for category, _ in _REJECTION_PATTERNS:
+        if scan.has(category):
             return category
 
     return None
@@ -0,0 +1,623 @@
+# services/session_store.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Chat Session Backends
+#
+# services/chat_memory.py talks to one SessionBackend:
+#
+#   MemorySessionStore   per-process, bounded LRU + TTL (the default)
+#   SQLiteSessionStore   one WAL-mode SQLite file shared by every worker
+#                        process on the host — a session created on one
+#                        uvicorn worker is visible to all of them
+#
+# Both keep report_data as zlib-compressed JSON and cap history at
+# max_history messages. Both run a daemon TTL reaper and call on_evict for
+# every session they drop. Each session also carries a rolling summary of
+# its first summary_upto messages (services/report_chat_service.py).
+#
+# SQLite writes only deltas: one row per session at create, then one message
+# row (plus a trim of messages past max_history) per add. last_used is
+# rewritten at most every _TOUCH_INTERVAL_SECONDS. The report payload never
+# changes after create, so each process keeps hot sessions' payloads in a
+# read-through LRU. A turn then reads one indexed session row and the
+# last few messages.
+# ══════════════════════════════════════════════════════════════════════════════
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+from services.cache_store import CACHE_DIR, LRUCache
+
+# Session TTL — 2 hours, prevents OOM on long-running Kaggle sessions
+SESSION_TTL_SECONDS = 7200
+
+_MAX_SESSIONS          = 10_000
+_MAX_SESSION_BYTES     = 256 * 1024 * 1024
+_MAX_HISTORY_MESSAGES  = 64      # prompts only ever read the last few turns
+_REAP_INTERVAL_SECONDS = 60
+
+# Fixed per-session overhead counted against the memory store's byte budget
+_SESSION_OVERHEAD_BYTES = 512
+
+# SQLite: shared database file, and how stale a stored last_used may get
+SESSION_DB_PATH         = CACHE_DIR / "chat_sessions.sqlite3"
+_TOUCH_INTERVAL_SECONDS = 60
+_REPORT_CACHE_ITEMS     = 1024
+
+
+def _pack_report(report_data: dict) -> bytes:
+    return zlib.compress(
+        json.dumps(report_data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6
+    )
+
+
+def _unpack_report(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob))
+
+
+def _text_bytes(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# INTERFACE
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SessionBackend(ABC):
+    """
+    Storage behind create_session / get_session / add_message / get_history.
+    Subclasses implement every abstract method — a backend missing one
+    fails when it is constructed. The TTL reaper thread and the on_evict
+    callback plumbing are shared.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_history: int = _MAX_HISTORY_MESSAGES,
+        reap_interval: float | None = _REAP_INTERVAL_SECONDS,
+        on_evict: Callable[[str], None] | None = None,
+    ):
+        """
+        reap_interval: seconds between background TTL sweeps, None for no
+        reaper thread (expired sessions are then dropped when touched or on
+        an explicit reap()). on_evict(session_id) runs for every session
+        that expires or is evicted, outside any store lock.
+        """
+        self.ttl_seconds   = ttl_seconds
+        self.max_history   = max_history
+        self.reap_interval = reap_interval
+        self._on_evict     = on_evict
+        self._lock         = threading.Lock()
+        self._reaper: threading.Thread | None = None
+
+    @abstractmethod
+    def create(self, report_data: dict) -> str:
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[dict]:
+        """
+        Snapshot or None: {report_data, history, created_at, last_used,
+        summary, summary_upto, message_count}. history is the newest
+        messages (at most max_history); message_count counts every message
+        ever added, so history[i] is message message_count - len(history) + i.
+        """
+
+    @abstractmethod
+    def exists(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def append(self, session_id: str, role: str, content: str) -> bool:
+        """Add one message; False if the session no longer exists."""
+
+    @abstractmethod
+    def history(self, session_id: str, max_messages: int) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def report(self, session_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set_summary(self, session_id: str, summary: str, upto: int) -> bool:
+        """
+        Store a summary of messages [0, upto). Ignored (False) unless it
+        covers more than the current one — concurrent refreshes never move
+        the summary backwards.
+        """
+
+    @abstractmethod
+    def reap(self) -> int:
+        """Drop every expired session; returns how many were dropped."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    # --------------------------------------------------
+    # Eviction callbacks and the reaper
+    # --------------------------------------------------
+
+    def _notify(self, dropped: list[str]) -> None:
+        if self._on_evict is not None:
+            for session_id in dropped:
+                self._on_evict(session_id)
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None or self.reap_interval is None:
+            return
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap_loop, name="chat-session-reaper", daemon=True,
+                )
+                self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                reaped = self.reap()
+                if reaped:
+                    print(f"🔄 Reaped {reaped} expired chat sessions")
+            except Exception as e:
+                print(f"⚠ Chat session reaper error: {e}")
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# IN-MEMORY
+# ══════════════════════════════════════════════════════════════════════════════
+
+class _Session:
+
+    __slots__ = (
+        "report_blob", "history", "created_at", "last_used", "nbytes",
+        "message_count", "summary", "summary_upto",
+    )
+
+    def __init__(self, report_blob: bytes, now: float):
+        self.report_blob   = report_blob
+        self.history: deque = deque()
+        self.created_at    = now
+        self.last_used     = now
+        self.nbytes        = len(report_blob) + _SESSION_OVERHEAD_BYTES
+        self.message_count = 0
+        self.summary       = ""
+        self.summary_upto  = 0
+
+
+class MemorySessionStore(SessionBackend):
+    """
+    Bounded to max_sessions sessions and max_bytes of payload. Sessions sit
+    in an OrderedDict in last-used order, so LRU eviction is O(1) and the
+    reaper only walks the expired front. self._lock guards the index and
+    byte accounting and is held only for O(1) updates.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = _MAX_SESSIONS,
+        max_bytes: int = _MAX_SESSION_BYTES,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self.max_bytes    = max_bytes
+
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes   = 0
+        self._evicted = 0
+        self._expired = 0
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def create(self, report_data: dict) -> str:
+        session_id = str(uuid.uuid4())
+        session    = _Session(_pack_report(report_data), time.time())
+
+        with self._lock:
+            self._sessions[session_id] = session
+            self._bytes += session.nbytes
+            dropped = self._evict_over_budget()
+
+        self._notify(dropped)
+        self._ensure_reaper()
+        return session_id
+
+    def get(self, session_id: str) -> Optional[dict]:
+        dropped: list[str] = []
+        with self._lock:
+            session = self._touch(session_id, dropped)
+            if session is not None:
+                blob = session.report_blob
+                snapshot = {
+                    "history":       list(session.history),
+                    "created_at":    session.created_at,
+                    "last_used":     session.last_used,
+                    "summary":       session.summary,
+                    "summary_upto":  session.summary_upto,
+                    "message_count": session.message_count,
+                }
+        self._notify(dropped)
+
+        if session is None:
+            return None
+        return {"report_data": _unpack_report(blob), **snapshot}
+
+    def exists(self, session_id: str) -> bool:
+        dropped: list[str] = []
+        with self._lock:
+            session = self._touch(session_id, dropped)
+        self._notify(dropped)
+        return session is not None
+
+    def append(self, session_id: str, role: str, content: str) -> bool:
+        dropped: list[str] = []
+        with self._lock:
+            session = self._touch(session_id, dropped)
+            if session is not None:
+                session.history.append({"role": role, "content": content})
+                session.message_count += 1
+                delta = _text_bytes(content)
+                while len(session.history) > self.max_history:
+                    delta -= _text_bytes(session.history.popleft()["content"])
+                session.nbytes += delta
+                self._bytes    += delta
+                dropped.extend(self._evict_over_budget(keep=session_id))
+        self._notify(dropped)
+        return session is not None
+
+    def history(self, session_id: str, max_messages: int) -> list[dict]:
+        dropped: list[str] = []
+        with self._lock:
+            session = self._touch(session_id, dropped)
+            messages = [] if session is None else list(session.history)[-max_messages:]
+        self._notify(dropped)
+        return messages
+
+    def report(self, session_id: str) -> Optional[dict]:
+        dropped: list[str] = []
+        with self._lock:
+            session = self._touch(session_id, dropped)
+            blob = session.report_blob if session is not None else None
+        self._notify(dropped)
+        return _unpack_report(blob) if blob is not None else None
+
+    def set_summary(self, session_id: str, summary: str, upto: int) -> bool:
+        dropped: list[str] = []
+        with self._lock:
+            session = self._touch(session_id, dropped)
+            ok = session is not None and session.summary_upto < upto <= session.message_count
+            if ok:
+                delta = _text_bytes(summary) - _text_bytes(session.summary)
+                session.summary, session.summary_upto = summary, upto
+                session.nbytes += delta
+                self._bytes    += delta
+                dropped.extend(self._evict_over_budget(keep=session_id))
+        self._notify(dropped)
+        return ok
+
+    def reap(self) -> int:
+        cutoff  = time.time() - self.ttl_seconds
+        dropped: list[str] = []
+        while True:
+            with self._lock:
+                # Last-used order — the expired sessions are exactly the front
+                batch = []
+                while self._sessions and len(batch) < 256:
+                    session_id, session = next(iter(self._sessions.items()))
+                    if session.last_used >= cutoff:
+                        break
+                    self._remove(session_id)
+                    batch.append(session_id)
+                self._expired += len(batch)
+            dropped.extend(batch)
+            if len(batch) < 256:
+                break
+        self._notify(dropped)
+        return len(dropped)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend":      "memory",
+                "sessions":     len(self._sessions),
+                "bytes":        self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes":    self.max_bytes,
+                "evicted":      self._evicted,
+                "expired":      self._expired,
+            }
+
+    # --------------------------------------------------
+    # Internals — callers hold self._lock
+    # --------------------------------------------------
+
+    def _touch(self, session_id: str, dropped: list[str]) -> Optional[_Session]:
+        """The live session, refreshed to most recently used; drops it if expired."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        now = time.time()
+        if now - session.last_used > self.ttl_seconds:
+            self._remove(session_id)
+            self._expired += 1
+            dropped.append(session_id)
+            return None
+        session.last_used = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.nbytes
+
+    def _evict_over_budget(self, keep: str | None = None) -> list[str]:
+        dropped = []
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break                 # never evict the session being written
+            self._remove(session_id)
+            dropped.append(session_id)
+        self._evicted += len(dropped)
+        return dropped
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SQLITE (multi-process)
+# ══════════════════════════════════════════════════════════════════════════════
+
+class SQLiteSessionStore(SessionBackend):
+    """
+    Sessions in one SQLite file in WAL mode, so readers in every worker
+    process run alongside the single writer. Each process holds one
+    connection, serialised by self._lock. The max_sessions bound is applied
+    by each reaper sweep.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_sessions: int = _MAX_SESSIONS,
+        cache_items: int = _REPORT_CACHE_ITEMS,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self.path = Path(path or SESSION_DB_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # isolation_level=None — transactions are opened explicitly below
+        self._db = sqlite3.connect(
+            str(self.path), timeout=10.0, isolation_level=None, check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, report BLOB NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL,"
+            " summary TEXT NOT NULL DEFAULT '', summary_upto INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Files created before rolling summaries existed
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(sessions)")}
+        if "summary" not in columns:
+            self._db.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+            self._db.execute("ALTER TABLE sessions ADD COLUMN summary_upto INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_used ON sessions(last_used)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL, content TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+
+        # session_id → report blob (immutable once created)
+        self._hot = LRUCache(cache_items)
+        print(f"✅ Chat sessions in SQLite — {self.path}")
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def create(self, report_data: dict) -> str:
+        session_id = str(uuid.uuid4())
+        blob = _pack_report(report_data)
+        now  = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (id, report, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (session_id, blob, now, now),
+            )
+        self._hot.put(session_id, blob)
+        self._ensure_reaper()
+        return session_id
+
+    def get(self, session_id: str) -> Optional[dict]:
+        row = self._live(session_id)
+        if row is None:
+            return None
+        blob, created_at, last_used, summary, summary_upto = row
+        rows = self._message_rows(session_id, self.max_history)
+        return {
+            "report_data":   _unpack_report(blob),
+            "history":       [{"role": role, "content": content} for _, role, content in rows],
+            "created_at":    created_at,
+            "last_used":     last_used,
+            "summary":       summary,
+            "summary_upto":  summary_upto,
+            "message_count": rows[-1][0] if rows else 0,   # seq numbers messages from 1
+        }
+
+    def exists(self, session_id: str) -> bool:
+        return self._live(session_id) is not None
+
+    def append(self, session_id: str, role: str, content: str) -> bool:
+        now = time.time()
+        dropped: list[str] = []
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT last_used FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None or self._expire_if_stale(db, session_id, row[0], now, dropped):
+                ok = False
+            else:
+                seq = db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM messages WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()[0]
+                db.execute(
+                    "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                    (session_id, seq, role, content),
+                )
+                db.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq <= ?",
+                    (session_id, seq - self.max_history),
+                )
+                db.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+                ok = True
+        self._notify(dropped)
+        return ok
+
+    def history(self, session_id: str, max_messages: int) -> list[dict]:
+        if self._live(session_id) is None:
+            return []
+        return [
+            {"role": role, "content": content}
+            for _, role, content in self._message_rows(session_id, max_messages)
+        ]
+
+    def report(self, session_id: str) -> Optional[dict]:
+        row = self._live(session_id)
+        return _unpack_report(row[0]) if row is not None else None
+
+    def set_summary(self, session_id: str, summary: str, upto: int) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE sessions SET summary = ?, summary_upto = ?"
+                " WHERE id = ? AND summary_upto < ?"
+                " AND ? <= (SELECT COALESCE(MAX(seq), 0) FROM messages WHERE session_id = ?)",
+                (summary, upto, session_id, upto, upto, session_id),
+            )
+        return cursor.rowcount == 1
+
+    def reap(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._transaction() as db:
+            dropped = [r[0] for r in db.execute(
+                "SELECT id FROM sessions WHERE last_used < ?", (cutoff,)
+            )]
+            dropped += [r[0] for r in db.execute(
+                "SELECT id FROM sessions WHERE last_used >= ?"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+                (cutoff, self.max_sessions),
+            )]
+            self._delete(db, dropped)
+        self._notify(dropped)
+        return len(dropped)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            messages = self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return {
+            "backend":      "sqlite",
+            "path":         str(self.path),
+            "sessions":     sessions,
+            "messages":     messages,
+            "max_sessions": self.max_sessions,
+            "hot_cache":    self._hot.stats(),
+        }
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE — takes the write lock up front, across processes."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _live(self, session_id: str) -> Optional[tuple[bytes, float, float, str, int]]:
+        """
+        (report blob, created_at, last_used, summary, summary_upto) of a live
+        session, or None. The blob comes from the hot cache when this process
+        has it.
+        """
+        now = time.time()
+        hot = self._hot.get(session_id)
+        dropped: list[str] = []
+
+        with self._lock:
+            if hot is None:
+                row = self._db.execute(
+                    "SELECT report, created_at, last_used, summary, summary_upto"
+                    " FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT NULL, created_at, last_used, summary, summary_upto"
+                    " FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
+            if row is None:
+                return None
+            blob, created_at, last_used, summary, summary_upto = row
+            if self._expire_if_stale(self._db, session_id, last_used, now, dropped):
+                blob = None
+            elif now - last_used > _TOUCH_INTERVAL_SECONDS:
+                self._db.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+                last_used = now
+
+        if dropped:
+            self._notify(dropped)
+            return None
+        if hot is None:
+            hot = blob
+            self._hot.put(session_id, blob)
+        return hot, created_at, last_used, summary, summary_upto
+
+    def _expire_if_stale(self, db, session_id: str, last_used: float, now: float, dropped: list) -> bool:
+        if now - last_used <= self.ttl_seconds:
+            return False
+        self._delete(db, [session_id])
+        dropped.append(session_id)
+        return True
+
+    @staticmethod
+    def _delete(db, session_ids: list[str]) -> None:
+        rows = [(sid,) for sid in session_ids]
+        db.executemany("DELETE FROM messages WHERE session_id = ?", rows)
+        db.executemany("DELETE FROM sessions WHERE id = ?", rows)
+
+    def _message_rows(self, session_id: str, limit: int) -> list[tuple[int, str, str]]:
+        """(seq, role, content) of the newest `limit` messages, oldest first."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, role, content FROM ("
+                " SELECT seq, role, content FROM messages WHERE session_id = ?"
+                " ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                (session_id, limit),
+            ).fetchall()
@@ -0,0 +1,111 @@
+# services/upload_extraction.py
+#
+# ══════════════════════════════════════════════════════════════════════════════
+# CareBridge AI — Upload Text Extraction
+#
+# Turns an uploaded file into text for the engines:
+#   1. ocr.extractor     — pdfplumber → pymupdf → pdfminer → Tesseract cascade
+#   2. document_parser   — fallback when the OCR engine is missing or finds
+#                          (almost) nothing
+#
+# Extracted text is cached per file, keyed by a BLAKE2 hash of the bytes —
+# the same policy PDF re-uploaded to /prepurchase, /audit or /compare skips
+# the cascade entirely. Each entry records the max_chars it was extracted
+# with and whether extraction stopped on that budget; a request with a
+# larger budget reuses the entry only if it holds the whole document,
+# otherwise it re-extracts and upgrades the entry.
+# ══════════════════════════════════════════════════════════════════════════════
+
+import hashlib
+import json
+
+from services.cache_store import TieredCache
+from services.document_parser import extract_text_with_budget
+
+# ── OCR extractor (new) ───────────────────────────────────────────────────────
+# Falls back gracefully to document_parser if ocr/extractor.py not yet present
+try:
+    from ocr.extractor import extract_with_metadata as ocr_extract
+    HAS_OCR = True
+    print("✅ OCR engine loaded")
+except ImportError:
+    HAS_OCR = False
+    print("⚠️  ocr/extractor.py not found — file uploads use document_parser only")
+
+_EXTRACTION_CACHE = TieredCache("upload_extractions", memory_items=64, disk_bytes=256 * 1024 * 1024)
+
+
+def extract_upload(
+    filename: str,
+    content_type: str,
+    content: bytes,
+    max_chars: int,
+) -> str:
+    """
+    Unified extraction: tries ocr.extractor first (pdfplumber + Tesseract),
+    falls back to services.document_parser (existing logic).
+    Results are cached by content hash together with the layer that succeeded.
+
+    max_chars is the text the caller will actually use; PDF extraction stops
+    once it is reached, so later pages are never rendered or OCR'd.
+    """
+    if not content:
+        return ""
+
+    key    = hashlib.blake2b(content, digest_size=20).hexdigest()
+    cached = _EXTRACTION_CACHE.get(key)
+    if cached is not None:
+        entry = json.loads(cached)
+        # A shorter-budget entry only serves if it already holds the whole document
+        if entry.get("truncated") is False or entry.get("max_chars", 0) >= max_chars:
+            print(f"⚡ Extraction cache hit — {filename} ({entry['layer']}, {len(entry['text'])} chars)")
+            return entry["text"][:max_chars]
+
+    text, layer, truncated = _extract_uncached(filename, content_type, content, max_chars)
+    print(f"📄 Extracted {filename} via {layer} — {len(text)} chars")
+
+    # Empty results may be transient (missing OCR packs) — don't pin them
+    if text:
+        _EXTRACTION_CACHE.put(key, json.dumps({
+            "text":      text,
+            "layer":     layer,
+            "max_chars": max_chars,
+            "truncated": truncated,
+        }))
+    return text
+
+
+def _extract_uncached(
+    filename: str,
+    content_type: str,
+    content: bytes,
+    max_chars: int,
+) -> tuple[str, str, bool]:
+    text      = ""
+    layer     = "none"
+    truncated = False
+
+    if HAS_OCR:
+        try:
+            text, layer, truncated = ocr_extract(
+                data      = content,
+                filename  = filename,
+                mime_type = content_type or "",
+                max_chars = max_chars,
+            )
+        except Exception as e:
+            print(f"⚠️  ocr_extract failed ({e}) — trying document_parser")
+
+    if not text or len(text.strip()) < 30:
+        try:
+            text, truncated = extract_text_with_budget(
+                filename     = filename,
+                content_type = content_type,
+                content      = content,
+                max_chars    = max_chars,
+            )
+            layer = "document_parser"
+        except Exception as e:
+            print(f"⚠️  document_parser failed ({e})")
+
+    return text.strip(), layer, truncated
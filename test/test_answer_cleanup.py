@@ -0,0 +1,66 @@
+# test/test_answer_cleanup.py
+#
+# Run with pytest: python -m pytest test/test_answer_cleanup.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import random
+
+from services.answer_cleanup import StreamingAnswerCleaner, clean_answer
+
+_RAW = [
+    "ANSWER:\nYour policy caps room rent at 1% of the sum insured per day.",
+    "Assistant: The co-payment is 20% on every claim.\n\nUSER QUESTION: and the waiting period?",
+    "  Pre-existing diseases wait 48 months. REPORT DATA: POLICY SCORE: 41/100",
+    "Ask the insurer for the written reason within 15 days, then approach the Ombudsman.",
+    "ANSWER: ok",                                   # under the 8-char fallback threshold
+    "USER QUESTION: echoed straight away, nothing else",
+    "Short one. CONVERSATION HISTORY: User: hi",
+]
+
+
+def _stream(raw: str, cuts: list[int]) -> str:
+    cleaner = StreamingAnswerCleaner()
+    out, prev = [], 0
+    for cut in cuts + [len(raw)]:
+        out.append(cleaner.feed(raw[prev:cut]))
+        prev = cut
+        if cleaner.truncated:
+            break
+    out.append(cleaner.finish())
+    return "".join(out)
+
+
+def _expected(raw: str) -> str:
+    answer = clean_answer(raw)
+    return answer if len(answer) >= 8 else ""   # the service sends its fallback instead
+
+
+def test_every_two_piece_split_matches_clean_answer():
+    for raw in _RAW:
+        for cut in range(len(raw) + 1):
+            assert _stream(raw, [cut]) == _expected(raw), (raw, cut)
+
+
+def test_token_sized_and_random_chunkings_match_clean_answer():
+    rng = random.Random(7)
+    for raw in _RAW:
+        assert _stream(raw, list(range(1, len(raw)))) == _expected(raw)   # one char per piece
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(1, len(raw)), k=min(len(raw) - 1, rng.randint(1, 12))))
+            assert _stream(raw, cuts) == _expected(raw), (raw, cuts)
+
+
+def test_echoed_marker_stops_the_stream_early():
+    raw     = _RAW[1]
+    cleaner = StreamingAnswerCleaner()
+    fed     = 0
+    for i in range(1, len(raw) + 1):
+        cleaner.feed(raw[i - 1:i])
+        fed = i
+        if cleaner.truncated:
+            break
+
+    assert fed < len(raw)
+    assert raw[:fed].endswith("USER QUESTION:")
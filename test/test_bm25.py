@@ -0,0 +1,39 @@
+# test/test_bm25.py
+#
+# Run with pytest: python -m pytest test/test_bm25.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rag.bm25 import BM25Index, tokenize
+
+_DOCS = [
+    "Pre-existing diseases are covered after a waiting period of 36 months.",
+    "Complaints may be escalated to the Insurance Ombudsman within one year.",
+    "The insurer shall settle or reject a claim within 30 days of the last document.",
+    "Any waiting period is reduced for continuous coverage on portability.",
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The Waiting-Period, of 30 days!") == ["waiting", "period", "30", "days"]
+
+
+def test_search_ranks_matching_chunks_first():
+    index = BM25Index(_DOCS)
+    hits = index.search("ombudsman complaint", top_k=3)
+    assert hits[0][0] == 1
+    assert all(score > 0 for _, score in hits)
+
+
+def test_rarer_terms_weigh_more():
+    index = BM25Index(_DOCS)
+    # "36" occurs once, "waiting" twice — doc 0 has both, doc 3 only "waiting"
+    ids = [idx for idx, _ in index.search("waiting period 36 months")]
+    assert ids[:2] == [0, 3]
+
+
+def test_unknown_terms_return_nothing():
+    index = BM25Index(_DOCS)
+    assert index.search("cryptocurrency") == []
+    assert index.known_terms("ombudsman cryptocurrency") == (1, 2)
@@ -0,0 +1,81 @@
+# test/test_build_index.py
+#
+# Run with pytest: python -m pytest test/test_build_index.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import types
+
+import numpy as np
+
+from rag import build_index as bi
+
+
+class _FakeEmbedder:
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+class _FakeIndex:
+    def __init__(self, dim):
+        self.dim = dim
+
+    def add(self, embeddings):
+        pass
+
+
+# Just enough of faiss for build_index() to write its files
+_FAKE_FAISS = types.SimpleNamespace(
+    IndexFlatL2=_FakeIndex,
+    serialize_index=lambda index: np.zeros(8, dtype=np.uint8),
+)
+
+
+def _docs(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("WAITING PERIOD\n\nPre-existing diseases after 36 months.")
+    (docs / "b.txt").write_text("GRIEVANCE\n\nComplaints go to the Insurance Ombudsman.")
+    return docs, tmp_path / "index"
+
+
+def _build(monkeypatch, docs, index):
+    monkeypatch.setattr(bi, "_faiss", lambda: _FAKE_FAISS)
+    return bi.build_index(_FakeEmbedder(), docs, index)
+
+
+def test_manifest_goes_stale_on_doc_model_or_chunker_change(tmp_path, monkeypatch):
+    docs, index = _docs(tmp_path)
+    assert _build(monkeypatch, docs, index)
+    assert bi.index_is_current(docs, index)
+    assert not _build(monkeypatch, docs, index)          # nothing changed — no rebuild
+
+    (docs / "a.txt").write_text("WAITING PERIOD\n\nPre-existing diseases after 48 months.")
+    assert not bi.index_is_current(docs, index)
+    assert _build(monkeypatch, docs, index)
+
+    monkeypatch.setattr(bi, "EMBED_MODEL", "another-model")
+    assert not bi.index_is_current(docs, index)
+    assert _build(monkeypatch, docs, index)
+
+    monkeypatch.setattr(bi, "_CHUNKER", "structure-v2")
+    assert not bi.index_is_current(docs, index)
+
+
+def test_unreadable_doc_does_not_force_a_rebuild_every_start(tmp_path, monkeypatch):
+    docs, index = _docs(tmp_path)
+    real_chunk = bi.chunk_document
+
+    def chunk(content, source, *args):
+        if source == "b.txt":
+            raise ValueError("corrupt")
+        return real_chunk(content, source, *args)
+
+    monkeypatch.setattr(bi, "chunk_document", chunk)
+    assert _build(monkeypatch, docs, index)
+    assert bi.index_is_current(docs, index)
+    assert not _build(monkeypatch, docs, index)
+
+    (docs / "b.txt").write_text("GRIEVANCE\n\nFixed text.")   # changed — retried
+    assert not bi.index_is_current(docs, index)
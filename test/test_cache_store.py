@@ -0,0 +1,84 @@
+# test/test_cache_store.py
+#
+# Run with pytest: python -m pytest test/test_cache_store.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import sqlite3
+
+from services import cache_store
+from services.cache_store import LRUCache, TieredCache, cache_key
+
+
+def test_cache_key_is_stable_and_unambiguous():
+    assert cache_key("a", "bc") == cache_key("a", "bc")
+    assert cache_key("a", "bc") != cache_key("ab", "c")
+    assert cache_key("x", 1) != cache_key("x", 2)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = tmp_path / "c.sqlite3"
+    TieredCache("t", path=path).put("k", "value")
+    fresh = TieredCache("t", path=path)
+    assert fresh.get("k") == "value"
+    assert fresh.stats()["hits"]["disk"] == 1
+    assert fresh.get("k") == "value"
+    assert fresh.stats()["hits"]["memory"] == 1
+
+
+def test_memory_tier_is_bounded_lru(tmp_path):
+    cache = TieredCache("t", memory_items=2, path=tmp_path / "c.sqlite3")
+    for k in ("a", "b", "c"):
+        cache.put(k, k)
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("a") == "a"          # evicted from memory, served from disk
+    assert cache.stats()["hits"]["disk"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = TieredCache("t", memory_items=1, disk_bytes=25, path=tmp_path / "c.sqlite3")
+    cache.put("old", "x" * 10)
+    cache.put("mid", "y" * 10)
+    cache.get("old")                      # refresh — "mid" is now the LRU entry
+    cache.put("new", "z" * 10)
+    assert cache.stats()["disk_bytes"] <= 25
+    assert cache.get("mid") is None
+    assert cache.get("old") == "x" * 10
+
+
+def test_disk_tier_is_opened_on_first_use(tmp_path):
+    path  = tmp_path / "sub" / "c.sqlite3"
+    cache = TieredCache("t", path=path)
+    assert not path.exists()
+    assert cache.get("k") is None
+    assert path.exists()
+
+
+def _last_used(path, key):
+    with sqlite3.connect(str(path)) as db:
+        return db.execute("SELECT last_used FROM entries WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_disk_hit_access_times_are_written_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_store, "_TOUCH_FLUSH_EVERY", 3)
+    path  = tmp_path / "c.sqlite3"
+    cache = TieredCache("t", memory_items=1, path=path)
+    for k in ("a", "b", "c", "d"):
+        cache.put(k, k)
+    written = {k: _last_used(path, k) for k in "abc"}
+
+    cache.get("a"); cache.get("b")        # each evicts the other from memory
+    assert {k: _last_used(path, k) for k in "ab"} == {k: written[k] for k in "ab"}
+    cache.get("c")                        # third disk hit flushes the batch
+    assert all(_last_used(path, k) > written[k] for k in "abc")
+
+
+def test_lru_cache_counts_and_bounds():
+    cache = LRUCache(max_items=2)
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert cache.get("a") == [1]          # "b" is now least recent
+    cache.put("c", [3])
+    assert cache.get("b") is None
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 1}
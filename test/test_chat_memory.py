@@ -0,0 +1,92 @@
+# test/test_chat_memory.py
+#
+# Run with pytest: python -m pytest test/test_chat_memory.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services import chat_memory, session_store
+from services.chat_memory import SessionStore
+
+_REPORT = {"report_type": "prepurchase", "clause_risk": {"co_payment": "High Risk"}}
+
+
+def _store(**kwargs) -> tuple[SessionStore, list[str]]:
+    evicted: list[str] = []
+    kwargs.setdefault("reap_interval", None)
+    return SessionStore(on_evict=evicted.append, **kwargs), evicted
+
+
+def test_least_recently_used_session_is_evicted():
+    store, evicted = _store(max_sessions=2)
+    a = store.create(_REPORT)
+    b = store.create(_REPORT)
+    assert store.exists(a)                 # a is now more recent than b
+    c = store.create(_REPORT)
+
+    assert evicted == [b]
+    assert store.get(b) is None
+    assert store.get(a)["report_data"] == _REPORT
+    assert store.exists(c)
+
+
+def test_byte_budget_never_evicts_the_session_being_written():
+    store, evicted = _store(max_bytes=4096)
+    old, active = store.create(_REPORT), store.create(_REPORT)
+    store.append(active, "user", "x" * 3500)
+
+    assert evicted == [old]
+    assert store.stats()["sessions"] == 1
+    assert store.history(active, 10) == [{"role": "user", "content": "x" * 3500}]
+
+
+def test_history_is_capped_and_accounted():
+    store, _ = _store(max_history=4)
+    sid = store.create(_REPORT)
+    base = store.stats()["bytes"]
+    for i in range(10):
+        store.append(sid, "user", f"message {i}")
+
+    assert [m["content"] for m in store.history(sid, 100)] == [f"message {i}" for i in range(6, 10)]
+    assert store.stats()["bytes"] == base + 4 * len("message 0")
+
+
+def test_reaper_drops_only_expired_sessions(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    store, evicted = _store(ttl_seconds=60)
+
+    stale = store.create(_REPORT)
+    now[0] += 45
+    fresh = store.create(_REPORT)
+    now[0] += 30
+
+    assert store.reap() == 1
+    assert evicted == [stale]
+    assert store.exists(fresh)
+    assert store.stats()["sessions"] == 1
+
+
+class _FakeSlot:
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+
+def test_kv_cache_eviction_stays_under_budget(monkeypatch):
+    monkeypatch.setattr(chat_memory, "_sessions", SessionStore(reap_interval=None))
+    monkeypatch.setattr(chat_memory, "_kv_store", type(chat_memory._kv_store)())
+    monkeypatch.setattr(chat_memory, "KV_BUDGET_BYTES", 1000)
+
+    sessions = [chat_memory.create_session(_REPORT) for _ in range(5)]
+    for sid in sessions:
+        chat_memory.put_kv_cache(sid, _FakeSlot(300))
+        assert chat_memory.kv_cache_stats()["bytes"] <= 1000
+
+    assert chat_memory.take_kv_cache(sessions[0]) is None      # least recently used went first
+    assert chat_memory.take_kv_cache(sessions[-1]) is not None
+
+    chat_memory.put_kv_cache(sessions[1], _FakeSlot(2000))      # bigger than the whole budget
+    assert chat_memory.take_kv_cache(sessions[1]) is None
+
+    chat_memory.configure_kv_budget(300)
+    assert chat_memory.kv_cache_stats() == {"sessions": 1, "bytes": 300, "budget_bytes": 300}
@@ -0,0 +1,62 @@
+# test/test_chunking.py
+#
+# Run with pytest: python -m pytest test/test_chunking.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rag.chunking import PREAMBLE, chunk_document
+
+_DOC = """IRDAI Sample Regulations
+
+Every insurer shall publish its grievance procedure on its website.
+
+WAITING PERIOD
+
+Initial waiting period: claims within 30 days of inception are not admissible, except accidents.
+
+A policyholder who has completed the waiting period has a right to claim.
+
+STEP 3 — INSURANCE OMBUDSMAN
+
+The Ombudsman resolves disputes without court proceedings.
+
+ELIGIBILITY TO FILE BEFORE OMBUDSMAN:
+- A complaint must first be filed with the insurer.
+- The complaint must be filed within one year.
+
+4.2. Portability credit must be given for the waiting period already served.
+"""
+
+
+def test_chunks_follow_sections_and_carry_offsets():
+    chunks = chunk_document(_DOC, "sample.txt")
+    assert [c.section for c in chunks] == [
+        PREAMBLE,
+        "WAITING PERIOD",
+        "STEP 3 — INSURANCE OMBUDSMAN",
+        "STEP 3 — INSURANCE OMBUDSMAN / ELIGIBILITY TO FILE BEFORE OMBUDSMAN",
+        "4.2",
+    ]
+    for c in chunks:
+        assert c.source == "sample.txt"
+        assert _DOC[c.start:c.end] == c.text
+    # Both waiting-period paragraphs fit one chunk, heading included
+    assert chunks[1].text.startswith("WAITING PERIOD")
+    assert "right to claim" in chunks[1].text
+
+
+def test_long_sections_split_at_paragraphs_then_sentences():
+    para = "Claims must be settled within 30 days. " * 10
+    doc = f"SETTLEMENT\n\n{para}\n\n{para}\n"
+    chunks = chunk_document(doc, "s.txt", max_chars=250)
+    assert len(chunks) > 2
+    for c in chunks:
+        assert len(c.text) <= 250
+        assert c.text.rstrip().endswith(".") or c.text == "SETTLEMENT"
+        assert doc[c.start:c.end] == c.text
+
+
+def test_numbers_in_prose_are_not_headings():
+    doc = "FREE LOOK\n\n15 days from receipt of the policy document apply to all annual policies."
+    assert [c.section for c in chunk_document(doc, "f.txt")] == ["FREE LOOK"]
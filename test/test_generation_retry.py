@@ -0,0 +1,45 @@
+# test/test_generation_retry.py
+#
+# Run with pytest: python -m pytest test/test_generation_retry.py -v
+# Needs torch + transformers; skipped otherwise.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from pydantic import BaseModel
+
+from llm import generation
+
+
+class _Result(BaseModel):
+    label: str
+
+
+def _fake_runs(monkeypatch, *outcomes):
+    calls = []
+
+    def once(*args):
+        calls.append(args)
+        return outcomes[len(calls) - 1]
+
+    monkeypatch.setattr(generation, "_generate_once", once)
+    return calls
+
+
+def test_timeout_without_constraint_is_retried_once(monkeypatch):
+    calls = _fake_runs(monkeypatch, ("{}", False), ('{"label": "x"}', False))
+
+    assert generation.generate("p", None, None, schema=_Result) == '{"label": "x"}'
+    assert len(calls) == 2
+
+
+def test_constrained_output_is_not_retried(monkeypatch):
+    calls = _fake_runs(monkeypatch, ('{"label": "x"', True))
+
+    assert generation.generate("p", None, None, schema=_Result) == '{"label": "x"'
+    assert len(calls) == 1
@@ -0,0 +1,110 @@
+# test/test_hybrid_retriever.py
+#
+# Run with pytest: python -m pytest test/test_hybrid_retriever.py -v
+# The embedding model and FAISS index are replaced by small fakes.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import types
+
+import numpy as np
+import pytest
+
+from rag import hybrid_retriever
+from rag.chunking import Chunk
+
+_CHUNKS = [
+    Chunk(text, source, section, 0, len(text))
+    for text, source, section in (
+        ("A claim for pre-existing diseases is paid after a waiting period of 36 months.", "ped.txt", "WAITING PERIOD"),
+        ("Complaints may be escalated to the Insurance Ombudsman within one year.", "griev.txt", "OMBUDSMAN"),
+        ("The insurer shall settle or reject a claim within 30 days of the last document.", "claims.txt", "SETTLEMENT"),
+    )
+]
+
+# One axis per topic; anything else lands on the last axis, far from every chunk
+_TOPICS = ("waiting", "ombudsman", "claim")
+
+
+def _embed(text: str) -> np.ndarray:
+    v = np.array([float(t in text.lower()) for t in _TOPICS] + [0.0], dtype=np.float32)
+    if not v.any():
+        v[-1] = 1.0
+    return v / np.linalg.norm(v)
+
+
+class _FakeEmbedder:
+    def __init__(self, name):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return np.stack([_embed(t) for t in texts])
+
+
+class _FakeIndex:
+    def __init__(self):
+        self.vectors = np.stack([_embed(c.text) for c in _CHUNKS])
+        self.calls = 0
+
+    def search(self, queries, depth):
+        self.calls += 1
+        distances = np.linalg.norm(self.vectors[None, :, :] - queries[:, None, :], axis=2)
+        order = np.argsort(distances, axis=1)[:, :depth]
+        return np.take_along_axis(distances, order, axis=1), order
+
+
+@pytest.fixture
+def retriever(monkeypatch):
+    monkeypatch.setitem(
+        sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=_FakeEmbedder),
+    )
+    index = _FakeIndex()
+    monkeypatch.setattr(hybrid_retriever, "load_or_build_index", lambda model: (index, list(_CHUNKS)))
+    return hybrid_retriever.HybridRegulatoryRetriever()
+
+
+def test_repeated_query_hits_both_caches(retriever):
+    query = "My claim was rejected and not settled in time, what can I do about it?"
+    first = retriever.retrieve(query)
+    assert "SETTLEMENT" in first
+
+    assert retriever.retrieve(query) == first
+    assert retriever.embed_model.calls == 1
+    assert retriever.index.calls == 1
+    stats = retriever.cache_stats()
+    assert stats["embeddings"]["hits"] == 1
+    assert stats["results"]["hits"] == 1
+
+
+def test_sparse_only_queries_skip_the_encoder(retriever):
+    assert "OMBUDSMAN" in retriever.retrieve("ombudsman")
+    assert retriever.embed_model.calls == 0
+
+
+def _first_section(result: str) -> str:
+    return result.split("]", 1)[0].split("§ ")[1]
+
+
+def test_same_dense_bucket_still_fuses_each_querys_own_bm25_hits(retriever, monkeypatch):
+    # Every query embeds to the same vector — one dense bucket, one FAISS search
+    monkeypatch.setattr(
+        retriever.embed_model, "encode", lambda texts, **kw: np.stack([_embed("claim")] * len(texts)),
+    )
+    settle  = retriever.retrieve("insurer must settle or reject within 30 days of the last document")
+    disease = retriever.retrieve("pre-existing diseases paid only after 36 months")
+
+    assert _first_section(settle) == "SETTLEMENT"
+    assert _first_section(disease) == "WAITING PERIOD"
+    assert retriever.index.calls == 1
+    assert retriever.cache_stats()["dense"]["hits"] == 1
+
+
+def test_irrelevant_query_finds_nothing_even_with_shared_terms(retriever):
+    # "year" and "document" are in the BM25 vocabulary, but the query is about
+    # nothing the index covers — the dense threshold rejects every chunk
+    result = retriever.retrieve("my pizza order arrived a year late without any document or receipt")
+
+    assert result == "No relevant regulatory references found for this query."
+    assert retriever.bm25.search("my pizza order arrived a year late without any document", 3)
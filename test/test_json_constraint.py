@@ -0,0 +1,170 @@
+# test/test_json_constraint.py
+#
+# Run with pytest: python -m pytest test/test_json_constraint.py -v
+#
+# Drives the schema state machine with a character-level fake tokenizer,
+# so every grammar path can be checked without loading MedGemma.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+import pytest
+
+from llm.json_constraint import JsonSchemaConstraint
+from schemas.intermediate import ClauseMatchResult, DocumentationAnalysisResult, FusedAuditResult
+from schemas.pre_purchase import ClauseRiskAssessment
+
+
+class _CharTokenizer:
+    """One token per character — token id is the code point."""
+    all_special_ids = [0]
+
+    def encode(self, text, add_special_tokens=False):
+        return [ord(c) for c in text]
+
+    def decode(self, ids):
+        return "".join(chr(i) for i in ids)
+
+    def convert_ids_to_tokens(self, ids):
+        return [chr(i) for i in ids]
+
+    def __len__(self):
+        return 256
+
+
+_TOK = _CharTokenizer()
+
+
+def _drive(schema, wanted: str) -> str:
+    """
+    Emit `wanted` one char at a time wherever the grammar allows it,
+    otherwise take the first allowed token. Forced runs are applied in bulk.
+    """
+    constraint = JsonSchemaConstraint(schema, _TOK)
+    out: list[int] = []
+    pos = 0
+
+    while not constraint.done:
+        forced = constraint.forced_run()
+        for t in forced:
+            constraint.advance(t)
+        out.extend(forced)
+        pos += len(forced)
+        if constraint.done:
+            break
+
+        ids, free_string = constraint.allowed()
+        want = ord(wanted[pos]) if pos < len(wanted) else None
+        if want is not None and (want in ids or (free_string and chr(want) not in '"\\')):
+            token = want
+        else:
+            token = ids[0]
+        constraint.advance(token)
+        out.append(token)
+        pos += 1
+
+    return _TOK.decode(out)
+
+
+def test_clause_risk_values_restricted_to_enum():
+    wanted = json.dumps({k: "High Risk" for k in ClauseRiskAssessment.model_fields})
+    text = _drive(ClauseRiskAssessment, wanted)
+    parsed = json.loads(text)
+    assert ClauseRiskAssessment(**parsed).waiting_period == "High Risk"
+    assert list(parsed) == list(ClauseRiskAssessment.model_fields)
+
+
+def test_invalid_enum_value_is_steered_to_allowed_option():
+    wanted = json.dumps({k: "Extreme" for k in ClauseRiskAssessment.model_fields})
+    parsed = json.loads(_drive(ClauseRiskAssessment, wanted))
+    for value in parsed.values():
+        assert value in ("Low Risk", "Moderate Risk", "High Risk", "Not Found")
+
+
+def test_clause_match_free_text_round_trips():
+    wanted = json.dumps({
+        "clause_category": "Waiting period",
+        "clause_detected": "Claims within 30 days are not admissible.",
+        "clause_clarity": "High",
+        "rejection_alignment": "Strong",
+        "explanation": "Rejection cites the 30-day waiting period.",
+        "confidence": "Medium",
+    })
+    result = ClauseMatchResult(**json.loads(_drive(ClauseMatchResult, wanted)))
+    assert result.clause_detected == "Claims within 30 days are not admissible."
+    assert result.confidence == "Medium"
+
+
+def test_documentation_list_and_bool_fields():
+    wanted = json.dumps({
+        "missing_documents": ["Discharge summary", "Doctor's certificate"],
+        "documentation_gap_severity": "High",
+        "rejection_nature": "Procedural",
+        "medical_ambiguity_detected": True,
+        "explanation": "Two documents missing.",
+        "confidence": "High",
+    })
+    result = DocumentationAnalysisResult(**json.loads(_drive(DocumentationAnalysisResult, wanted)))
+    assert result.missing_documents == ["Discharge summary", "Doctor's certificate"]
+    assert result.medical_ambiguity_detected is True
+
+
+def test_fused_audit_splits_into_both_schemas():
+    wanted = json.dumps({
+        "clause_category": "Pre-existing disease",
+        "clause_detected": "PED covered after 24 months.",
+        "clause_clarity": "High",
+        "rejection_alignment": "Partial",
+        "clause_explanation": "Rejection cites diabetes before inception.",
+        "clause_confidence": "Medium",
+        "missing_documents": ["Proposal form"],
+        "documentation_gap_severity": "Medium",
+        "rejection_nature": "Substantive",
+        "medical_ambiguity_detected": False,
+        "doc_explanation": "Clause-based rejection.",
+        "doc_confidence": "High",
+    })
+    fused = FusedAuditResult(**json.loads(_drive(FusedAuditResult, wanted)))
+    clause, doc = fused.split()
+    assert clause.explanation == "Rejection cites diabetes before inception."
+    assert clause.confidence == "Medium"
+    assert doc.missing_documents == ["Proposal form"]
+    assert doc.confidence == "High"
+
+
+def test_keys_and_braces_are_forced():
+    constraint = JsonSchemaConstraint(ClauseRiskAssessment, _TOK)
+    assert _TOK.decode(constraint.forced_run()) == '{"waiting_period": "'
+
+
+def _drive_longest(constraint: JsonSchemaConstraint, limit: int) -> int:
+    """Worst case: strings never close, lists always take another item."""
+    emitted = 0
+    while not constraint.done and emitted < limit:
+        ids, free_string = constraint.allowed()
+        if free_string:
+            token = ord("x")
+        else:
+            token = next((t for t in ids if chr(t) in ',"'), ids[0])
+        constraint.advance(token)
+        emitted += 1
+    return emitted
+
+
+def test_string_cap_shrinks_so_the_object_closes_within_max_tokens():
+    for schema in (ClauseMatchResult, DocumentationAnalysisResult, FusedAuditResult):
+        roomy = JsonSchemaConstraint(schema, _TOK)
+        worst = _drive_longest(roomy, 10_000)
+        budget = worst - 100                         # too tight for the default cap
+
+        constraint = JsonSchemaConstraint(schema, _TOK, max_tokens=budget)
+        assert constraint.string_cap < roomy.string_cap
+        assert _drive_longest(constraint, budget) <= budget
+        assert constraint.done
+
+
+def test_budget_too_small_for_the_schema_is_refused():
+    with pytest.raises(ValueError):
+        JsonSchemaConstraint(FusedAuditResult, _TOK, max_tokens=100)
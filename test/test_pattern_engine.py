@@ -0,0 +1,68 @@
+# test/test_pattern_engine.py
+#
+# Run with pytest: python -m pytest test/test_pattern_engine.py -v
+
+import sys, os, re
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.pattern_engine import PatternEngine, _required_literals
+from services.rule_engine import classify_rejection_rule_based
+
+
+def test_required_literals():
+    assert _required_literals(r"claim.*settled.*within \d+ day") == (["claim", "settled", "within ", " day"], True)
+    assert _required_literals(r"15.*day.*free") == (["15", "day", "free"], True)
+    assert _required_literals(r"complaints? officer") == (["complaint", " officer"], True)
+    assert _required_literals(r"company.{0,20}decision") == (["company", "decision"], True)
+    assert _required_literals(r".*portab") == (["portab"], False)
+    assert _required_literals(r"a|b") == ([], False)
+
+
+def test_scan_reports_every_literal_and_leftmost_regex():
+    engine = PatternEngine(
+        literals={"copay": ["co-pay", "co-payment"]},
+        patterns={"timeline": [r"settle.*claim.*\d+ day"]},
+    )
+    text = "co-payment of 20%. we settle each claim in 30 days; co-pay applies."
+    scan = engine.scan(text)
+    assert [(h.pattern, h.start) for h in scan.of("copay")] == [
+        ("co-pay", 0), ("co-payment", 0), ("co-pay", text.rindex("co-pay")),
+    ]
+    hit = scan.first("timeline")
+    m = re.search(r"settle.*claim.*\d+ day", text)
+    assert (hit.start, hit.end) == m.span()
+
+
+def test_literal_hits_include_every_overlapping_occurrence():
+    keywords = {"a": ["1%", "11%"], "b": ["%%", "%"]}
+    text = "11%% and 1%"
+    expected = sorted(
+        (signal, k, i)
+        for signal, ks in keywords.items() for k in ks
+        for i in range(len(text)) if text.startswith(k, i)
+    )
+    hits = PatternEngine(literals=keywords).scan(text).hits
+    assert sorted((h.signal, h.pattern, h.start) for h in hits) == expected
+
+
+def test_regex_semantics_match_re_search():
+    patterns = [r"claim.*settled.*within \d+", r"free.?look.*15 day", r"waive.*right.*sue"]
+    engine = PatternEngine(patterns={"p": patterns})
+    for text in [
+        "claim will be settled within 30 days",
+        "claim\nsettled within 30",              # . does not cross newlines
+        "settled within 30 days of claim",
+        "free-look of 15 days",
+        "you waive the right to sue",
+        "right to sue is waived",
+    ]:
+        expected = [p for p in patterns if re.search(p, text)]
+        assert [h.pattern for h in engine.scan(text).hits] == expected, text
+
+
+def test_rejection_priority_order_is_kept():
+    # Both "pre-existing" and "waiting period" match — table order decides
+    assert classify_rejection_rule_based(
+        "Waiting period for pre-existing disease not completed"
+    ) == "Pre-existing disease"
+    assert classify_rejection_rule_based("nothing relevant here") is None
@@ -0,0 +1,87 @@
+# test/test_pdf_pages.py
+#
+# Run with pytest: python -m pytest test/test_pdf_pages.py -v
+# Needs pdfplumber; skipped otherwise.
+#
+# Builds a small text PDF in memory and checks that ocr.extractor reads its
+# pages lazily — pages past the point the consumer stops are never extracted.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+import ocr.extractor as extractor
+
+_PAGES = [
+    "Section 1 Room rent is limited to one percent of the sum insured per day",
+    "Section 2 A co-payment of twenty percent applies to every admissible claim",
+    "Section 3 Pre-existing diseases are covered after thirty six months of cover",
+]
+
+
+def _pdf(pages: list[str]) -> bytes:
+    """Minimal single-font PDF, one line of text per page."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,                                           # page tree, filled below
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 10 Tf 40 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+            f" /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>"
+
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+@pytest.fixture
+def extracted_pages(monkeypatch):
+    """Page indices pdfplumber was asked to extract text from."""
+    seen: list[int] = []
+    original = pdfplumber.page.Page.extract_text
+
+    def counting(page, *args, **kwargs):
+        seen.append(page.page_number)
+        return original(page, *args, **kwargs)
+
+    monkeypatch.setattr(pdfplumber.page.Page, "extract_text", counting)
+    return seen
+
+
+def test_pages_are_yielded_in_order():
+    pages = list(extractor._pdf_pages(_pdf(_PAGES)))
+    assert [layer for layer, _ in pages] == ["pdfplumber"] * 3
+    assert [" ".join(text.split()) for _, text in pages] == _PAGES
+
+
+def test_closing_the_generator_stops_extraction(extracted_pages):
+    pages = extractor._pdf_pages(_pdf(_PAGES))
+    layer, text = next(pages)
+    pages.close()
+
+    assert "Room rent" in text
+    assert extracted_pages == [1]
+
+
+def test_budget_stops_before_later_pages(extracted_pages):
+    text, layer, truncated = extractor._extract_pdf_layers(_pdf(_PAGES), max_chars=60)
+
+    assert (len(text), layer, truncated) == (60, "pdfplumber", True)
+    assert extracted_pages == [1]
@@ -0,0 +1,106 @@
+# test/test_policy_comparison.py
+#
+# Run with pytest: python -m pytest test/test_policy_comparison.py -v
+#
+# PrePurchaseEngine (and the model stack behind it) is replaced by a fake
+# that hands back canned reports, so ranking and pairwise diffs run alone.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import types
+from types import SimpleNamespace
+
+import pytest
+
+
+def _report(score: float, compliance: float = 5.0, rating: str = "Moderate", **clauses):
+    return SimpleNamespace(
+        score_breakdown=SimpleNamespace(adjusted_score=score),
+        irdai_compliance=SimpleNamespace(compliance_score=compliance),
+        broker_risk_analysis=SimpleNamespace(transparency_score=50),
+        clause_risk=SimpleNamespace(**clauses),
+        overall_policy_rating=rating,
+    )
+
+
+class _FakePrePurchaseEngine:
+    reports: dict = {}
+
+    def __init__(self, model, tokenizer):
+        pass
+
+    def run_batch(self, policy_texts, executor=None):
+        for i, text in enumerate(policy_texts):
+            yield i, self.reports[text]
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    fake = types.ModuleType("engines.pre_purchase_engine")
+    fake.PrePurchaseEngine = _FakePrePurchaseEngine
+    monkeypatch.setitem(sys.modules, "engines.pre_purchase_engine", fake)
+    sys.modules.pop("engines.policy_comparison_engine", None)
+    from engines.policy_comparison_engine import PolicyComparisonEngine
+
+    yield PolicyComparisonEngine(model=None, tokenizer=None)
+    sys.modules.pop("engines.policy_comparison_engine", None)
+
+
+def test_two_policies(engine):
+    _FakePrePurchaseEngine.reports = {
+        "a": _report(62, co_payment="High Risk"),
+        "b": _report(81, co_payment="Low Risk", rating="Strong"),
+    }
+    matrix = engine.compare_matrix(["a", "b"])
+
+    assert [r.policy for r in matrix.ranking] == ["Policy B", "Policy A"]
+    assert matrix.recommended_policy == "Policy B"
+    assert matrix.score_matrix == [[0, -19], [19, 0]]
+    assert len(matrix.pairs) == 1
+    pair = matrix.pairs[0]
+    assert (pair.policy_a, pair.policy_b, pair.score_difference) == ("Policy A", "Policy B", -19)
+    assert pair.recommended_policy == "Policy B"
+    assert pair.key_differences == ["Co-payment: Policy A is High Risk, Policy B is Low Risk"]
+    assert pair.b_advantages[0].startswith("Lower co-payment risk")
+
+
+def test_n_policies_rank_by_score_and_count_every_pair(engine):
+    scores = {"p": 55, "q": 90, "r": 70, "s": 40, "t": 71}
+    _FakePrePurchaseEngine.reports = {k: _report(v) for k, v in scores.items()}
+    names  = ["P", "Q", "R", "S", "T"]
+    matrix = engine.compare_matrix(list(scores), names=names)
+
+    assert len(matrix.pairs) == 5 * 4 // 2
+    assert [(p.policy_a, p.policy_b) for p in matrix.pairs][:4] == [("P", "Q"), ("P", "R"), ("P", "S"), ("P", "T")]
+    assert [r.policy for r in matrix.ranking] == ["Q", "T", "R", "P", "S"]
+    assert [r.rank for r in matrix.ranking] == [1, 2, 3, 4, 5]
+    # R vs T is within the close-call margin — neither gets the win
+    assert {r.policy: r.pairwise_wins for r in matrix.ranking} == {"Q": 4, "T": 2, "R": 2, "P": 1, "S": 0}
+    assert matrix.recommended_policy == "Q"
+
+    values = list(scores.values())
+    assert matrix.score_matrix == [[a - b for b in values] for a in values]
+
+
+def test_ties_break_on_wins_then_compliance_and_close_lead_recommends_neither(engine):
+    _FakePrePurchaseEngine.reports = {
+        "a": _report(80, compliance=4.0),
+        "b": _report(80, compliance=6.0),
+        "c": _report(78),
+    }
+    matrix = engine.compare_matrix(["a", "b", "c"])
+
+    assert [r.policy for r in matrix.ranking] == ["Policy B", "Policy A", "Policy C"]
+    assert all(p.recommended_policy == "Neither" for p in matrix.pairs)
+    assert matrix.recommended_policy == "Neither"
+
+
+def test_rejects_fewer_than_two_policies_and_bad_names(engine):
+    _FakePrePurchaseEngine.reports = {"a": _report(50), "b": _report(60)}
+    with pytest.raises(ValueError):
+        engine.compare_matrix(["a"])
+    with pytest.raises(ValueError):
+        engine.compare_matrix(["a", "b"], names=["X", "X"])
+    with pytest.raises(ValueError):
+        engine.compare_matrix(["a", "b"], names=["X"])
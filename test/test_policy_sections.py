@@ -0,0 +1,70 @@
+# test/test_policy_sections.py
+#
+# Run with pytest: python -m pytest test/test_policy_sections.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.policy_sections import CLAUSE_FIELDS, merge_field_risks, route_sections
+
+_POLICY = """Acme Health Shield — Policy Wording
+
+DEFINITIONS
+
+Hospital means any institution registered with the local authority, having qualified nursing staff under its employment round the clock.
+
+NETWORK PROVIDERS
+
+The list of network providers is available on our website and is updated quarterly by the Company.
+
+WAITING PERIOD
+
+Pre-existing diseases are covered after a waiting period of 48 months of continuous coverage with us.
+
+ROOM RENT
+
+Room rent is limited to 1% of the sum insured per day. Co-payment of 20% applies to every claim.
+
+GRIEVANCE REDRESSAL
+
+Complaints may be escalated to the Insurance Ombudsman as per IRDAI regulations.
+"""
+
+
+def test_only_relevant_sections_are_routed():
+    routed = route_sections(_POLICY)
+    sections = [s.section for s, _ in routed]
+
+    assert "NETWORK PROVIDERS" not in sections
+    assert sections == ["DEFINITIONS", "WAITING PERIOD", "ROOM RENT", "GRIEVANCE REDRESSAL"]
+
+
+def test_sections_get_only_their_fields():
+    routed = {s.section: fields for s, fields in route_sections(_POLICY)}
+
+    assert routed["WAITING PERIOD"] == ("waiting_period", "pre_existing_disease")
+    assert routed["ROOM RENT"] == ("room_rent_sublimit", "co_payment", "sublimits_and_caps")
+    assert routed["GRIEVANCE REDRESSAL"] == ("transparency_of_terms",)
+
+
+def test_per_field_cap_keeps_best_sections():
+    body = "\n\n".join(
+        f"CLAUSE {i}\n\nA waiting period of {i} months applies." + " Waiting." * (i % 3)
+        for i in range(1, 7)
+    )
+    routed = route_sections("Title\n\n" + body, per_field=2)
+
+    assert [s.section for s, _ in routed] == ["CLAUSE 2", "CLAUSE 5"]
+
+
+def test_merge_worst_risk_wins_and_not_found_only_if_unanimous():
+    merged = merge_field_risks([
+        {"waiting_period": "Low Risk", "co_payment": "Not Found"},
+        {"waiting_period": "High Risk"},
+        {"waiting_period": "Moderate Risk", "restoration_benefit": "Low Risk"},
+    ])
+
+    assert merged["waiting_period"] == "High Risk"
+    assert merged["restoration_benefit"] == "Low Risk"
+    assert merged["co_payment"] == "Not Found"
+    assert set(merged) == set(CLAUSE_FIELDS)
@@ -0,0 +1,107 @@
+# test/test_prepurchase_batch.py
+#
+# Run with pytest: python -m pytest test/test_prepurchase_batch.py -v
+#
+# llm.generation (torch / MedGemma) is replaced by a stub module and the
+# per-policy pipeline by a fake, so only run_batch()'s own bookkeeping runs:
+# dedup by cache key, cache hits first, cancellation on close.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from services.cache_store import TieredCache
+
+
+@pytest.fixture
+def ppe(monkeypatch, tmp_path):
+    generation = types.ModuleType("llm.generation")
+    generation.generate = lambda *args, **kwargs: "{}"
+    monkeypatch.setitem(sys.modules, "llm.generation", generation)
+    sys.modules.pop("engines.pre_purchase_engine", None)
+    import engines.pre_purchase_engine as module
+
+    monkeypatch.setattr(module, "_RESULT_CACHE", TieredCache("t", path=tmp_path / "c.sqlite3"))
+    # Reports are plain strings here — the cache stores and returns them as-is
+    monkeypatch.setattr(module, "PrePurchaseReport", SimpleNamespace(model_validate_json=lambda s: s))
+    yield module
+    sys.modules.pop("engines.pre_purchase_engine", None)
+
+
+def _fake_pipeline(monkeypatch, module, gate: threading.Event | None = None):
+    runs: list[str] = []
+
+    def run_uncached(self, policy_text, raw_text, key):
+        runs.append(policy_text)
+        if gate is not None:
+            gate.wait(timeout=10)
+        return f"report:{policy_text}"
+
+    monkeypatch.setattr(module.PrePurchaseEngine, "_run_uncached", run_uncached)
+    return runs
+
+
+def test_identical_policies_are_analysed_once(ppe, monkeypatch):
+    runs   = _fake_pipeline(monkeypatch, ppe)
+    engine = ppe.PrePurchaseEngine(None, None)
+
+    results = dict(engine.run_batch(["Room rent  1%.", "Co-pay 20%.", "Room rent 1%.\n"]))
+
+    assert sorted(runs) == ["Co-pay 20%.", "Room rent 1%."]
+    assert results == {0: "report:Room rent 1%.", 1: "report:Co-pay 20%.", 2: "report:Room rent 1%."}
+
+
+def test_cache_hits_are_yielded_before_any_analysis(ppe, monkeypatch):
+    gate   = threading.Event()
+    runs   = _fake_pipeline(monkeypatch, ppe, gate)
+    engine = ppe.PrePurchaseEngine(None, None)
+    _, _, key = ppe._prepare("Cached policy.", False)
+    ppe._RESULT_CACHE.put(key, "cached report")
+
+    batch = engine.run_batch(["Fresh policy.", "Cached policy.", "Cached policy."])
+    assert [next(batch), next(batch)] == [(1, "cached report"), (2, "cached report")]
+    gate.set()
+    assert list(batch) == [(0, "report:Fresh policy.")]
+    assert runs == ["Fresh policy."]
+
+
+def test_closing_the_iterator_cancels_policies_not_started(ppe, monkeypatch):
+    runs: list[str] = []
+    release = threading.Event()
+
+    def run_uncached(self, policy_text, raw_text, key):
+        runs.append(policy_text)
+        if len(runs) > 1:                    # hold the worker after the first policy
+            release.wait(timeout=10)
+        return f"report:{policy_text}"
+
+    monkeypatch.setattr(ppe.PrePurchaseEngine, "_run_uncached", run_uncached)
+    policies = [f"Policy {i}." for i in range(6)]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        batch = ppe.PrePurchaseEngine(None, None).run_batch(policies, executor=executor)
+        first = next(batch)
+        batch.close()
+        release.set()
+
+    assert first == (0, "report:Policy 0.")
+    assert runs in (["Policy 0."], ["Policy 0.", "Policy 1."])   # 1 may already be running
+
+
+def test_failed_policy_yields_its_exception(ppe, monkeypatch):
+    def run_uncached(self, policy_text, raw_text, key):
+        if "bad" in policy_text:
+            raise RuntimeError("model fell over")
+        return "ok"
+
+    monkeypatch.setattr(ppe.PrePurchaseEngine, "_run_uncached", run_uncached)
+    results = dict(ppe.PrePurchaseEngine(None, None).run_batch(["good", "bad"]))
+
+    assert results[0] == "ok"
+    assert isinstance(results[1], RuntimeError)
@@ -0,0 +1,79 @@
+# test/test_report_chat_prompt.py
+#
+# Run with pytest: python -m pytest test/test_report_chat_prompt.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from llm.multilingual_translations import SYSTEM_LANG_INSTRUCTION
+from llm.report_chat_prompt import report_chat_header, report_chat_messages
+
+_REPORT = {
+    "clause_risk": {f"clause_{i}": "High Risk" for i in range(40)},
+    "score_breakdown": {"adjusted_score": 41},
+}
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def _history(turns: int) -> list[dict]:
+    return [
+        m
+        for i in range(turns)
+        for m in (
+            {"role": "user", "content": f"question {i} " + "q " * 30},
+            {"role": "assistant", "content": f"answer {i} " + "a " * 30},
+        )
+    ]
+
+
+def _size(messages: list[dict]) -> int:
+    return sum(_words(m["content"]) + 8 for m in messages)
+
+
+def test_unbudgeted_prompt_keeps_every_pair_and_the_summary():
+    messages = report_chat_messages(_REPORT, _history(3), "new?", summary="user is 52")
+
+    assert [m["role"] for m in messages] == ["user", "assistant"] * 3 + ["user"]
+    assert "EARLIER IN THIS CONVERSATION" in messages[0]["content"]
+    assert messages[-1]["content"] == "USER QUESTION: new?\n\nANSWER:"
+
+
+def test_oldest_turns_go_first_when_over_budget():
+    full     = report_chat_messages(_REPORT, _history(4), "new?", summary="user is 52", count_tokens=_words)
+    budget   = _size(full) - 20
+    messages = report_chat_messages(
+        _REPORT, _history(4), "new?", summary="user is 52", count_tokens=_words, budget=budget,
+    )
+
+    assert _size(messages) <= budget
+    assert "question 0" not in messages[0]["content"]
+    assert "question 1" in messages[0]["content"]
+    assert "user is 52" in messages[0]["content"]
+
+
+def test_report_is_trimmed_last_and_language_and_question_survive():
+    messages = report_chat_messages(
+        _REPORT, _history(4), "kitna co-pay?", lang="hi", summary="user is 52",
+        count_tokens=_words, budget=150,
+    )
+
+    assert len(messages) == 1
+    prompt = messages[0]["content"]
+    assert _size(messages) <= 150
+    assert prompt.startswith(SYSTEM_LANG_INSTRUCTION["hi"])
+    assert prompt.rstrip().endswith("USER QUESTION: kitna co-pay?\n\nANSWER:")
+    assert "clause_0" in prompt and "clause_39" not in prompt
+    assert "user is 52" not in prompt
+    assert not prompt.startswith(report_chat_header(_REPORT, "hi"))   # session cache is dropped
+
+
+def test_header_is_a_stable_prefix_across_summary_folds():
+    header = report_chat_header(_REPORT, "hi")
+    before = report_chat_messages(_REPORT, _history(5), "new?", lang="hi")
+    after  = report_chat_messages(_REPORT, _history(5)[4:], "new?", lang="hi", summary="folded")
+
+    assert before[0]["content"].startswith(header)
+    assert after[0]["content"].startswith(header + "\nEARLIER IN THIS CONVERSATION")
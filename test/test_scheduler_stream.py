@@ -0,0 +1,49 @@
+# test/test_scheduler_stream.py
+#
+# Run with pytest: python -m pytest test/test_scheduler_stream.py -v
+# Needs torch + transformers; skipped otherwise.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from llm.scheduler import GenerationRequest
+
+_EOS = 1
+
+
+class _SkipPromptStreamer:
+    """Same put() contract as TextIteratorStreamer(skip_prompt=True)."""
+
+    def __init__(self):
+        self.next_tokens_are_prompt = True
+        self.tokens: list[int] = []
+        self.ended = False
+
+    def put(self, value):
+        if self.next_tokens_are_prompt:
+            self.next_tokens_are_prompt = False
+            return
+        self.tokens.extend(value.reshape(-1).tolist())
+
+    def end(self):
+        self.ended = True
+
+
+def test_stream_carries_every_generated_token():
+    streamer = _SkipPromptStreamer()
+    request  = GenerationRequest(
+        torch.tensor([5, 6, 7]), max_new_tokens=10, eos_id=_EOS, pad_id=_EOS, streamer=streamer,
+    )
+    for token in (42, 43, 44, _EOS):
+        request.accept(token)
+    request.resolve()
+
+    # generate() decodes request.generated; the stream must spell the same text
+    assert streamer.tokens == [t for t in request.future.result() if t != _EOS]
+    assert streamer.tokens == [42, 43, 44]
+    assert streamer.ended
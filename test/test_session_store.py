@@ -0,0 +1,118 @@
+# test/test_session_store.py
+#
+# Run with pytest: python -m pytest test/test_session_store.py -v
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from services import chat_memory, session_store
+from services.session_store import MemorySessionStore, SessionBackend, SQLiteSessionStore
+
+_REPORT = {"report_type": "prepurchase", "clause_risk": {"co_payment": "High Risk"}}
+
+
+def _sqlite(path, **kwargs) -> tuple[SQLiteSessionStore, list[str]]:
+    evicted: list[str] = []
+    kwargs.setdefault("reap_interval", None)
+    return SQLiteSessionStore(path, on_evict=evicted.append, **kwargs), evicted
+
+
+def test_sqlite_sessions_are_shared_across_workers(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    worker_a, _ = _sqlite(path)
+    worker_b, _ = _sqlite(path)          # second process: its own connection
+
+    sid = worker_a.create(_REPORT)
+    worker_b.append(sid, "user", "Is co-pay high?")
+    worker_a.append(sid, "assistant", "Yes, 20%.")
+
+    session = worker_b.get(sid)
+    assert session["report_data"] == _REPORT
+    assert [m["content"] for m in session["history"]] == ["Is co-pay high?", "Yes, 20%."]
+    assert worker_a.history(sid, 1) == [{"role": "assistant", "content": "Yes, 20%."}]
+
+
+def test_sqlite_history_writes_are_deltas_and_capped(tmp_path):
+    store, _ = _sqlite(tmp_path / "s.sqlite3", max_history=3)
+    sid = store.create(_REPORT)
+    for i in range(5):
+        assert store.append(sid, "user", f"m{i}")
+
+    assert [m["content"] for m in store.history(sid, 10)] == ["m2", "m3", "m4"]
+    assert store.stats()["messages"] == 3
+    assert store.append("missing", "user", "x") is False
+
+
+def test_sqlite_reaper_expires_and_bounds_sessions(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    store, evicted = _sqlite(tmp_path / "s.sqlite3", ttl_seconds=60, max_sessions=2)
+
+    stale = store.create(_REPORT)
+    store.append(stale, "user", "old")
+    now[0] += 45
+    created = []
+    for _ in range(3):
+        created.append(store.create(_REPORT))
+        now[0] += 1
+    oldest, middle, newest = created
+    now[0] += 27
+
+    assert store.reap() == 2
+    assert set(evicted) == {stale, oldest}
+    assert store.get(stale) is None
+    assert store.exists(middle) and store.exists(newest)
+    assert store.stats()["messages"] == 0
+
+
+def test_summary_only_moves_forward_on_both_backends(tmp_path):
+    for store in (
+        MemorySessionStore(reap_interval=None),
+        SQLiteSessionStore(str(tmp_path / "s.db"), reap_interval=None),
+    ):
+        sid = store.create(_REPORT)
+        for i in range(6):
+            store.append(sid, "user" if i % 2 == 0 else "assistant", f"m{i}")
+
+        assert store.set_summary(sid, "first four", 4)
+        assert not store.set_summary(sid, "stale", 2)
+        assert not store.set_summary(sid, "past the end", 8)
+
+        session = store.get(sid)
+        assert session["message_count"] == 6
+        assert (session["summary"], session["summary_upto"]) == ("first four", 4)
+
+
+def test_configured_sqlite_backend_serves_other_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_memory, "_sessions", chat_memory._sessions)
+    monkeypatch.setattr(chat_memory, "SESSION_BACKEND", chat_memory.SESSION_BACKEND)
+    path = tmp_path / "sessions.sqlite3"
+
+    chat_memory.configure_session_backend("sqlite", str(path))
+    sid = chat_memory.create_session(_REPORT)
+    chat_memory.add_message(sid, "user", "hello")
+
+    other_worker, _ = _sqlite(path)
+    assert chat_memory.SESSION_BACKEND == "sqlite"
+    assert other_worker.get(sid)["report_data"] == _REPORT
+    assert other_worker.history(sid, 10) == [{"role": "user", "content": "hello"}]
+
+
+def test_backend_missing_a_method_fails_at_construction():
+    class Partial(SessionBackend):
+        def create(self, report_data):
+            return "x"
+
+    with pytest.raises(TypeError):
+        Partial(reap_interval=None)
+
+
+def test_memory_store_budgets_encoded_bytes():
+    store = MemorySessionStore(reap_interval=None)
+    sid   = store.create(_REPORT)
+    base  = store.stats()["bytes"]
+    store.append(sid, "user", "प्रीमियम")          # 8 chars, 24 UTF-8 bytes
+
+    assert store.stats()["bytes"] == base + len("प्रीमियम".encode("utf-8"))
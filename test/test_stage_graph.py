@@ -0,0 +1,43 @@
+# test/test_stage_graph.py
+#
+# Run with pytest: python -m pytest test/test_stage_graph.py -v
+
+import sys, os, threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from engines.stage_graph import StageGraph
+
+
+def test_independent_stages_overlap_and_dependents_see_results():
+    barrier = threading.Barrier(2, timeout=2)   # both roots must be in flight at once
+
+    def root(value):
+        barrier.wait()
+        return value
+
+    graph = (
+        StageGraph()
+        .add("a", lambda: root(1))
+        .add("b", lambda: root(2))
+        .add("sum", lambda a, b: a + b, deps=("a", "b"))
+    )
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        assert graph.run(pool) == {"a": 1, "b": 2, "sum": 3}
+
+
+def test_stage_error_propagates():
+    def boom():
+        raise RuntimeError("stage failed")
+
+    graph = StageGraph().add("bad", boom).add("after", lambda bad: bad, deps=("bad",))
+    with ThreadPoolExecutor(max_workers=1) as pool, pytest.raises(RuntimeError):
+        graph.run(pool)
+
+
+def test_unknown_dependency_rejected():
+    with pytest.raises(ValueError):
+        StageGraph().add("x", lambda y: y, deps=("y",))
@@ -0,0 +1,77 @@
+# test/test_upload_extraction.py
+#
+# Run with pytest: python -m pytest test/test_upload_extraction.py -v
+#
+# The extraction layers are replaced with fakes over an in-memory "document",
+# so the cache hit / upgrade rules run without pdfplumber or Tesseract.
+
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import types
+
+import pytest
+
+import ocr.extractor as extractor
+from services.cache_store import TieredCache
+
+_DOCUMENT = " ".join(f"Clause {i}: room rent is capped at one percent of the sum insured." for i in range(40))
+
+
+@pytest.fixture
+def upload(monkeypatch, tmp_path):
+    # document_parser imports pdfplumber at module level — not needed here
+    parser = types.ModuleType("services.document_parser")
+    parser.extract_text_with_budget = lambda **kwargs: ("", False)
+    monkeypatch.setitem(sys.modules, "services.document_parser", parser)
+    sys.modules.pop("services.upload_extraction", None)
+    import services.upload_extraction as ue
+
+    calls = []
+
+    def fake_ocr_extract(data, filename, mime_type, max_chars):
+        calls.append(max_chars)
+        return _DOCUMENT[:max_chars], "pdfplumber", len(_DOCUMENT) > max_chars
+
+    monkeypatch.setattr(ue, "HAS_OCR", True)
+    monkeypatch.setattr(ue, "ocr_extract", fake_ocr_extract, raising=False)
+    monkeypatch.setattr(ue, "_EXTRACTION_CACHE", TieredCache("t", path=tmp_path / "c.sqlite3"))
+    yield ue, calls
+    sys.modules.pop("services.upload_extraction", None)
+
+
+def test_smaller_budget_is_served_from_a_larger_entry(upload):
+    ue, calls = upload
+    assert ue.extract_upload("p.pdf", "application/pdf", b"%PDF-1", 2000) == _DOCUMENT[:2000]
+    assert ue.extract_upload("p.pdf", "application/pdf", b"%PDF-1", 500) == _DOCUMENT[:500]
+    assert calls == [2000]
+
+
+def test_larger_budget_upgrades_a_truncated_entry(upload):
+    ue, calls = upload
+    ue.extract_upload("p.pdf", "application/pdf", b"%PDF-1", 500)
+    assert ue.extract_upload("p.pdf", "application/pdf", b"%PDF-1", 2000) == _DOCUMENT[:2000]
+    assert calls == [500, 2000]
+    ue.extract_upload("p.pdf", "application/pdf", b"%PDF-1", 1000)
+    assert calls == [500, 2000]                   # the upgraded entry now serves
+
+
+def test_whole_document_entry_serves_any_budget(upload):
+    ue, calls = upload
+    ue.extract_upload("p.pdf", "application/pdf", b"%PDF-1", 10_000)
+    assert ue.extract_upload("p.pdf", "application/pdf", b"%PDF-1", 50_000) == _DOCUMENT
+    assert calls == [10_000]
+
+
+def test_pdf_stopped_on_budget_is_flagged_even_when_cleaning_shrinks_it(monkeypatch):
+    # Whitespace counts towards the page budget but _clean() collapses it,
+    # so the returned text is shorter than max_chars despite unread pages.
+    pages = ["Room   rent    capped." + " " * 60, "Second page.", "Third page."]
+    monkeypatch.setattr(extractor, "_pdf_pages", lambda data: (("pdfplumber", p) for p in pages))
+
+    text, layer, truncated = extractor._extract_pdf_layers(b"%PDF", max_chars=50)
+    assert len(text) < 50 and "Second" not in text
+    assert (layer, truncated) == ("pdfplumber", True)
+
+    text, _, truncated = extractor._extract_pdf_layers(b"%PDF", max_chars=500)
+    assert "Third page." in text and truncated is False